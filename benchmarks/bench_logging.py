@@ -0,0 +1,81 @@
+"""
+Benchmark for ``studyguide.logging_config``.
+
+Measures how long a ``log.info`` call with a handful of fields keeps the
+calling thread busy: synchronous rendering and writing versus queue mode,
+with the stdlib ``json`` and the orjson renderer. stdout is redirected to a
+file, or with ``--slow-sink MS`` to a sink that sleeps on every write (a
+blocked terminal or pipe), where the synchronous handler stalls the caller.
+
+Usage:
+    python benchmarks/bench_logging.py [--events 20000] [--slow-sink 0]
+"""
+
+import argparse
+import io
+import sys
+import tempfile
+import time
+from pathlib import Path
+from unittest.mock import patch
+
+import structlog
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from studyguide import logging_config  # noqa: E402
+from studyguide.logging_config import configure_logging, shutdown_logging  # noqa: E402
+
+
+class SlowSink(io.StringIO):
+    def __init__(self, delay: float):
+        super().__init__()
+        self.delay = delay
+
+    def write(self, text: str) -> int:
+        time.sleep(self.delay)
+        return len(text)
+
+
+def run(events: int, use_queue: bool, orjson: bool, sink) -> tuple:
+    with patch.object(sys, "stdout", sink), patch.object(
+        logging_config, "_orjson_dumps", logging_config._orjson_dumps if orjson else lambda: None
+    ):
+        configure_logging("INFO", use_queue=use_queue, queue_size=events + 1)
+        log = structlog.get_logger("bench")
+        start = time.perf_counter()
+        for i in range(events):
+            log.info(
+                "Perplexity API call successful",
+                model="sonar-medium-chat",
+                response_id=f"resp-{i}",
+                usage={"prompt_tokens": 20, "completion_tokens": 50},
+                cost_usd=0.000042,
+            )
+        caller = time.perf_counter() - start
+        shutdown_logging()
+        total = time.perf_counter() - start
+    return caller, total
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--events", type=int, default=20000)
+    parser.add_argument("--slow-sink", type=float, default=0.0, help="ms per write")
+    args = parser.parse_args()
+
+    events = args.events if not args.slow_sink else min(args.events, 500)
+    for use_queue in (False, True):
+        for orjson in (False, True):
+            with tempfile.TemporaryFile("w+") as out:
+                sink = SlowSink(args.slow_sink / 1000) if args.slow_sink else out
+                caller, total = run(events, use_queue, orjson, sink)
+            name = f"{'queue' if use_queue else 'sync'} + {'orjson' if orjson else 'json'}"
+            print(
+                f"{name:16} caller {caller / events * 1e6:7.2f} us/event"
+                f"   until written {total / events * 1e6:7.2f} us/event"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Benchmark for building parsed-chapter models from plain data.
+
+Compares full validation, the trusted ``load_chapter`` path and pydantic's
+``model_construct`` when re-hydrating an already validated ``Chapter`` (as
+read back from a cache), and the binary format of ``studyguide.serialization``
+against pydantic's JSON round trip (``model_dump_json``/``model_validate_json``).
+
+Usage:
+    python benchmarks/bench_models.py [--sections 5] [--questions 20]
+"""
+
+import argparse
+import logging
+import sys
+import timeit
+from pathlib import Path
+
+import structlog
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from benchmarks.bench_parser import make_chapter  # noqa: E402
+from studyguide.parser import (  # noqa: E402
+    Chapter,
+    QuizItem,
+    Section,
+    load_chapter,
+    parse_chapter_response,
+)
+from studyguide.serialization import decode_chapter, encode_chapter  # noqa: E402
+
+
+def construct(data: dict) -> Chapter:
+    """Builds the models with ``model_construct`` (no validation at all)."""
+    return Chapter.model_construct(
+        title=data["title"],
+        introduction=data["introduction"],
+        sections=[Section.model_construct(**s) for s in data["sections"]],
+        summary=data["summary"],
+        quiz=[QuizItem.model_construct(**q) for q in data["quiz"]],
+        keywords=data.get("keywords"),
+    )
+
+
+def report(name: str, func, number: int = 5000) -> None:
+    seconds = min(timeit.repeat(func, number=number, repeat=3)) / number
+    print(f"{name:36} {seconds * 1e6:9.1f} us {1 / seconds:12.0f} chapters/s")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sections", type=int, default=5)
+    parser.add_argument("--questions", type=int, default=20)
+    args = parser.parse_args()
+
+    structlog.configure(
+        wrapper_class=structlog.make_filtering_bound_logger(logging.CRITICAL)
+    )
+    chapter = parse_chapter_response(make_chapter(args.sections, args.questions))
+    data = chapter.model_dump()
+
+    report("load_chapter (validated)", lambda: load_chapter(data))
+    report("load_chapter (trusted)", lambda: load_chapter(data, trusted=True))
+    report("model_construct", lambda: construct(data))
+
+    payload = encode_chapter(chapter)
+    document = chapter.model_dump_json()
+    assert decode_chapter(payload) == Chapter.model_validate_json(document) == chapter
+    print()
+    report("model_dump_json", chapter.model_dump_json)
+    report("encode_chapter", lambda: encode_chapter(chapter))
+    report("model_validate_json", lambda: Chapter.model_validate_json(document))
+    report("decode_chapter", lambda: decode_chapter(payload))
+    compressed = encode_chapter(chapter, compress=True)
+    report("encode_chapter (compress)", lambda: encode_chapter(chapter, compress=True))
+    report("decode_chapter (compress)", lambda: decode_chapter(compressed))
+
+    size = len(document.encode())
+    print(f"\nsize: json {size} B")
+    for name, blob in (("binary", payload), ("binary (compress)", compressed)):
+        print(f"      {name} {len(blob)} B ({len(blob) / size:.0%})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,303 @@
+"""
+Benchmark for ``studyguide.parser.parse_chapter_response``.
+
+Compares the single-pass tokenizer against the previous regex-per-field
+implementation (kept below as ``legacy_parse_chapter_response``) on typical,
+large and adversarial inputs, reporting chapters/sec and MB/sec. Before
+timing, both implementations are checked to agree on every input and on a
+set of randomly mutated chapters.
+
+With ``--corpus N``, also times ``parse_many`` on a corpus of N responses
+for each worker count in ``--workers``.
+
+Usage:
+    python benchmarks/bench_parser.py [--repeat 5] [--mutations 2000]
+    python benchmarks/bench_parser.py --corpus 10000 --workers 1,2,4,8
+"""
+
+import argparse
+import logging
+import random
+import re
+import sys
+import time
+from pathlib import Path
+
+import structlog
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from studyguide.parser import (  # noqa: E402
+    Chapter,
+    ParseError,
+    QuizItem,
+    Section,
+    parse_chapter_response,
+    parse_many,
+)
+
+
+def legacy_parse_chapter_response(raw_text: str) -> Chapter:
+    """The regex-per-field parser replaced by the tokenizer (logging removed)."""
+    title_pattern = re.compile(r"^\s*#\s*Chapter Title:\s*(.+?)\s*$", re.MULTILINE)
+    intro_pattern = re.compile(
+        r"\*\*Introduction:\*\*\s*(.*?)\s*---", re.MULTILINE | re.DOTALL
+    )
+    section_pattern = re.compile(
+        r"##\s*Section\s*\d+:\s*(.+?)\s*\n(.*?)\s*(?=(?:---|\Z))",
+        re.MULTILINE | re.DOTALL,
+    )
+    summary_pattern = re.compile(
+        r"\*\*Summary:\*\*\s*(.*?)\s*---", re.MULTILINE | re.DOTALL
+    )
+    keywords_pattern = re.compile(
+        r"\*\*Keywords:\*\*\s*\n(.*?)(?=\n---|\Z)", re.MULTILINE | re.DOTALL
+    )
+    quiz_pattern = re.compile(r"\*\*Quiz:\*\*\s*(.*)", re.MULTILINE | re.DOTALL)
+    quiz_item_pattern = re.compile(
+        r"\d+\.\s*\*\*Question:\*\*\s*(.+?)\s*\n(.*?)\s*\*\*Correct Answer:\*\*\s*(.+?)\s*(?=\n\d+\.|\Z)",
+        re.MULTILINE | re.DOTALL,
+    )
+    quiz_option_pattern = re.compile(r"^\s*\*\s*(.+?)\s*$", re.MULTILINE)
+
+    try:
+        title_match = title_pattern.search(raw_text)
+        if not title_match:
+            raise ParseError("Could not find chapter title matching pattern.")
+        intro_match = intro_pattern.search(raw_text)
+        if not intro_match:
+            raise ParseError("Could not find introduction section.")
+        sections_data = section_pattern.findall(raw_text)
+        if not sections_data:
+            raise ParseError("Could not find any sections.")
+        sections = [
+            Section(heading=heading.strip(), content=content.strip())
+            for heading, content in sections_data
+        ]
+        summary_match = summary_pattern.search(raw_text)
+        if not summary_match:
+            raise ParseError("Could not find summary section.")
+        keywords_match = keywords_pattern.search(raw_text)
+        keywords = None
+        if keywords_match:
+            keywords = [
+                line.strip("-* ").strip()
+                for line in keywords_match.group(1).strip().split("\n")
+                if line.strip()
+            ]
+        quiz_match = quiz_pattern.search(raw_text)
+        if not quiz_match:
+            raise ParseError("Could not find quiz section.")
+        quiz_items_data = quiz_item_pattern.findall(quiz_match.group(1).strip())
+        if not quiz_items_data:
+            raise ParseError("Could not find any quiz items within the quiz section.")
+        quiz = []
+        for question, options_block, correct_answer in quiz_items_data:
+            options = quiz_option_pattern.findall(options_block)
+            if not options:
+                raise ParseError(f"Could not find options for question: {question[:50]}...")
+            quiz.append(
+                QuizItem(
+                    question=question.strip(),
+                    options=[opt.strip() for opt in options],
+                    correct_answer=correct_answer.strip(),
+                )
+            )
+        return Chapter(
+            title=title_match.group(1).strip(),
+            introduction=intro_match.group(1).strip(),
+            sections=sections,
+            summary=summary_match.group(1).strip(),
+            quiz=quiz,
+            keywords=keywords,
+        )
+    except ParseError:
+        raise
+    except Exception as e:
+        raise ParseError(f"Parsed data failed validation: {e}") from e
+
+
+# --- Inputs ---
+def make_chapter(sections: int = 5, questions: int = 5, paragraph: int = 6) -> str:
+    """Builds a well-formed chapter of roughly realistic shape."""
+    sentence = "Asyncio schedules coroutines cooperatively on a single event loop. "
+    parts = [
+        "# Chapter Title: Concurrency in Practice\n",
+        "**Introduction:**\n" + sentence * paragraph + "\n---\n",
+    ]
+    for n in range(1, sections + 1):
+        parts.append(f"## Section {n}: Topic {n}\n\n" + sentence * paragraph + "\n---\n")
+    parts.append("**Summary:**\n" + sentence * 2 + "\n---\n")
+    parts.append("**Keywords:**\n- asyncio\n- event loop\n- coroutine\n---\n")
+    parts.append("**Quiz:**\n")
+    for n in range(1, questions + 1):
+        parts.append(
+            f"\n{n}.  **Question:** What does construct {n} do?\n"
+            "    *   Blocks the loop\n"
+            "    *   Yields to the loop\n"
+            "    *   Spawns a thread\n"
+            "    **Correct Answer:** Yields to the loop\n"
+        )
+    return "".join(parts)
+
+
+def make_unanswered_quiz(questions: int) -> str:
+    """A quiz of questions with options but no answers (lazy scans to the end)."""
+    head = make_chapter(questions=0)
+    item = "{n}. **Question:** Unanswered {n}?\n    * A\n    * B\n"
+    return head + "".join(item.format(n=n) for n in range(1, questions + 1))
+
+
+def make_repeated_markers(count: int) -> str:
+    """Many introduction markers with no delimiter after them."""
+    return "# Chapter Title: Markers\n" + "**Introduction:** text\n" * count
+
+
+def make_whitespace_run(width: int) -> str:
+    """A summary with a long blank run that is not followed by its delimiter."""
+    return make_chapter().replace(
+        "**Summary:**\n", "**Summary:** x" + " " * width + "y\n", 1
+    )
+
+
+INPUTS = {
+    "typical (5 sections, 5 questions)": lambda: make_chapter(),
+    "large (200 sections, 200 questions)": lambda: make_chapter(200, 200),
+    "adversarial: 60 unanswered questions": lambda: make_unanswered_quiz(60),
+    "adversarial: 2k unterminated intros": lambda: make_repeated_markers(2000),
+    "adversarial: 20k blank run": lambda: make_whitespace_run(20_000),
+}
+
+
+def _outcome(parse, text):
+    try:
+        return parse(text)
+    except ParseError as e:
+        return ("ParseError", str(e).split(":")[0])
+
+
+# Quiz items are validated together once every item's options were found, so
+# when one item lacks options and an earlier one is invalid, either error may
+# be the one reported
+_QUIZ_ERRORS = {"Could not find options for question", "Parsed data failed validation"}
+
+
+def _same(new, old) -> bool:
+    if isinstance(new, tuple) and isinstance(old, tuple):
+        return new == old or {new[1], old[1]} == _QUIZ_ERRORS
+    return new == old
+
+
+def mutate(text: str, rng: random.Random) -> str:
+    """Randomly deletes, duplicates, swaps or damages lines of a chapter."""
+    lines = text.split("\n")
+    for _ in range(rng.randint(1, 4)):
+        i = rng.randrange(len(lines))
+        op = rng.randrange(6)
+        if op == 0:
+            del lines[i]
+        elif op == 1:
+            lines.insert(i, lines[rng.randrange(len(lines))])
+        elif op == 2:
+            j = rng.randrange(len(lines))
+            lines[i], lines[j] = lines[j], lines[i]
+        elif op == 3:
+            lines[i] = lines[i] + " ---"
+        elif op == 4:
+            lines[i] = lines[i].strip()
+        else:
+            lines.insert(i, "")
+        if not lines:
+            lines = [""]
+    return "\n".join(lines)
+
+
+def check(mutations: int) -> None:
+    """Fails loudly if the two implementations disagree on any input."""
+    rng = random.Random(0)
+    base = make_chapter(3, 3, 1)
+    samples = [build() for build in INPUTS.values()]
+    samples += [mutate(base, rng) for _ in range(mutations)]
+    for text in samples:
+        new = _outcome(parse_chapter_response, text)
+        old = _outcome(legacy_parse_chapter_response, text)
+        if not _same(new, old):
+            raise SystemExit(f"Mismatch:\n{text}\n--- new: {new}\n--- old: {old}")
+    print(f"Outputs identical on {len(samples)} inputs")
+
+
+def bench(parse, text: str, repeat: int) -> float:
+    """Returns the best time per parse over ``repeat`` rounds."""
+    best = float("inf")
+    for _ in range(repeat):
+        loops = 0
+        started = time.perf_counter()
+        while True:
+            _outcome(parse, text)
+            loops += 1
+            elapsed = time.perf_counter() - started
+            if elapsed > 0.2:
+                break
+        best = min(best, elapsed / loops)
+    return best
+
+
+def make_corpus(size: int) -> list:
+    """A corpus of chapters of varying length, with some unparseable ones."""
+    rng = random.Random(0)
+    corpus = []
+    for _ in range(size):
+        text = make_chapter(rng.randint(3, 8), rng.randint(3, 8), rng.randint(3, 10))
+        corpus.append(mutate(text, rng) if rng.random() < 0.05 else text)
+    return corpus
+
+
+def bench_parse_many(size: int, workers: list) -> None:
+    """Reports parse_many throughput and speed-up per worker count."""
+    corpus = make_corpus(size)
+    megabytes = sum(len(text.encode("utf-8")) for text in corpus) / 1e6
+    print(f"\nparse_many over {size} responses ({megabytes:.1f} MB)")
+    print(f"{'workers':>8} {'chapters/s':>12} {'MB/s':>9} {'speed-up':>9}")
+    baseline = None
+    for count in workers:
+        started = time.perf_counter()
+        parse_many(corpus, workers=count)
+        seconds = time.perf_counter() - started
+        baseline = baseline or seconds
+        print(
+            f"{count:8d} {size / seconds:12.1f} {megabytes / seconds:9.2f}"
+            f" {baseline / seconds:8.2f}x"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--mutations", type=int, default=2000)
+    parser.add_argument("--corpus", type=int, default=0)
+    parser.add_argument("--workers", default="1,2,4")
+    args = parser.parse_args()
+
+    # Parser logging would dominate the measurement
+    structlog.configure(
+        wrapper_class=structlog.make_filtering_bound_logger(logging.CRITICAL)
+    )
+    check(args.mutations)
+
+    print(f"{'input':40} {'impl':8} {'chapters/s':>12} {'MB/s':>9}")
+    for name, build in INPUTS.items():
+        text = build()
+        megabytes = len(text.encode("utf-8")) / 1e6
+        for label, parse in (
+            ("legacy", legacy_parse_chapter_response),
+            ("single", parse_chapter_response),
+        ):
+            seconds = bench(parse, text, args.repeat)
+            print(f"{name:40} {label:8} {1 / seconds:12.1f} {megabytes / seconds:9.2f}")
+
+    if args.corpus:
+        bench_parse_many(args.corpus, [int(n) for n in args.workers.split(",")])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+"""
+Benchmark for rendering guide pages.
+
+Compares rendering from the shared, precompiled environment against
+compiling the templates for every page (what a fresh ``Environment`` per
+guide would cost), and the cold start of a new process with and without the
+persistent bytecode cache. Finally builds a site of ``--site`` guides and
+times an unchanged rebuild and a rebuild with one extra topic
+(``SiteBuild``), then full minified builds with each of ``--workers``
+minify processes and full builds with each ``--fsync`` mode (pass ``--dir``
+to build on the filesystem being evaluated rather than the temp directory).
+
+Usage:
+    python benchmarks/bench_renderer.py [--guides 200] [--site 1000] [--workers 1,2,4]
+        [--fsync none,guide,file] [--dir PATH]
+"""
+
+import argparse
+import logging
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import structlog
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from jinja2 import Environment  # noqa: E402
+
+from benchmarks.bench_parser import make_chapter  # noqa: E402
+from studyguide.engine import StudyGuide  # noqa: E402
+from studyguide.parser import parse_chapter_response  # noqa: E402
+from studyguide.renderer import Renderer, SiteBuild, get_environment  # noqa: E402
+
+_COLD_START = """
+import time, sys
+sys.path.insert(0, {root!r})
+from studyguide.renderer import get_environment
+start = time.perf_counter()
+env = get_environment({templates!r}, {cache!r})
+for name in env.list_templates(extensions=["html"]):
+    env.get_template(name)
+print(time.perf_counter() - start)
+"""
+
+
+def cold_start(cache_dir) -> float:
+    """Seconds a new process takes to load the templates."""
+    code = _COLD_START.format(
+        root=str(ROOT), templates=str(ROOT / "templates"), cache=cache_dir
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    )
+    return float(output.stdout.split()[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--guides", type=int, default=200)
+    parser.add_argument("--site", type=int, default=1000)
+    parser.add_argument("--workers", default="1,2,4")
+    parser.add_argument("--fsync", default="none,guide,file")
+    parser.add_argument("--dir", default=None)
+    args = parser.parse_args()
+
+    structlog.configure(
+        wrapper_class=structlog.make_filtering_bound_logger(logging.CRITICAL)
+    )
+    chapter = parse_chapter_response(make_chapter(5, 20))
+    guide = StudyGuide(topic="Benchmark", chapters=[chapter] * 5)
+    pages = args.guides * (len(guide.chapters) + 1)
+
+    renderer = Renderer(ROOT / "templates", bytecode_cache=False)
+    start = time.perf_counter()
+    for _ in range(args.guides):
+        renderer.render_guide(guide)
+    shared = time.perf_counter() - start
+
+    env = get_environment((ROOT / "templates").resolve())
+    start = time.perf_counter()
+    for _ in range(args.guides):
+        # Same environment configuration, but nothing cached between guides
+        fresh = Environment(
+            loader=env.loader, autoescape=env.autoescape, trim_blocks=True, lstrip_blocks=True
+        )
+        fresh.filters.update(env.filters)
+        fresh.globals.update(env.globals)
+        for compiled, context in renderer.pages(guide).values():
+            fresh.get_template(compiled.name).render(context)
+    recompiled = time.perf_counter() - start
+
+    print(f"{'shared environment':28} {pages / shared:10.0f} pages/s")
+    print(f"{'compile per guide':28} {pages / recompiled:10.0f} pages/s")
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        cold_start(cache_dir)  # populate the bytecode cache
+        print(f"\n{'cold start, no cache':28} {cold_start(None) * 1e3:10.1f} ms")
+        print(f"{'cold start, bytecode cache':28} {cold_start(cache_dir) * 1e3:10.1f} ms")
+
+    print()
+    renderer = Renderer(ROOT / "templates", bytecode_cache=False)
+    guides = [
+        StudyGuide(topic=f"Topic {i}", chapters=guide.chapters) for i in range(args.site + 1)
+    ]
+    with tempfile.TemporaryDirectory() as site_dir:
+        for label, batch in (
+            ("full build", guides[:-1]),
+            ("unchanged rebuild", guides[:-1]),
+            ("rebuild + 1 topic", guides),
+        ):
+            start = time.perf_counter()
+            build = SiteBuild(renderer, site_dir, workers=1)
+            build.publish_assets()
+            for item in batch:
+                build.write_guide(item)
+            build.finish()
+            seconds = time.perf_counter() - start
+            print(
+                f"{label:28} {seconds:10.2f} s  "
+                f"written {build.written}, skipped {build.skipped}"
+            )
+
+    print()
+    for minify, workers in [(False, 1)] + [
+        (True, int(w)) for w in args.workers.split(",")
+    ]:
+        renderer = Renderer(ROOT / "templates", bytecode_cache=False, minify=minify)
+        with tempfile.TemporaryDirectory() as site_dir:
+            start = time.perf_counter()
+            build = SiteBuild(renderer, site_dir, workers=workers)
+            for item in guides[:-1]:
+                build.write_guide(item)
+            build.finish()
+            seconds = time.perf_counter() - start
+        stats = build.minify_stats()
+        label = f"minify, {workers} worker(s)" if minify else "no minify"
+        print(
+            f"{label:28} {build.pages_written / seconds:10.0f} pages/s  "
+            f"{stats['minify_ms_per_page']:.3f} ms/page minify, "
+            f"saved {stats['bytes_saved'] / max(stats['bytes_rendered'], 1):.0%}"
+        )
+
+    print()
+    renderer = Renderer(ROOT / "templates", bytecode_cache=False, minify=False)
+    for fsync in args.fsync.split(","):
+        with tempfile.TemporaryDirectory(dir=args.dir) as site_dir:
+            start = time.perf_counter()
+            build = SiteBuild(renderer, site_dir, workers=1, fsync=fsync)
+            for item in guides[:-1]:
+                build.write_guide(item)
+            build.finish()
+            seconds = time.perf_counter() - start
+        print(f"{'fsync ' + fsync:28} {build.pages_written / seconds:10.0f} pages/s")
+
+
+if __name__ == "__main__":
+    main()
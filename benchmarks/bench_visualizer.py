@@ -0,0 +1,114 @@
+"""
+Benchmark for drawing a guide's structure diagram.
+
+Times the builtin SVG and DOT backends of ``studyguide.visualizer`` against
+parsing the same guide's chapters, a ``DiagramCache`` hit (linking the
+cached file into place), and the cost of importing the optional ``diagrams``
+package in a fresh process, then the throughput of ``render_diagrams``
+(uncached) with one worker and with ``--workers``. With Graphviz installed,
+also times the ``diagrams`` backend writing an SVG.
+
+Usage:
+    python benchmarks/bench_visualizer.py [--chapters 5] [--sections 5] \
+        [--guides 200] [--workers N]
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import timeit
+from pathlib import Path
+
+import structlog
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from benchmarks.bench_parser import make_chapter  # noqa: E402
+from studyguide.config import get_settings  # noqa: E402
+from studyguide.diagram_cache import DiagramCache  # noqa: E402
+from studyguide.diagram_pool import render_diagrams  # noqa: E402
+from studyguide.engine import StudyGuide  # noqa: E402
+from studyguide.parser import parse_chapter_response  # noqa: E402
+from studyguide.visualizer import (  # noqa: E402
+    create_study_guide_diagram,
+    render_dot,
+    render_svg,
+)
+
+
+def report(name: str, func, number: int = 500) -> None:
+    seconds = min(timeit.repeat(func, number=number, repeat=3)) / number
+    print(f"{name:32} {seconds * 1e3:9.3f} ms/guide")
+
+
+def import_seconds(module: str) -> float:
+    code = f"import time; t = time.perf_counter(); import {module}; print(time.perf_counter() - t)"
+    output = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    ).stdout
+    return float(output.split()[-1])
+
+
+def pool_throughput(guides, workers: int) -> float:
+    async def run(out: str) -> int:
+        return sum([r.ok async for r in render_diagrams(guides, Path(out), workers=workers)])
+
+    with tempfile.TemporaryDirectory() as out:
+        start = time.perf_counter()
+        written = asyncio.run(run(out))
+        return written / (time.perf_counter() - start)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--chapters", type=int, default=5)
+    parser.add_argument("--sections", type=int, default=5)
+    parser.add_argument("--guides", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    structlog.configure(
+        wrapper_class=structlog.make_filtering_bound_logger(logging.CRITICAL)
+    )
+    texts = [make_chapter(args.sections) for _ in range(args.chapters)]
+    chapters = [parse_chapter_response(text) for text in texts]
+
+    report("parse chapters", lambda: [parse_chapter_response(t) for t in texts])
+    report("builtin svg", lambda: render_svg(chapters, "Asyncio"))
+    report("builtin dot", lambda: render_dot(chapters, "Asyncio"))
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = DiagramCache(Path(tmp) / "cache")
+        cache.render(chapters, f"{tmp}/warm", "Asyncio", "svg")
+        report(
+            "diagram cache hit (link)",
+            lambda: cache.render(chapters, f"{tmp}/guide", "Asyncio", "svg"),
+        )
+    print(f"{'import diagrams':32} {import_seconds('diagrams') * 1e3:9.3f} ms/process")
+
+    get_settings().app.diagram_cache = False
+    guides = [StudyGuide(topic=f"Topic {i}", chapters=chapters) for i in range(args.guides)]
+    for workers in sorted({1, args.workers}):
+        rate = pool_throughput(guides, workers)
+        print(f"{f'render_diagrams x{workers}':32} {rate:9.0f} guides/s")
+
+    if shutil.which("dot") is None:
+        print("diagrams backend: skipped (Graphviz 'dot' not installed)")
+        return
+    with tempfile.TemporaryDirectory() as out:
+        start = time.perf_counter()
+        for i in range(20):
+            create_study_guide_diagram(
+                chapters, f"{out}/g{i}", output_format="svg", backend="diagrams"
+            )
+        seconds = (time.perf_counter() - start) / 20
+        print(f"{'diagrams backend svg':32} {seconds * 1e3:9.3f} ms/guide")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,81 +1,336 @@
 """Asynchronous API client for interacting with the Perplexity API."""
 
+import asyncio
+import functools
+import hashlib
+import inspect
+import json
+import os
+import weakref
+from typing import Any, AsyncIterator, Callable, Dict, Tuple, TypeVar
+
 import httpx
 import structlog
 from aiocache import Cache, cached
-from aiocache.serializers import JsonSerializer
+from aiocache.serializers import JsonSerializer, MsgPackSerializer
 from tenacity import (
     retry,
+    retry_if_exception,
     retry_if_exception_type,
     stop_after_attempt,
     wait_exponential,
 )
 
-from studyguide.config import settings
+from studyguide import metrics
+from studyguide.budget import CostLedger, estimate_prompt_tokens
+from studyguide.config import get_settings
+from studyguide.disk_cache import SQLiteCache
+from studyguide.rate_limiter import RateLimiter, parse_duration
 
 # Configure logger for this module
 log = structlog.get_logger()
 
+
+def build_cache_key(func: Callable, *args: Any, **kwargs: Any) -> str:
+    """
+    Builds the cache (and single-flight) key for a call to ``func``.
+
+    Arguments are bound to the function signature first, so positional and
+    keyword spellings of the same call share a key. The arguments are hashed
+    to keep keys short regardless of prompt length.
+    """
+    bound = inspect.signature(func).bind(*args, **kwargs)
+    bound.apply_defaults()
+    payload = json.dumps(bound.arguments, sort_keys=True, default=str)
+    digest = hashlib.sha256(payload.encode("utf-8")).hexdigest()
+    return f"{func.__module__}.{func.__name__}:{digest}"
+
+
 # --- Cache Configuration ---
 # Configure cache based on settings (defaults to in-memory)
-# Designed to be easily swappable to Redis by changing config
-cache_config = {
-    "cache": Cache.MEMORY if settings.app.cache_type == "memory" else Cache.REDIS,
-    "serializer": JsonSerializer(),
-    "namespace": "perplexity_api",
-    "ttl": 3600, # Default TTL: 1 hour
+# Swappable to Redis or a persistent local SQLite file by changing config
+_cache_serializers = {
+    "json": JsonSerializer,
+    "msgpack": MsgPackSerializer, # Compact binary; requires `msgpack`
 }
-if settings.app.cache_type == "redis" and settings.app.redis_url:
-    cache_config["endpoint"] = settings.app.redis_url.split(":")[1].replace("//", "")
-    cache_config["port"] = settings.app.redis_url.split(":")[2].split("/")[0]
-    # Add password, db number if needed from URL parsing
-    log.info("Using Redis cache backend", endpoint=cache_config["endpoint"], port=cache_config["port"])
-else:
-    log.info("Using in-memory cache backend")
+
+
+def get_cache_config() -> Dict[str, Any]:
+    """Returns the ``aiocache.cached`` arguments for the configured cache backend."""
+    app = get_settings().app
+    cache_config = {
+        "cache": Cache.MEMORY if app.cache_type == "memory" else Cache.REDIS,
+        "serializer": _cache_serializers[app.cache_serializer](),
+        "namespace": "perplexity_api",
+        "ttl": 3600, # Default TTL: 1 hour
+        "key_builder": build_cache_key,
+        # Responses degraded to fit the budget are not what the key asked for
+        "skip_cache_func": lambda result: "degraded_from" in result,
+    }
+    if app.cache_type == "redis" and app.redis_url:
+        cache_config["endpoint"] = app.redis_url.split(":")[1].replace("//", "")
+        cache_config["port"] = app.redis_url.split(":")[2].split("/")[0]
+        # Add password, db number if needed from URL parsing
+        log.info("Using Redis cache backend", endpoint=cache_config["endpoint"], port=cache_config["port"])
+    elif app.cache_type == "disk":
+        cache_config["cache"] = SQLiteCache
+        cache_config["path"] = str(app.cache_path)
+        cache_config["max_size"] = app.cache_max_size_mb * 1024 * 1024
+        log.info(
+            "Using persistent disk cache backend",
+            path=cache_config["path"],
+            max_size_mb=app.cache_max_size_mb,
+        )
+    else:
+        log.info("Using in-memory cache backend")
+    return cache_config
+
+
+def cached_on_first_call(config: Callable[[], Dict[str, Any]]) -> Callable:
+    """
+    ``aiocache.cached``, configured by calling ``config()`` on the first call
+    instead of when the function is decorated, so importing reads no settings.
+
+    As with ``cached``, the cache is available as ``<function>.cache``, once
+    the function has been called. Lookups and misses are counted in
+    ``metrics``, labelled with the cache namespace.
+    """
+
+    def decorator(func: Callable) -> Callable:
+        decorated = None
+        name = None
+
+        @functools.wraps(func)
+        async def miss(*args: Any, **kwargs: Any) -> Any:
+            metrics.CACHE_MISSES.labels(cache=name).inc()
+            return await func(*args, **kwargs)
+
+        @functools.wraps(func)
+        async def wrapper(*args: Any, **kwargs: Any) -> Any:
+            nonlocal decorated, name
+            if decorated is None:
+                cache_config = config()
+                name = cache_config.get("namespace") or func.__name__
+                decorated = cached(**cache_config)(miss)
+                wrapper.cache = decorated.cache
+            metrics.CACHE_LOOKUPS.labels(cache=name).inc()
+            return await decorated(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
 
 # --- HTTP Client Configuration ---
-# Create a single, shared AsyncClient instance for connection pooling
+# One AsyncClient per event loop (a client's connections belong to the loop
+# that opened them), created on first use. Forked children drop the clients
+# inherited from the parent and open their own.
 # Timeout configuration: 5s connect, 60s read
 _client_timeout = httpx.Timeout(5.0, read=60.0)
-# Follow redirects, use HTTP/2 if available
-async_client = httpx.AsyncClient(
-    base_url="https://api.perplexity.ai", # TODO: Potentially make configurable
-    headers={
-        "Authorization": f"Bearer {settings.api.api_key.get_secret_value()}",
-        "Accept": "application/json",
-        "Content-Type": "application/json",
-    },
-    timeout=_client_timeout,
-    http2=True,
-    follow_redirects=True,
+_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = (
+    weakref.WeakKeyDictionary()
 )
+os.register_at_fork(after_in_child=_clients.clear)
+
+
+def get_async_client() -> httpx.AsyncClient:
+    """
+    Returns the running event loop's shared client, creating it on first use
+    (or after ``close_client``).
+
+    Raises:
+        RuntimeError: If called without a running event loop.
+    """
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None or client.is_closed:
+        # Follow redirects, use HTTP/2 if available
+        client = httpx.AsyncClient(
+            base_url="https://api.perplexity.ai", # TODO: Potentially make configurable
+            headers={
+                "Authorization": f"Bearer {get_settings().api.api_key.get_secret_value()}",
+                "Accept": "application/json",
+                "Content-Type": "application/json",
+            },
+            timeout=_client_timeout,
+            http2=True,
+            follow_redirects=True,
+        )
+        _clients[loop] = client
+    return client
+
+
+# --- Rate Limiting ---
+# Pace requests client-side so batch runs sit just under the provider's limit
+# instead of discovering it through 429s
+@functools.lru_cache(maxsize=None)
+def get_rate_limiter() -> RateLimiter:
+    """Returns the process-wide rate limiter, built from the settings on first use."""
+    app = get_settings().app
+    return RateLimiter(
+        requests_per_second=app.rate_limit_rps,
+        burst=app.rate_limit_burst,
+        tokens_per_minute=app.rate_limit_tpm,
+        max_concurrency=app.max_concurrency,
+    )
+
+
+# --- Budget ---
+# Every attempt reserves its worst-case cost before it is sent, so retries
+# and fan-out are refused (or degraded) once the run's budget is committed
+@functools.lru_cache(maxsize=None)
+def get_ledger() -> CostLedger:
+    """Returns the run's (process-wide) cost ledger, created on first use."""
+    app = get_settings().app
+    return CostLedger(
+        app.token_budget_usd,
+        min_completion_tokens=app.min_completion_tokens,
+    )
+
+
+def _reserve(request_body: dict):
+    """
+    Reserves the request's cost and applies any budget degradation to it.
+
+    Returns:
+        The ledger reservation and the tokens to pre-charge the rate limiter.
+    """
+    prompt_tokens = estimate_prompt_tokens(request_body["messages"])
+    reservation = get_ledger().reserve(
+        request_body["model"], prompt_tokens, request_body["max_tokens"]
+    )
+    request_body["model"] = reservation.model
+    request_body["max_tokens"] = reservation.max_tokens
+    return reservation, prompt_tokens + reservation.max_tokens
+
 
 # --- Retry Configuration ---
 # Retry on common transient HTTP errors and timeouts
 # Exponential backoff: 2s -> 4s -> 8s -> ... up to 60s max wait
+_exponential_wait = wait_exponential(multiplier=1, min=2, max=60)
+
+
+def _wait_for_retry(retry_state) -> float:
+    """Waits as long as a 429's Retry-After asks; exponential back-off otherwise."""
+    error = retry_state.outcome.exception()
+    if isinstance(error, httpx.HTTPStatusError) and error.response.status_code == 429:
+        retry_after = parse_duration(error.response.headers.get("retry-after"))
+        if retry_after is not None:
+            return retry_after
+    return _exponential_wait(retry_state)
+
+
+def _is_retryable_status(error: BaseException) -> bool:
+    """Rate limiting (429) and server errors (5xx) are retried; other 4xx are not."""
+    return isinstance(error, httpx.HTTPStatusError) and (
+        error.response.status_code == 429 or error.response.status_code >= 500
+    )
+
+
+def _before_retry(retry_state) -> None:
+    """Logs and counts a retry before tenacity sleeps."""
+    model = retry_state.kwargs.get("model") or (retry_state.args or ["unknown"])[0]
+    metrics.API_RETRIES.labels(model=model).inc()
+    log.warning(
+        "Retrying API call",
+        attempt=retry_state.attempt_number,
+        wait_time=retry_state.next_action.sleep,
+        error=retry_state.outcome.exception(),
+    )
+
+
 retry_config = {
     "stop": stop_after_attempt(5),
-    "wait": wait_exponential(multiplier=1, min=2, max=60),
+    "wait": _wait_for_retry,
+    # BudgetExceededError is deliberately not retried
     "retry": retry_if_exception_type(
         (
             httpx.TimeoutException,
             httpx.NetworkError,
-            httpx.HTTPStatusError, # Retry on 5xx errors specifically?
-            # Consider adding specific status codes like 500, 502, 503, 504
         )
-    ),
-    "before_sleep": lambda retry_state: log.warning(
-        "Retrying API call",
-        attempt=retry_state.attempt_number,
-        wait_time=retry_state.next_action.sleep,
-        error=retry_state.outcome.exception(),
-    ),
+    )
+    | retry_if_exception(_is_retryable_status),
+    "before_sleep": _before_retry,
     "reraise": True,
 }
 
 
-# --- API Call Function ---
-@cached(**cache_config) # Apply caching decorator
+
+# --- Request Coalescing ---
+# Identical calls that are in flight at the same time share one request.
+# The cache only helps once a response has been stored; this covers the gap.
+class _Flight:
+    """A shared in-flight call and the number of callers awaiting it."""
+
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+_in_flight: Dict[Tuple[asyncio.AbstractEventLoop, str], _Flight] = {}
+
+
+def single_flight(key_builder: Callable[..., str]) -> Callable:
+    """
+    Decorator that coalesces concurrent identical calls into one.
+
+    The first caller for a key starts the call; callers arriving while it is
+    still running await the same task instead of starting their own. Callers
+    receive the same result object and must treat it as read-only. The call
+    is cancelled only when every caller awaiting it has been cancelled.
+
+    Args:
+        key_builder: Builds the coalescing key, with the same signature as an
+            aiocache ``key_builder`` so both layers agree on call identity.
+    """
+
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        async def wrapper(*args: Any, **kwargs: Any) -> Any:
+            flight_key = (asyncio.get_running_loop(), key_builder(func, *args, **kwargs))
+            flight = _in_flight.get(flight_key)
+            if flight is None:
+                flight = _Flight(asyncio.ensure_future(func(*args, **kwargs)))
+                _in_flight[flight_key] = flight
+                flight.task.add_done_callback(
+                    lambda task: _in_flight.pop(flight_key, None)
+                )
+            else:
+                log.info("Coalescing identical in-flight request", key=flight_key[1])
+
+            flight.waiters += 1
+            try:
+                return await asyncio.shield(flight.task)
+            except asyncio.CancelledError:
+                if flight.waiters == 1:
+                    flight.task.cancel()
+                raise
+            finally:
+                flight.waiters -= 1
+
+        return wrapper
+
+    return decorator
+
+
+# --- API Call Functions ---
+def _build_request_body(model: str, prompt: str, system_prompt: str | None) -> dict:
+    """Builds the chat completions request body."""
+    request_body = {
+        "model": model,
+        "messages": [],
+        "max_tokens": get_settings().app.max_completion_tokens,
+    }
+    if system_prompt:
+        request_body["messages"].append({"role": "system", "content": system_prompt})
+    request_body["messages"].append({"role": "user", "content": prompt})
+    return request_body
+
+
+@cached_on_first_call(get_cache_config) # Apply caching decorator
+@single_flight(build_cache_key) # Share identical in-flight calls
 @retry(**retry_config) # Apply retry decorator
 async def ask_perplexity(
     model: str, prompt: str, system_prompt: str | None = None
@@ -83,7 +338,10 @@ async def ask_perplexity(
     """
     Asynchronously sends a request to the Perplexity API chat completions endpoint.
 
-    Handles retries, caching, and error logging.
+    Handles retries, caching, budget enforcement and error logging. Each
+    attempt reserves its worst-case cost first; if the budget is running out
+    the request may be sent to a cheaper model or with a shorter
+    ``max_tokens`` (the result then carries ``degraded_from`` and is not cached).
 
     Args:
         model: The Perplexity model to use (e.g., "sonar-medium-chat").
@@ -96,43 +354,60 @@ async def ask_perplexity(
     Raises:
         httpx.HTTPStatusError: If the API returns an error status code after retries.
         httpx.RequestError: If a network or request-related error occurs after retries.
+        BudgetExceededError: If the call cannot be made within the run's budget.
         Exception: For other unexpected errors during the API call.
     """
-    request_body = {
-        "model": model,
-        "messages": [],
-    }
-    if system_prompt:
-        request_body["messages"].append({"role": "system", "content": system_prompt})
-    request_body["messages"].append({"role": "user", "content": prompt})
+    request_body = _build_request_body(model, prompt, system_prompt)
+    reservation, estimated_tokens = _reserve(request_body)
+    ledger = get_ledger()
 
     log.info(
         "Sending request to Perplexity API",
-        model=model,
+        model=reservation.model,
         # Avoid logging full prompt content by default for privacy/size
         prompt_length=len(prompt),
         system_prompt_present=bool(system_prompt),
     )
 
     try:
-        response = await async_client.post("/chat/completions", json=request_body)
+        async with get_rate_limiter().limit_request(estimated_tokens) as permit:
+            with metrics.track_request(reservation.model) as request:
+                response = await get_async_client().post("/chat/completions", json=request_body)
+                request.status = response.status_code
+            result = response.json() if response.is_success else None
+            permit.observe(
+                response.status_code,
+                response.headers,
+                (result or {}).get("usage", {}).get("total_tokens"),
+            )
         response.raise_for_status() # Raise HTTPStatusError for 4xx/5xx responses
-        result = response.json()
+
+        cost = ledger.commit(reservation, result.get("usage"))
+        metrics.record_usage(reservation.model, result.get("usage"), cost)
+        if reservation.degraded:
+            result["degraded_from"] = model
 
         # Log token usage if available in the response
         if "usage" in result:
             log.info(
                 "Perplexity API call successful",
-                model=model,
+                model=reservation.model,
                 response_id=result.get("id"),
                 usage=result["usage"],
+                cost_usd=round(cost, 6),
             )
         else:
-            log.info("Perplexity API call successful", model=model, response_id=result.get("id"))
+            log.info(
+                "Perplexity API call successful",
+                model=reservation.model,
+                response_id=result.get("id"),
+                cost_usd=round(cost, 6),
+            )
 
         return result
 
     except httpx.HTTPStatusError as e:
+        ledger.release(reservation) # Error responses are not billed
         log.error(
             "Perplexity API returned error status",
             status_code=e.response.status_code,
@@ -143,6 +418,11 @@ async def ask_perplexity(
         )
         raise # Re-raise after logging
     except httpx.RequestError as e:
+        if isinstance(e, httpx.TimeoutException):
+            # The server may have generated (and billed) the completion anyway
+            ledger.commit(reservation)
+        else:
+            ledger.release(reservation)
         log.error(
             "Error during Perplexity API request",
             request_url=str(e.request.url),
@@ -150,15 +430,154 @@ async def ask_perplexity(
             error=e,
         )
         raise # Re-raise after logging
-    except Exception as e:
+    except Exception:
+        ledger.release(reservation)
         log.exception("Unexpected error during Perplexity API call", model=model)
         raise # Re-raise unexpected errors
+    except BaseException:
+        # Cancelled (e.g. a sibling chapter failed): the hold must not outlive the call
+        ledger.release(reservation)
+        raise
+
+
+T = TypeVar("T")
+
+
+async def read_ahead(stream: AsyncIterator[T]) -> AsyncIterator[T]:
+    """
+    Drains ``stream`` on its own task and yields its items as they are taken.
+
+    Whatever the stream holds while it runs (a concurrency slot, a rate
+    limiter permit, an open response) is released when the stream itself
+    ends, rather than when a slow consumer gets round to its last item.
+    Items wait in an unbounded buffer; a chapter's deltas are small.
+    Stopping early cancels the stream; its errors are raised after the
+    items produced before them.
+    """
+    buffer: "asyncio.Queue[Any]" = asyncio.Queue()
+    end = object()
+
+    async def drain() -> None:
+        try:
+            async for item in stream:
+                buffer.put_nowait(item)
+        finally:
+            buffer.put_nowait(end)
+
+    task = asyncio.create_task(drain())
+    try:
+        while (item := await buffer.get()) is not end:
+            yield item
+        await task  # Raises the stream's error, if any
+    finally:
+        if not task.done():
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+
+async def stream_perplexity(
+    model: str, prompt: str, system_prompt: str | None = None
+) -> AsyncIterator[str]:
+    """
+    Streams a chat completion from the Perplexity API as it is generated.
+
+    Consumes the server-sent events stream over the shared HTTP/2 client and
+    yields each content delta as soon as it arrives, so time-to-first-content
+    is the model's first token rather than the full generation time.
+
+    Streamed responses are rate limited and budgeted like ``ask_perplexity``
+    but neither cached nor retried: a partially consumed stream cannot be
+    replayed transparently. The response is read ahead of the consumer
+    (``read_ahead``), so the rate limiter permit and the latency sample end
+    with the last byte, never with the consumer's own pace.
+
+    Args:
+        model: The Perplexity model to use (e.g., "sonar-medium-chat").
+        prompt: The user's prompt/question.
+        system_prompt: An optional system message to guide the model's behavior.
+
+    Yields:
+        Content deltas (text fragments) in order.
+
+    Raises:
+        httpx.HTTPStatusError: If the API returns an error status code.
+        httpx.RequestError: If a network or request-related error occurs.
+        BudgetExceededError: If the call cannot be made within the run's budget.
+    """
+    async for delta in read_ahead(_stream_deltas(model, prompt, system_prompt)):
+        yield delta
+
+
+async def _stream_deltas(
+    model: str, prompt: str, system_prompt: str | None
+) -> AsyncIterator[str]:
+    request_body = _build_request_body(model, prompt, system_prompt)
+    request_body["stream"] = True
+    reservation, estimated_tokens = _reserve(request_body)
+    ledger = get_ledger()
+
+    log.info(
+        "Streaming request to Perplexity API",
+        model=reservation.model,
+        prompt_length=len(prompt),
+        system_prompt_present=bool(system_prompt),
+    )
+
+    usage = None
+    started = False
+    try:
+        async with get_rate_limiter().limit_request(estimated_tokens) as permit:
+            with metrics.track_request(reservation.model, "stream") as request:
+                async with get_async_client().stream(
+                    "POST", "/chat/completions", json=request_body
+                ) as response:
+                    request.status = response.status_code
+                    permit.observe(response.status_code, response.headers)
+                    if not response.is_success:
+                        await response.aread()
+                        log.error(
+                            "Perplexity API returned error status",
+                            status_code=response.status_code,
+                            response_text=response.text,
+                            model=model,
+                        )
+                        response.raise_for_status()
+
+                    started = True
+                    async for line in response.aiter_lines():
+                        if not line.startswith("data:"):
+                            continue # Skip blank keep-alives, comments and other fields
+                        data = line[len("data:"):].strip()
+                        if data == "[DONE]":
+                            break
+                        chunk = json.loads(data)
+                        usage = chunk.get("usage") or usage
+                        for choice in chunk.get("choices", []):
+                            delta = (choice.get("delta") or {}).get("content")
+                            if delta:
+                                yield delta
+
+                    if usage:
+                        permit.tokens_used = usage.get("total_tokens")
+                    log.info("Perplexity API stream complete", model=model, usage=usage)
+    finally:
+        # Once generation has started it is billed, even if the consumer stops
+        # early; without reported usage the reserved worst case is charged
+        if started:
+            metrics.record_usage(reservation.model, usage, ledger.commit(reservation, usage))
+        else:
+            ledger.release(reservation)
 
 
 async def close_client():
-    """Closes the shared httpx.AsyncClient."""
-    if not async_client.is_closed:
-        await async_client.aclose()
+    """
+    Closes the running event loop's httpx.AsyncClient, if it has one.
+
+    A later call on the same loop opens a new client.
+    """
+    client = _clients.pop(asyncio.get_running_loop(), None)
+    if client is not None and not client.is_closed:
+        await client.aclose()
         log.info("HTTPX AsyncClient closed.")
 
 
@@ -171,7 +590,7 @@ if __name__ == "__main__":
         # Ensure logging is configured
         configure_logging(log_level="DEBUG")
         # Ensure PPLX_API_KEY is set in environment or .env file
-        if not settings.api.api_key.get_secret_value():
+        if not get_settings().api.api_key.get_secret_value():
              log.error("PPLX_API_KEY environment variable not set.")
              return
 
@@ -0,0 +1,121 @@
+"""
+Static asset pipeline: content-hashed file names, published once per site.
+
+Every file under the asset directory (except build inputs such as the
+Tailwind source) is fingerprinted with a hash of its content, e.g.
+``tailwind.css`` becomes ``_static/tailwind.3f9c2a7b1d.css``. A fingerprinted
+file never changes, so it can be cached forever; when the content changes,
+so does its name.
+
+Published files are hard-linked from a content-addressed store (falling back
+to a copy where links are not possible, e.g. across filesystems), so any
+number of sites share one copy on disk. Links are made from the store rather
+than the source, so rebuilding a source asset in place can never alter a
+file that was already published under its old fingerprint.
+"""
+
+import functools
+import hashlib
+import os
+import shutil
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+import structlog
+from pydantic import BaseModel, Field
+
+from studyguide.files import replace_atomic
+
+logger = structlog.get_logger()
+
+# Guides live in <site>/<slug>/; a slug never starts with "_", so no topic
+# can claim (and replace) the asset directory
+STATIC_DIR = "_static"
+# Build inputs that live in the asset directory but are never published
+SOURCE_ASSETS = frozenset({"input.css"})
+_FINGERPRINT_LENGTH = 10
+
+
+class Asset(BaseModel):
+    """A static file and its content fingerprint."""
+
+    name: str = Field(..., description="Path relative to the asset directory.")
+    source: Path = Field(..., description="The source file.")
+    digest: str = Field(..., description="Hex BLAKE2b hash of the content.")
+
+    @property
+    def filename(self) -> str:
+        """The fingerprinted path, e.g. ``tailwind.3f9c2a7b1d.css``."""
+        path = Path(self.name)
+        fingerprint = self.digest[:_FINGERPRINT_LENGTH]
+        return path.with_name(f"{path.stem}.{fingerprint}{path.suffix}").as_posix()
+
+
+def fingerprint_assets(asset_dir: Path) -> Dict[str, Asset]:
+    """
+    Fingerprints every publishable file under ``asset_dir``.
+
+    Hidden files and ``SOURCE_ASSETS`` are skipped. A missing directory has
+    no assets.
+
+    Returns:
+        Assets keyed by their path relative to ``asset_dir``.
+    """
+    asset_dir = Path(asset_dir)
+    if not asset_dir.is_dir():
+        return {}
+    assets = {}
+    for source in sorted(asset_dir.rglob("*")):
+        name = source.relative_to(asset_dir).as_posix()
+        if (
+            not source.is_file()
+            or source.name in SOURCE_ASSETS
+            or any(part.startswith(".") for part in Path(name).parts)
+        ):
+            continue
+        digest = hashlib.blake2b(source.read_bytes(), digest_size=16).hexdigest()
+        assets[name] = Asset(name=name, source=source, digest=digest)
+    return assets
+
+
+def publish_assets(
+    assets: Iterable[Asset], static_dir: Path, store_dir: Optional[Path] = None
+) -> List[Path]:
+    """
+    Publishes assets to ``static_dir`` under their fingerprinted names.
+
+    Files already present are skipped: a fingerprinted name identifies its
+    content.
+
+    Args:
+        assets: The assets to publish.
+        static_dir: The site's static directory.
+        store_dir: Content-addressed store to hard-link from; ``None`` copies
+            from the source instead.
+
+    Returns:
+        The files created.
+    """
+    created = []
+    for asset in assets:
+        target = Path(static_dir) / asset.filename
+        if target.exists():
+            continue
+        target.parent.mkdir(parents=True, exist_ok=True)
+        linked = False
+        if store_dir is not None:
+            stored = Path(store_dir) / asset.filename
+            if not stored.exists():
+                stored.parent.mkdir(parents=True, exist_ok=True)
+                replace_atomic(stored, functools.partial(shutil.copyfile, asset.source))
+            try:
+                os.link(stored, target)
+                linked = True
+            except OSError as e:
+                logger.debug("Hard link not possible; copying asset", path=str(target), error=str(e))
+        if not linked:
+            replace_atomic(target, functools.partial(shutil.copyfile, asset.source))
+        created.append(target)
+    if created:
+        logger.info("Published static assets", static_dir=str(static_dir), count=len(created))
+    return created
@@ -0,0 +1,237 @@
+"""
+Batch generation of many study guides in a single process.
+
+All guides run through one Engine, and therefore through the single shared
+``api_client.get_async_client()`` connection pool and the same response cache.
+"""
+
+import asyncio
+import hashlib
+from collections import defaultdict
+from pathlib import Path
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Set
+
+import structlog
+from pydantic import BaseModel, Field
+
+from studyguide.diagram_pool import DiagramPool
+from studyguide.engine import Engine, StudyGuide, slugify
+from studyguide.renderer import Renderer, SiteBuild
+
+logger = structlog.get_logger()
+
+
+class BatchResult(BaseModel):
+    """The outcome of generating one guide in a batch."""
+
+    topic: str = Field(..., description="The topic that was generated.")
+    guide: Optional[StudyGuide] = Field(
+        None, description="The generated guide, if generation succeeded."
+    )
+    error: Optional[str] = Field(
+        None, description="The error message, if generation failed."
+    )
+    output_path: Optional[Path] = Field(
+        None, description="Where the guide was written, if it was written."
+    )
+    site_path: Optional[Path] = Field(
+        None, description="Directory of the guide's HTML pages, if rendered."
+    )
+    diagram_path: Optional[Path] = Field(
+        None, description="The guide's structure diagram, if drawn."
+    )
+
+    @property
+    def ok(self) -> bool:
+        """Whether the guide was generated successfully."""
+        return self.error is None
+
+
+def load_topics(path: Path) -> List[str]:
+    """
+    Reads one topic per line from a file.
+
+    Blank lines and lines starting with ``#`` are ignored, and duplicate topics
+    are dropped (keeping the first occurrence).
+
+    Args:
+        path: Path to the topics file.
+
+    Returns:
+        The topics, in file order.
+    """
+    topics: List[str] = []
+    seen: Set[str] = set()
+    for line in Path(path).read_text(encoding="utf-8").splitlines():
+        topic = line.strip()
+        if not topic or topic.startswith("#") or topic in seen:
+            continue
+        seen.add(topic)
+        topics.append(topic)
+    logger.info("Loaded batch topics", path=str(path), count=len(topics))
+    return topics
+
+
+def assign_slugs(topics: Iterable[str]) -> Dict[str, str]:
+    """
+    Gives every topic a distinct slug for its output files.
+
+    A topic keeps ``slugify(topic)`` unless another topic maps to the same
+    slug (e.g. "C++" and "C#" both give "c"). Every topic of such a group
+    then gets a short hash of the topic appended, so which topic gets which
+    name never depends on the order of the topics.
+
+    Returns:
+        The slug of each topic.
+    """
+    groups: Dict[str, List[str]] = defaultdict(list)
+    for topic in dict.fromkeys(topics):
+        groups[slugify(topic)].append(topic)
+    slugs = {}
+    for slug, group in groups.items():
+        if len(group) == 1:
+            slugs[group[0]] = slug
+            continue
+        logger.warning("Topics share a slug; suffixing each with a hash", slug=slug, topics=group)
+        for topic in group:
+            digest = hashlib.blake2b(topic.encode("utf-8"), digest_size=4).hexdigest()
+            slugs[topic] = f"{slug}-{digest}"
+    return slugs
+
+
+async def iter_batch(
+    engine: Engine,
+    topics: Iterable[str],
+    max_guides: Optional[int] = None,
+) -> AsyncIterator[BatchResult]:
+    """
+    Generates guides for many topics, yielding each one as soon as it finishes.
+
+    At most ``max_guides`` guides are in progress at once (defaults to the
+    engine's ``max_concurrency``), so a large topic list never creates
+    thousands of pending tasks. API concurrency is still bounded by the
+    engine itself. A failing topic is reported as a result with ``error`` set
+    and does not abort the batch.
+
+    Args:
+        engine: The engine shared by every guide in the batch.
+        topics: Topics to generate.
+        max_guides: Maximum number of guides in progress at once.
+
+    Yields:
+        A BatchResult per topic, in completion order.
+    """
+    max_guides = max_guides or engine.max_concurrency
+    pending = iter(topics)
+    running: Set[asyncio.Task] = set()
+
+    def start_next() -> None:
+        topic = next(pending, None)
+        if topic is not None:
+            running.add(asyncio.create_task(_generate(engine, topic)))
+
+    for _ in range(max_guides):
+        start_next()
+
+    try:
+        while running:
+            done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                running.discard(task)
+                start_next()
+                yield task.result()
+    finally:
+        for task in running:
+            task.cancel()
+        await asyncio.gather(*running, return_exceptions=True)
+
+
+async def run_batch(
+    engine: Engine,
+    topics: Iterable[str],
+    output_dir: Path,
+    max_guides: Optional[int] = None,
+    renderer: Optional[Renderer] = None,
+    diagrams: Optional[DiagramPool] = None,
+) -> AsyncIterator[BatchResult]:
+    """
+    Generates guides and writes each one to ``output_dir/<slug>.json``, with
+    slugs from ``assign_slugs`` so no two topics share files.
+
+    With ``diagrams``, each guide's structure diagram is also drawn to
+    ``output_dir/<slug>.<format>`` through the diagram cache, so a rerun
+    over unchanged guides never starts the diagram backend. A diagram that
+    fails to draw is logged; the guide still counts as generated.
+
+    With a ``renderer``, each guide's HTML pages are also written to
+    ``output_dir/<slug>/`` (and the fingerprinted static assets to
+    ``output_dir/_static``) as an incremental ``SiteBuild``: only pages whose
+    inputs changed since the previous run are rewritten. Pages of failed guides are kept; pages of
+    guides no longer in ``topics`` are deleted once the whole batch is done.
+    Results are streamed out as each guide finishes and has been written.
+
+    Args:
+        engine: The engine shared by every guide in the batch.
+        topics: Topics to generate.
+        output_dir: Directory the guide JSON files are written to.
+        max_guides: Maximum number of guides in progress at once.
+        renderer: Renders the guides to HTML; one renderer (and its compiled
+            templates) is shared by the whole batch.
+        diagrams: Draws the guides' diagrams; the caller owns (and closes)
+            the pool.
+
+    Yields:
+        A BatchResult per topic, with ``output_path`` set for written guides.
+    """
+    topics = list(topics)
+    slugs = assign_slugs(topics)
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    site = None
+    if renderer is not None:
+        site = await asyncio.to_thread(SiteBuild, renderer, output_dir)
+        await asyncio.to_thread(site.publish_assets)
+    succeeded = failed = 0
+    completed = False
+
+    try:
+        async for result in iter_batch(engine, topics, max_guides=max_guides):
+            if result.ok:
+                result.guide.slug = slugs[result.topic]
+                path = output_dir / f"{result.guide.slug}.json"
+                await asyncio.to_thread(
+                    path.write_text, result.guide.model_dump_json(), encoding="utf-8"
+                )
+                result.output_path = path
+                if site is not None:
+                    await asyncio.to_thread(site.write_guide, result.guide)
+                    result.site_path = output_dir / result.guide.slug
+                if diagrams is not None:
+                    try:
+                        result.diagram_path = await diagrams.render(result.guide, output_dir)
+                    except Exception as e:
+                        logger.error(
+                            "Diagram rendering failed in batch", topic=result.topic, error=str(e)
+                        )
+                succeeded += 1
+            else:
+                if site is not None:
+                    site.keep_guide(slugs[result.topic])
+                failed += 1
+            yield result
+        completed = True
+    finally:
+        if site is not None:
+            # Only a complete batch knows which guides are gone for good
+            await asyncio.to_thread(site.finish, prune=completed)
+
+    logger.info("Batch complete", succeeded=succeeded, failed=failed)
+
+
+async def _generate(engine: Engine, topic: str) -> BatchResult:
+    try:
+        guide = await engine.generate_guide(topic)
+    except Exception as e:
+        logger.error("Guide generation failed in batch", topic=topic, error=str(e))
+        return BatchResult(topic=topic, error=str(e))
+    return BatchResult(topic=topic, guide=guide)
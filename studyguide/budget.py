@@ -0,0 +1,272 @@
+"""
+Token budget enforcement and cost accounting for Perplexity API calls.
+
+Every request reserves its worst-case cost (prompt estimate plus the full
+``max_tokens`` completion) from a per-run ``CostLedger`` before it is sent,
+and settles the reservation with the actual ``usage`` reported by the API.
+When a request would take the run over budget it is degraded to a cheaper
+model or a shorter completion, and refused with ``BudgetExceededError`` if
+nothing fits. Because each retry attempt makes its own reservation, a retry
+storm runs into the budget instead of past it.
+"""
+
+from typing import Dict, List, Mapping, Optional
+
+import structlog
+from pydantic import BaseModel, Field
+
+logger = structlog.get_logger()
+
+
+class ModelPrice(BaseModel):
+    """Price of a model in USD."""
+
+    input_per_million: float = Field(..., ge=0)
+    output_per_million: float = Field(..., ge=0)
+    per_request: float = Field(0.0, ge=0, description="Flat fee per request")
+
+    def cost(self, prompt_tokens: int, completion_tokens: int) -> float:
+        """Returns the cost in USD of a request with the given token counts."""
+        return (
+            self.per_request
+            + prompt_tokens * self.input_per_million / 1_000_000
+            + completion_tokens * self.output_per_million / 1_000_000
+        )
+
+
+# Published Perplexity prices; update when the provider's pricing changes
+MODEL_PRICES: Dict[str, ModelPrice] = {
+    "sonar-small-chat": ModelPrice(input_per_million=0.2, output_per_million=0.2),
+    "sonar-medium-chat": ModelPrice(input_per_million=0.6, output_per_million=0.6),
+    "sonar-small-online": ModelPrice(
+        input_per_million=0.2, output_per_million=0.2, per_request=0.005
+    ),
+    "sonar-medium-online": ModelPrice(
+        input_per_million=0.6, output_per_million=0.6, per_request=0.005
+    ),
+    "sonar": ModelPrice(input_per_million=1.0, output_per_million=1.0, per_request=0.005),
+    "sonar-pro": ModelPrice(
+        input_per_million=3.0, output_per_million=15.0, per_request=0.005
+    ),
+    "sonar-reasoning": ModelPrice(
+        input_per_million=1.0, output_per_million=5.0, per_request=0.005
+    ),
+    "sonar-reasoning-pro": ModelPrice(
+        input_per_million=2.0, output_per_million=8.0, per_request=0.005
+    ),
+}
+# Models are degraded to the next entry when the budget runs low
+CHEAPER_MODEL: Dict[str, str] = {
+    "sonar-medium-chat": "sonar-small-chat",
+    "sonar-medium-online": "sonar-small-online",
+    "sonar-pro": "sonar",
+    "sonar-reasoning-pro": "sonar-reasoning",
+}
+# Unknown models are priced pessimistically rather than for free
+FALLBACK_PRICE = ModelPrice(input_per_million=15.0, output_per_million=15.0, per_request=0.005)
+
+
+def price_for(model: str) -> ModelPrice:
+    """Returns the price table entry for ``model``."""
+    price = MODEL_PRICES.get(model)
+    if price is None:
+        logger.warning("No price known for model; using fallback price", model=model)
+        return FALLBACK_PRICE
+    return price
+
+
+def estimate_prompt_tokens(messages: List[Mapping[str, str]]) -> int:
+    """Estimates the prompt tokens of a chat request (~4 characters per token)."""
+    return sum(len(m["content"]) for m in messages) // 4
+
+
+class BudgetExceededError(Exception):
+    """Raised when a request cannot be made without exceeding the run's budget."""
+
+
+class Reservation(BaseModel):
+    """Worst-case cost held against the budget while a request is in flight."""
+
+    model: str
+    requested_model: str
+    max_tokens: int
+    prompt_tokens: int
+    estimated_usd: float
+    # Set once the hold is returned (released or committed); settles only once
+    settled: bool = False
+
+    @property
+    def degraded(self) -> bool:
+        """Whether the request was downgraded to a cheaper model."""
+        return self.model != self.requested_model
+
+
+class CostLedger:
+    """
+    Tracks spend for one run and enforces its budget.
+
+    Not thread-safe; intended for use from a single event loop, where
+    ``reserve`` and ``commit`` never interleave because they do not await.
+
+    Args:
+        budget_usd: Maximum spend for the run; ``0``/None disables enforcement
+            (costs are still recorded).
+        min_completion_tokens: ``max_tokens`` is never shortened below this
+            when degrading a request.
+    """
+
+    def __init__(self, budget_usd: Optional[float], min_completion_tokens: int = 512):
+        self.budget_usd = budget_usd or None
+        self.min_completion_tokens = min_completion_tokens
+        self.spent_usd = 0.0
+        self.reserved_usd = 0.0
+        self.calls = 0
+        self.usage: Dict[str, Dict[str, int]] = {}
+
+    @property
+    def remaining_usd(self) -> Optional[float]:
+        """Budget left after spend and outstanding reservations."""
+        if self.budget_usd is None:
+            return None
+        return self.budget_usd - self.spent_usd - self.reserved_usd
+
+    def _fits(self, cost: float) -> bool:
+        remaining = self.remaining_usd
+        return remaining is None or cost <= remaining
+
+    def reserve(self, model: str, prompt_tokens: int, max_tokens: int) -> Reservation:
+        """
+        Reserves the worst-case cost of a request.
+
+        Tries, in order: the requested model with the full ``max_tokens``;
+        cheaper models with the full ``max_tokens``; then each model with
+        ``max_tokens`` shortened to what the remaining budget allows (but not
+        below ``min_completion_tokens``).
+
+        Returns:
+            The reservation; send the request with its ``model`` and ``max_tokens``.
+
+        Raises:
+            BudgetExceededError: If no option fits in the remaining budget.
+        """
+        candidates = [model]
+        while candidates[-1] in CHEAPER_MODEL:
+            candidates.append(CHEAPER_MODEL[candidates[-1]])
+
+        choice = None
+        for candidate in candidates:
+            cost = price_for(candidate).cost(prompt_tokens, max_tokens)
+            if self._fits(cost):
+                choice = (candidate, max_tokens, cost)
+                break
+        else:
+            for candidate in candidates:
+                tokens = self._affordable_completion(candidate, prompt_tokens)
+                if tokens >= min(self.min_completion_tokens, max_tokens):
+                    tokens = min(tokens, max_tokens)
+                    cost = price_for(candidate).cost(prompt_tokens, tokens)
+                    choice = (candidate, tokens, cost)
+                    break
+
+        if choice is None:
+            logger.error(
+                "Token budget exhausted; refusing API call",
+                model=model,
+                budget_usd=self.budget_usd,
+                spent_usd=round(self.spent_usd, 6),
+                reserved_usd=round(self.reserved_usd, 6),
+            )
+            raise BudgetExceededError(
+                f"Request to {model} would exceed the ${self.budget_usd:.2f} budget "
+                f"(${self.spent_usd:.4f} spent, ${self.reserved_usd:.4f} reserved)"
+            )
+
+        reservation = Reservation(
+            model=choice[0],
+            requested_model=model,
+            max_tokens=choice[1],
+            prompt_tokens=prompt_tokens,
+            estimated_usd=choice[2],
+        )
+        if reservation.degraded or reservation.max_tokens < max_tokens:
+            logger.warning(
+                "Degrading API call to stay within budget",
+                requested_model=model,
+                model=reservation.model,
+                max_tokens=reservation.max_tokens,
+                remaining_usd=round(self.remaining_usd, 6),
+            )
+        self.reserved_usd += reservation.estimated_usd
+        return reservation
+
+    def _affordable_completion(self, model: str, prompt_tokens: int) -> int:
+        price = price_for(model)
+        left = self.remaining_usd - price.cost(prompt_tokens, 0)
+        if left <= 0:
+            return 0
+        if not price.output_per_million:
+            return 2**31
+        return int(left * 1_000_000 / price.output_per_million)
+
+    def commit(
+        self, reservation: Reservation, usage: Optional[Mapping[str, int]] = None
+    ) -> float:
+        """
+        Settles a reservation with the request's reported ``usage``.
+
+        Without usage the reserved worst case is charged.
+
+        Returns:
+            The cost charged in USD.
+
+        Raises:
+            ValueError: If the reservation was already released or committed.
+        """
+        if reservation.settled:
+            raise ValueError("Reservation already settled; it cannot be charged again")
+        self.release(reservation)
+        if usage:
+            prompt_tokens = usage.get("prompt_tokens", reservation.prompt_tokens)
+            completion_tokens = usage.get("completion_tokens", 0)
+            cost = price_for(reservation.model).cost(prompt_tokens, completion_tokens)
+        else:
+            prompt_tokens, completion_tokens = reservation.prompt_tokens, reservation.max_tokens
+            cost = reservation.estimated_usd
+
+        self.spent_usd += cost
+        self.calls += 1
+        totals = self.usage.setdefault(
+            reservation.model, {"prompt_tokens": 0, "completion_tokens": 0, "calls": 0}
+        )
+        totals["prompt_tokens"] += prompt_tokens
+        totals["completion_tokens"] += completion_tokens
+        totals["calls"] += 1
+        logger.debug(
+            "Recorded API call cost",
+            model=reservation.model,
+            cost_usd=round(cost, 6),
+            spent_usd=round(self.spent_usd, 6),
+        )
+        return cost
+
+    def release(self, reservation: Reservation) -> None:
+        """
+        Returns a reservation's hold to the budget (e.g. the request failed).
+
+        Releasing a reservation that is already settled does nothing, so an
+        error raised after ``commit`` never returns the hold twice.
+        """
+        if reservation.settled:
+            return
+        reservation.settled = True
+        # Only float rounding can take the total below zero
+        self.reserved_usd = max(0.0, self.reserved_usd - reservation.estimated_usd)
+
+    def summary(self) -> dict:
+        """Returns spend and per-model token totals for reporting."""
+        return {
+            "budget_usd": self.budget_usd,
+            "spent_usd": round(self.spent_usd, 6),
+            "calls": self.calls,
+            "usage": {model: dict(totals) for model, totals in self.usage.items()},
+        }
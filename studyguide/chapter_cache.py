@@ -0,0 +1,186 @@
+"""
+Content-addressed cache of parsed chapters.
+
+Maps a hash of the raw completion text to its parsed ``Chapter``, so a rerun
+served from the API response cache does no regex or validation work. Two
+tiers:
+
+* memory: an LRU of ``Chapter`` objects (no decoding on a hit);
+* disk: one file per entry in ``serialization``'s compressed binary format,
+  under a directory named after the parser and format versions.
+
+The versions are part of both the hash and the directory name, so bumping
+``parser.PARSER_VERSION`` (or ``serialization.FORMAT_VERSION``) invalidates
+every entry; directories left behind by other versions are removed the first
+time the disk tier is written to. Parse failures are never cached.
+"""
+
+import functools
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional
+
+import structlog
+
+from studyguide import metrics
+from studyguide.config import get_settings
+from studyguide.files import prune_versions, write_atomic
+from studyguide.parser import PARSER_VERSION, Chapter, parse_chapter_response
+from studyguide.serialization import (
+    FORMAT_VERSION,
+    SerializationError,
+    decode_chapter,
+    encode_chapter,
+)
+
+logger = structlog.get_logger()
+
+_VERSION = f"v{PARSER_VERSION}.{FORMAT_VERSION}"
+# Only directories named like a version are ever pruned, so pointing the cache
+# at a shared directory cannot delete anything else in it
+_VERSION_DIR = re.compile(r"v\d+\.\d+")
+
+
+def content_key(text: str) -> str:
+    """Returns the cache key for a raw completion text."""
+    digest = hashlib.blake2b(_VERSION.encode(), digest_size=16)
+    digest.update(b"\0")
+    digest.update(text.encode("utf-8"))
+    return digest.hexdigest()
+
+
+class ChapterCache:
+    """
+    Two-tier (memory LRU + disk) cache of parsed chapters.
+
+    Thread-safe, so it can be used from ``asyncio.to_thread`` workers.
+    Returned chapters are shared between callers and must not be mutated.
+
+    Args:
+        max_entries: Chapters kept in memory; ``0`` disables the memory tier.
+        directory: Root of the disk tier; ``None`` disables it.
+    """
+
+    def __init__(self, max_entries: int = 512, directory: Optional[Path] = None):
+        self.max_entries = max_entries
+        self.directory = Path(directory) if directory is not None else None
+        self.hits = {"memory": 0, "disk": 0}
+        self.misses = 0
+        self._entries: "OrderedDict[str, Chapter]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._pruned = False
+
+    def parse(self, text: str) -> Chapter:
+        """
+        Returns the parsed chapter for ``text``, parsing it only on a miss.
+
+        Raises:
+            ParseError: If ``text`` cannot be parsed (the failure is not cached).
+        """
+        key = content_key(text)
+        chapter = self._get(key)
+        if chapter is None:
+            chapter = parse_chapter_response(text)
+            self._put(key, chapter)
+        return chapter
+
+    def get(self, text: str) -> Optional[Chapter]:
+        """Returns the cached chapter for ``text``, or None."""
+        return self._get(content_key(text))
+
+    def put(self, text: str, chapter: Chapter) -> None:
+        """Caches ``chapter`` as the parse result of ``text``."""
+        self._put(content_key(text), chapter)
+
+    def clear(self) -> None:
+        """Drops the memory tier (disk entries are kept)."""
+        with self._lock:
+            self._entries.clear()
+
+    def _get(self, key: str) -> Optional[Chapter]:
+        metrics.CACHE_LOOKUPS.labels(cache="chapters").inc()
+        with self._lock:
+            chapter = self._entries.get(key)
+            if chapter is not None:
+                self._entries.move_to_end(key)
+                self.hits["memory"] += 1
+                return chapter
+
+        chapter = self._read(key)
+        with self._lock:
+            if chapter is None:
+                self.misses += 1
+            else:
+                self.hits["disk"] += 1
+        if chapter is None:
+            metrics.CACHE_MISSES.labels(cache="chapters").inc()
+            return None
+        self._remember(key, chapter)
+        return chapter
+
+    def _put(self, key: str, chapter: Chapter) -> None:
+        self._remember(key, chapter)
+        self._write(key, chapter)
+
+    def _remember(self, key: str, chapter: Chapter) -> None:
+        if not self.max_entries:
+            return
+        with self._lock:
+            self._entries[key] = chapter
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    # --- Disk tier ---
+
+    def _path(self, key: str) -> Path:
+        return self.directory / _VERSION / key[:2] / f"{key}.bin"
+
+    def _read(self, key: str) -> Optional[Chapter]:
+        if self.directory is None:
+            return None
+        path = self._path(key)
+        try:
+            payload = path.read_bytes()
+        except FileNotFoundError:
+            return None
+        except OSError as e:
+            logger.warning("Chapter cache read failed", path=str(path), error=str(e))
+            return None
+        try:
+            return decode_chapter(payload)
+        except (SerializationError, ValueError, IndexError, KeyError) as e:
+            logger.warning("Discarding corrupt chapter cache entry", path=str(path), error=str(e))
+            path.unlink(missing_ok=True)
+            return None
+
+    def _write(self, key: str, chapter: Chapter) -> None:
+        if self.directory is None:
+            return
+        self._prune_other_versions()
+        path = self._path(key)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # Readers never see a partial entry
+            write_atomic(path, encode_chapter(chapter, compress=True))
+        except (OSError, SerializationError) as e:
+            logger.warning("Chapter cache write failed", path=str(path), error=str(e))
+
+    def _prune_other_versions(self) -> None:
+        if self._pruned:
+            return
+        self._pruned = True
+        prune_versions(self.directory, _VERSION, _VERSION_DIR)
+
+
+@functools.lru_cache(maxsize=None)
+def get_default_cache() -> ChapterCache:
+    """Returns the process-wide cache used by Engine unless another is passed in."""
+    app = get_settings().app
+    return ChapterCache(
+        max_entries=app.chapter_cache_entries,
+        directory=app.chapter_cache_dir if app.chapter_cache_disk else None,
+    )
@@ -0,0 +1,179 @@
+"""
+Command line interface for the Study Guide Generator.
+
+Only Typer and the standard library are imported at module level. The
+settings, logging, API client, engine and renderer are imported inside the
+commands that use them, so ``--help`` and ``--version`` never load them.
+Metrics (and ``prometheus_client``) are only loaded when an export option
+is given.
+"""
+
+from pathlib import Path
+from typing import List, Optional
+
+import typer
+
+app = typer.Typer(help="AI-Powered Study Guide Generator.")
+
+
+def _version() -> str:
+    from importlib import metadata
+
+    try:
+        return metadata.version("studyguide")
+    except metadata.PackageNotFoundError:
+        # Running from a source checkout
+        return "unknown"
+
+
+def _print_version(value: bool) -> None:
+    if value:
+        typer.echo(f"studyguide {_version()}")
+        raise typer.Exit()
+
+
+@app.callback()
+def main(
+    ctx: typer.Context,
+    log_level: str = typer.Option("INFO", help="Minimum log level to output."),
+    log_queue: bool = typer.Option(
+        False, help="Render and write logs on a background thread."
+    ),
+    log_overflow: str = typer.Option(
+        "block",
+        help="When the log queue is full: 'block', or 'drop' records below WARNING.",
+    ),
+    log_sample: List[str] = typer.Option(
+        [],
+        metavar="EVENT=RATE",
+        help="Keep only this fraction of an event below WARNING (repeatable).",
+    ),
+    metrics_port: Optional[int] = typer.Option(
+        None,
+        min=1,
+        max=65535,
+        help="Serve Prometheus metrics on http://127.0.0.1:PORT/metrics while running.",
+    ),
+    metrics_file: Optional[Path] = typer.Option(
+        None,
+        dir_okay=False,
+        help="Write Prometheus metrics to this file on exit (node exporter textfile).",
+    ),
+    version: bool = typer.Option(
+        False,
+        "--version",
+        callback=_print_version,
+        is_eager=True,
+        help="Show the version and exit.",
+    ),
+) -> None:
+    """Generate study guides with the Perplexity API."""
+    from studyguide.logging_config import configure_logging, parse_sample_rates
+
+    try:
+        sample_rates = parse_sample_rates(log_sample)
+    except ValueError as e:
+        raise typer.BadParameter(str(e), param_hint="--log-sample") from e
+    try:
+        configure_logging(
+            log_level=log_level,
+            use_queue=log_queue,
+            overflow=log_overflow,
+            sample_rates=sample_rates,
+        )
+    except ValueError as e:
+        raise typer.BadParameter(str(e), param_hint="--log-overflow/--log-sample") from e
+
+    if metrics_port is None and metrics_file is None:
+        return
+    from studyguide import metrics
+
+    try:
+        metrics.enable()
+        if metrics_port is not None:
+            metrics.start_http_server(metrics_port)
+    except (ImportError, OSError) as e:
+        raise typer.BadParameter(str(e), param_hint="--metrics-port/--metrics-file") from e
+    if metrics_file is not None:
+        ctx.call_on_close(lambda: metrics.write_textfile(metrics_file))
+
+
+@app.command()
+def batch(
+    topics_file: Path = typer.Argument(
+        ..., exists=True, dir_okay=False, help="File with one topic per line."
+    ),
+    output_dir: Path = typer.Option(
+        Path("output"), help="Directory the generated guides are written to."
+    ),
+    model: Optional[str] = typer.Option(
+        None, help="Perplexity model to use [default: engine.DEFAULT_MODEL]."
+    ),
+    max_concurrency: Optional[int] = typer.Option(
+        None, min=1, help="Global cap on concurrent API calls."
+    ),
+    per_guide_concurrency: Optional[int] = typer.Option(
+        None, min=1, help="Cap on concurrent API calls for any single guide."
+    ),
+    max_guides: Optional[int] = typer.Option(
+        None, min=1, help="Maximum number of guides in progress at once."
+    ),
+    html: bool = typer.Option(
+        False, help="Also render each guide to HTML pages under OUTPUT_DIR/<slug>/."
+    ),
+    diagrams: bool = typer.Option(
+        False, help="Also draw each guide's structure diagram to OUTPUT_DIR/<slug>.svg."
+    ),
+) -> None:
+    """Generate a guide for every topic in TOPICS_FILE in a single process."""
+    import asyncio
+
+    from studyguide import api_client
+    from studyguide.batch import load_topics, run_batch
+    from studyguide.diagram_pool import DiagramPool
+    from studyguide.engine import DEFAULT_MODEL, Engine
+    from studyguide.renderer import Renderer
+
+    topics = load_topics(topics_file)
+    engine = Engine(
+        model=model or DEFAULT_MODEL,
+        max_concurrency=max_concurrency,
+        per_guide_concurrency=per_guide_concurrency,
+    )
+    renderer = Renderer() if html else None
+
+    async def _run() -> int:
+        failed = 0
+        pool = DiagramPool() if diagrams else None
+        try:
+            async for result in run_batch(
+                engine,
+                topics,
+                output_dir,
+                max_guides=max_guides,
+                renderer=renderer,
+                diagrams=pool,
+            ):
+                if result.ok:
+                    typer.echo(f"ok\t{result.topic}\t{result.output_path}")
+                else:
+                    failed += 1
+                    typer.echo(f"failed\t{result.topic}\t{result.error}", err=True)
+        finally:
+            if pool is not None:
+                await pool.close()
+            await api_client.close_client()
+            typer.echo(
+                f"spent\t${api_client.get_ledger().spent_usd:.4f}"
+                f"\t{api_client.get_ledger().calls} calls",
+                err=True,
+            )
+        return failed
+
+    failed = asyncio.run(_run())
+    if failed:
+        raise typer.Exit(code=1)
+
+
+if __name__ == "__main__":
+    app()
@@ -1,10 +1,16 @@
-"""Configuration loading for the Study Guide Generator."""
+"""
+Configuration loading for the Study Guide Generator.
 
-import os
+Nothing is read at import time: ``get_settings()`` builds the settings on
+first use and returns the same instance afterwards, so modules imported by
+worker processes (parser, renderer, minifier) never need ``PPLX_API_KEY``.
+"""
+
+import functools
 from pathlib import Path
-from typing import Optional
+from typing import Literal, Optional
 
-from pydantic import Field, HttpUrl, SecretStr
+from pydantic import Field, SecretStr
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -26,7 +32,13 @@ class AppSettings(BaseSettings):
     model_config = SettingsConfigDict(env_file=".env", extra="ignore")
 
     token_budget_usd: float = Field(
-        0.25, description="Maximum token spend in USD per run"
+        0.25, ge=0, description="Maximum token spend in USD per run (0 disables)"
+    )
+    max_completion_tokens: int = Field(
+        1500, ge=1, description="max_tokens sent with each completion request"
+    )
+    min_completion_tokens: int = Field(
+        512, ge=1, description="Floor for max_tokens when degrading to fit the budget"
     )
     site_dir: Path = Field(
         "site", description="Output root directory for generated HTML pages"
@@ -37,36 +49,110 @@ class AppSettings(BaseSettings):
     asset_dir: Path = Field(
         "assets", description="Directory containing static assets (CSS, JS)"
     )
-    cache_type: str = Field(
-        "memory", description="Cache backend type ('memory' or 'redis')"
+    asset_store_dir: Path = Field(
+        ".cache/assets",
+        description="Content-addressed store that published assets are hard-linked from",
+    )
+    template_cache_dir: Path = Field(
+        ".cache/templates", description="Persistent cache of compiled Jinja2 templates"
+    )
+    minify_html: bool = Field(True, description="Minify rendered HTML pages")
+    minify_workers: int = Field(
+        0, ge=0, description="Processes minifying rendered pages (0: one per CPU)"
+    )
+    write_fsync: Literal["none", "guide", "file"] = Field(
+        "none",
+        description="Durability of written pages against power loss ('none', 'guide' or 'file')",
+    )
+    cache_type: Literal["memory", "redis", "disk"] = Field(
+        "memory", description="Cache backend type ('memory', 'redis' or 'disk')"
+    )
+    cache_serializer: Literal["json", "msgpack"] = Field(
+        "json", description="Cache value serializer ('json' or 'msgpack')"
     )
     redis_url: Optional[str] = Field(
         None, description="Redis connection URL (if cache_type is 'redis')"
     )
+    cache_path: Path = Field(
+        ".cache/perplexity.sqlite",
+        description="SQLite database file (if cache_type is 'disk')",
+    )
+    cache_max_size_mb: int = Field(
+        512, ge=1, description="Size cap of the disk cache before LRU eviction"
+    )
+    chapter_cache_entries: int = Field(
+        512, ge=0, description="Parsed chapters kept in memory (0 disables)"
+    )
+    chapter_cache_disk: bool = Field(
+        True, description="Persist parsed chapters to chapter_cache_dir"
+    )
+    chapter_cache_dir: Path = Field(
+        ".cache/chapters", description="Directory of the on-disk parsed chapter cache"
+    )
+    diagram_cache: bool = Field(
+        True, description="Reuse rendered diagrams of unchanged guide structures"
+    )
+    diagram_cache_dir: Path = Field(
+        ".cache/diagrams", description="Directory of the rendered diagram cache"
+    )
+    diagram_workers: int = Field(
+        0, ge=0, description="Processes drawing diagrams (0: one per CPU)"
+    )
+    diagram_max_graphviz: int = Field(
+        0, ge=0, description="Graphviz runs allowed at once (0: one per CPU)"
+    )
+    max_concurrency: int = Field(
+        5, ge=1, description="Maximum number of concurrent Perplexity API calls"
+    )
+    rate_limit_rps: float = Field(
+        1.0, gt=0, description="Client-side cap on API requests per second"
+    )
+    rate_limit_burst: int = Field(
+        5, ge=1, description="API requests allowed back to back before pacing"
+    )
+    rate_limit_tpm: int = Field(
+        0, ge=0, description="Client-side cap on API tokens per minute (0 disables)"
+    )
 
 
 class Settings(BaseSettings):
     """Aggregated settings."""
 
-    api: ApiSettings = ApiSettings()
-    app: AppSettings = AppSettings()
+    api: ApiSettings = Field(default_factory=ApiSettings)
+    app: AppSettings = Field(default_factory=AppSettings)
 
 
-# Load settings globally on import
-# In a larger app, consider dependency injection
-try:
-    settings = Settings()
-except Exception as e:
-    # Provide a more helpful error message if loading fails
-    print(f"Error loading configuration: {e}")
-    print(
-        "Please ensure required environment variables (e.g., PPLX_API_KEY) are set."
-    )
-    # Re-raise or exit depending on desired behavior
-    raise
+@functools.lru_cache(maxsize=None)
+def get_settings() -> Settings:
+    """
+    Returns the process-wide settings, loading them on first call.
+
+    Tests can patch attributes of the returned instance (every caller shares
+    it) or call ``get_settings.cache_clear()`` to reload from the environment.
+
+    Raises:
+        ValidationError: If required settings (e.g. ``PPLX_API_KEY``) are missing.
+    """
+    try:
+        return Settings()
+    except Exception as e:
+        # Provide a more helpful error message if loading fails
+        print(f"Error loading configuration: {e}")
+        print(
+            "Please ensure required environment variables (e.g., PPLX_API_KEY) are set."
+        )
+        raise
+
+
+def __getattr__(name: str):
+    # ``config.settings`` predates get_settings(); it resolves to the same instance
+    if name == "settings":
+        return get_settings()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 if __name__ == "__main__":
+    settings = get_settings()
     # Example of accessing settings
     print("Loaded Configuration:")
     print(f"  API Key: {settings.api.api_key.get_secret_value()[:4]}... (masked)")
@@ -75,5 +161,8 @@ if __name__ == "__main__":
     print(f"  Template Directory: {settings.app.template_dir.resolve()}")
     print(f"  Asset Directory: {settings.app.asset_dir.resolve()}")
     print(f"  Cache Type: {settings.app.cache_type}")
+    if settings.app.cache_type == "disk":
+        print(f"  Cache Path: {settings.app.cache_path.resolve()}")
+    print(f"  Max Concurrency: {settings.app.max_concurrency}")
     if settings.app.redis_url:
         print(f"  Redis URL: {settings.app.redis_url}")
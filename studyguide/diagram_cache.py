@@ -0,0 +1,150 @@
+"""
+Content-addressed cache of rendered study guide diagrams.
+
+A diagram depends only on the guide's structure (chapter titles, section
+headings, word counts and quiz lengths, exactly as ``visualizer`` labels
+them) plus its title, output format and backend. ``structure_key`` hashes
+exactly those inputs; the rendered file is stored under that key, and a hit
+links (or copies) it to the output path without running the backend, so an
+unchanged guide never starts Graphviz again.
+
+Entries live under a directory named after ``visualizer.DIAGRAM_VERSION``;
+directories of other versions are removed the first time the cache is
+written to.
+"""
+
+import hashlib
+import json
+import re
+import threading
+from importlib import metadata
+from pathlib import Path
+from typing import Callable, List, Optional
+
+import structlog
+
+from studyguide.files import link_or_copy, prune_versions
+from studyguide.parser import Chapter
+from studyguide.visualizer import (
+    DIAGRAM_VERSION,
+    chapter_labels,
+    create_study_guide_diagram,
+    resolve_backend,
+)
+
+logger = structlog.get_logger()
+
+_VERSION = f"v{DIAGRAM_VERSION}"
+# Only directories named like a version are ever pruned
+_VERSION_DIR = re.compile(r"v\d+")
+
+
+def _backend_version(backend: str) -> str:
+    if backend != "diagrams":
+        return ""
+    try:
+        return metadata.version("diagrams")
+    except metadata.PackageNotFoundError:
+        return ""
+
+
+def structure_key(
+    chapters: List[Chapter], title: str, output_format: str, backend: str
+) -> str:
+    """Returns the cache key of a diagram: a hash of everything it is drawn from."""
+    document = json.dumps(
+        [
+            _VERSION,
+            backend,
+            _backend_version(backend),
+            output_format,
+            title,
+            [[chapter.title, chapter_labels(chapter)] for chapter in chapters],
+        ],
+        ensure_ascii=False,
+    )
+    return hashlib.blake2b(document.encode("utf-8"), digest_size=16).hexdigest()
+
+
+class DiagramCache:
+    """
+    Disk cache of rendered diagrams in front of ``create_study_guide_diagram``.
+
+    Thread-safe. Cached files and the output files linked to them share an
+    inode, so output files must be replaced rather than edited in place
+    (``render`` itself always unlinks an output before regenerating it).
+
+    Args:
+        directory: Root of the cache; ``None`` disables caching.
+        draw: Called like ``create_study_guide_diagram`` (with the backend
+            resolved) on a miss; defaults to that function.
+    """
+
+    def __init__(self, directory: Optional[Path] = None, draw: Optional[Callable] = None):
+        self.directory = Path(directory) if directory is not None else None
+        self._draw = draw
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._pruned = False
+
+    def render(
+        self,
+        chapters: List[Chapter],
+        output_filename: str,
+        title: str = "Study Guide Structure",
+        output_format: str = "png",
+        backend: Optional[str] = None,
+    ) -> Path:
+        """
+        Writes the diagram to ``<output_filename>.<output_format>``, from the
+        cache when an identical diagram was rendered before.
+
+        Arguments and errors are those of ``create_study_guide_diagram``.
+
+        Returns:
+            The path of the written diagram.
+        """
+        backend = resolve_backend(output_format, backend)
+        output = Path(f"{output_filename}.{output_format}")
+        draw = self._draw or create_study_guide_diagram
+        if self.directory is None:
+            draw(chapters, output_filename, title, output_format, backend)
+            return output
+
+        key = structure_key(chapters, title, output_format, backend)
+        entry = self.directory / _VERSION / key[:2] / f"{key}.{output_format}"
+        if entry.is_file():
+            try:
+                output.parent.mkdir(parents=True, exist_ok=True)
+                link_or_copy(entry, output)
+            except OSError as e:
+                logger.warning("Diagram cache read failed", path=str(entry), error=str(e))
+            else:
+                with self._lock:
+                    self.hits += 1
+                logger.debug("Diagram served from cache", output_file=str(output), key=key)
+                return output
+
+        with self._lock:
+            self.misses += 1
+        # The output may be a link to a cache entry: never write through it
+        output.unlink(missing_ok=True)
+        draw(chapters, output_filename, title, output_format, backend)
+        self._store(entry, output)
+        return output
+
+    def _store(self, entry: Path, output: Path) -> None:
+        self._prune_other_versions()
+        try:
+            entry.parent.mkdir(parents=True, exist_ok=True)
+            link_or_copy(output, entry)
+        except OSError as e:
+            logger.warning("Diagram cache write failed", path=str(entry), error=str(e))
+
+    def _prune_other_versions(self) -> None:
+        with self._lock:
+            if self._pruned:
+                return
+            self._pruned = True
+        prune_versions(self.directory, _VERSION, _VERSION_DIR)
@@ -0,0 +1,242 @@
+"""
+Parallel rendering of study guide diagrams.
+
+``DiagramPool`` draws guide diagrams in a pool of worker processes, off the
+event loop; ``run_batch`` draws each guide's diagram through one as the
+guide is written. ``render_diagrams`` draws the diagrams of many guides and
+yields each result as soon as it is written. Every worker serves diagrams through its own ``DiagramCache`` over
+the shared cache directory, and a semaphore shared by the pool caps how many
+workers may be running Graphviz (the ``diagrams`` backend) at once, however
+many workers there are.
+"""
+
+import asyncio
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, AsyncIterator, Iterable, List, Optional, Set
+
+import structlog
+from pydantic import BaseModel, Field
+
+from studyguide.config import get_settings
+from studyguide.diagram_cache import DiagramCache
+from studyguide.parser import Chapter
+from studyguide.visualizer import create_study_guide_diagram, resolve_backend
+
+if TYPE_CHECKING:
+    # Spawned workers import this module: keep the engine (and with it the
+    # API client) out of their start-up
+    from studyguide.engine import StudyGuide
+
+logger = structlog.get_logger()
+
+# Diagrams submitted per worker ahead of the results being consumed
+_QUEUED_PER_WORKER = 4
+
+# Per-worker state, set up by _init_worker
+_graphviz_slots: Any = None
+_cache: Optional[DiagramCache] = None
+
+
+class DiagramResult(BaseModel):
+    """The outcome of drawing one guide's diagram."""
+
+    topic: str = Field(..., description="The topic of the guide.")
+    path: Optional[Path] = Field(None, description="The written diagram, if drawn.")
+    error: Optional[str] = Field(None, description="The error message, if drawing failed.")
+
+    @property
+    def ok(self) -> bool:
+        """Whether the diagram was written."""
+        return self.error is None
+
+
+def _init_worker(slots: Any, cache_dir: Optional[Path]) -> None:
+    global _graphviz_slots, _cache
+    _graphviz_slots = slots
+    _cache = DiagramCache(cache_dir, draw=_draw)
+
+
+def _draw(
+    chapters: List[Chapter],
+    output_filename: str,
+    title: str,
+    output_format: str,
+    backend: str,
+) -> None:
+    if backend != "diagrams":
+        create_study_guide_diagram(chapters, output_filename, title, output_format, backend)
+        return
+    # Only drawing runs Graphviz; cache hits never take a slot
+    with _graphviz_slots:
+        create_study_guide_diagram(chapters, output_filename, title, output_format, backend)
+
+
+def _render_guide(
+    chapters: List[Chapter],
+    output_filename: str,
+    title: str,
+    output_format: str,
+    backend: str,
+) -> Path:
+    return _cache.render(chapters, output_filename, title, output_format, backend)
+
+
+class DiagramPool:
+    """
+    Workers drawing guide diagrams through the shared diagram cache, off the
+    event loop. Close it (or use it as an async context manager) to shut the
+    workers down.
+
+    Diagrams are cached in ``AppSettings.diagram_cache_dir`` (unless
+    ``DIAGRAM_CACHE`` is off), so an unchanged guide is linked from the cache
+    without drawing.
+
+    Args:
+        workers: Worker processes (defaults to ``AppSettings.diagram_workers``,
+            else one per CPU). With one worker, diagrams are drawn in a
+            thread instead.
+        max_graphviz: Graphviz runs allowed at once across the pool (defaults
+            to ``AppSettings.diagram_max_graphviz``, else one per CPU).
+        output_format: Diagram format (see ``create_study_guide_diagram``).
+        backend: Diagram backend (see ``create_study_guide_diagram``).
+
+    Raises:
+        ValueError: If the backend is unknown or cannot write ``output_format``.
+    """
+
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        max_graphviz: Optional[int] = None,
+        output_format: str = "svg",
+        backend: Optional[str] = None,
+    ):
+        self.output_format = output_format
+        self.backend = resolve_backend(output_format, backend)
+        settings = get_settings()
+        cpus = os.cpu_count() or 1
+        self.workers = workers or settings.app.diagram_workers or cpus
+        max_graphviz = max_graphviz or settings.app.diagram_max_graphviz or cpus
+        cache_dir = settings.app.diagram_cache_dir if settings.app.diagram_cache else None
+
+        self._executor: Executor
+        if self.workers <= 1:
+            self._executor = ThreadPoolExecutor(
+                max_workers=1,
+                initializer=_init_worker,
+                initargs=(threading.BoundedSemaphore(max_graphviz), cache_dir),
+            )
+        else:
+            # Spawned (not forked) workers: we run next to the event loop
+            context = multiprocessing.get_context("spawn")
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=context,
+                initializer=_init_worker,
+                initargs=(context.BoundedSemaphore(max_graphviz), cache_dir),
+            )
+        logger.info(
+            "Diagram pool started",
+            workers=self.workers,
+            max_graphviz=max_graphviz,
+            output_format=output_format,
+            backend=self.backend,
+        )
+
+    def submit(self, guide: "StudyGuide", output_dir: Path) -> "asyncio.Future[Path]":
+        """
+        Queues the guide's diagram for ``<output_dir>/<slug>.<output_format>``.
+
+        Returns:
+            A future resolving to the written path.
+        """
+        future: Future = self._executor.submit(
+            _render_guide,
+            guide.chapters,
+            str(Path(output_dir) / guide.slug),
+            guide.topic,
+            self.output_format,
+            self.backend,
+        )
+        return asyncio.wrap_future(future)
+
+    async def render(self, guide: "StudyGuide", output_dir: Path) -> Path:
+        """Draws the guide's diagram into ``output_dir`` and returns its path."""
+        return await self.submit(guide, output_dir)
+
+    async def close(self) -> None:
+        """Cancels queued work and shuts the workers down, off the event loop."""
+        await asyncio.to_thread(self._executor.shutdown, wait=True, cancel_futures=True)
+
+    async def __aenter__(self) -> "DiagramPool":
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        await self.close()
+
+
+async def render_diagrams(
+    guides: Iterable["StudyGuide"],
+    output_dir: Path,
+    workers: Optional[int] = None,
+    max_graphviz: Optional[int] = None,
+    output_format: str = "svg",
+    backend: Optional[str] = None,
+) -> AsyncIterator[DiagramResult]:
+    """
+    Draws each guide's diagram to ``<output_dir>/<slug>.<output_format>``
+    with a ``DiagramPool``, yielding results in completion order.
+
+    Guides are submitted to the pool a few at a time, so a long iterable
+    never queues thousands of jobs. A failing guide is reported as a result
+    with ``error`` set and does not stop the others.
+
+    Arguments other than ``guides`` and ``output_dir`` are those of
+    ``DiagramPool``.
+
+    Raises:
+        ValueError: If the backend is unknown or cannot write ``output_format``.
+
+    Yields:
+        A DiagramResult per guide.
+    """
+    pool = DiagramPool(workers, max_graphviz, output_format, backend)
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    pending = iter(guides)
+    running: Set[asyncio.Future] = set()
+    topics = {}
+
+    def submit_next() -> None:
+        guide = next(pending, None)
+        if guide is None:
+            return
+        future = pool.submit(guide, output_dir)
+        topics[future] = guide.topic
+        running.add(future)
+
+    for _ in range(pool.workers * _QUEUED_PER_WORKER):
+        submit_next()
+
+    try:
+        while running:
+            done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+            for future in done:
+                running.discard(future)
+                submit_next()
+                topic = topics.pop(future)
+                try:
+                    result = DiagramResult(topic=topic, path=future.result())
+                except Exception as e:
+                    logger.error("Diagram rendering failed", topic=topic, error=str(e))
+                    result = DiagramResult(topic=topic, error=str(e))
+                yield result
+    finally:
+        for future in running:
+            future.cancel()
+        await pool.close()
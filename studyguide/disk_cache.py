@@ -0,0 +1,298 @@
+"""
+Persistent SQLite-backed cache backend for aiocache.
+
+Stores API responses in a local SQLite file so repeated runs (and CI reruns)
+never pay for the same completion twice, without needing a Redis service.
+Entries expire after their TTL, and the least recently used entries are
+evicted once the stored values exceed ``max_size`` bytes.
+"""
+
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import structlog
+from aiocache.base import BaseCache
+from aiocache.serializers import JsonSerializer
+
+logger = structlog.get_logger()
+
+# Reads that hit are remembered and written to accessed_at with the next
+# write, or once this many are pending
+_MAX_PENDING_TOUCHES = 1024
+
+_SCHEMA = """
+BEGIN IMMEDIATE;
+CREATE TABLE IF NOT EXISTS cache (
+    key TEXT PRIMARY KEY,
+    value,
+    size INTEGER NOT NULL,
+    expires_at REAL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS cache_accessed_at ON cache (accessed_at);
+CREATE INDEX IF NOT EXISTS cache_expires_at ON cache (expires_at) WHERE expires_at IS NOT NULL;
+-- Total size of the stored values, kept by triggers so that no write has to
+-- sum the table, whichever process or statement changes it
+CREATE TABLE IF NOT EXISTS cache_size (id INTEGER PRIMARY KEY CHECK (id = 0), total INTEGER NOT NULL);
+INSERT OR IGNORE INTO cache_size (id, total) SELECT 0, COALESCE(SUM(size), 0) FROM cache;
+CREATE TRIGGER IF NOT EXISTS cache_size_insert AFTER INSERT ON cache BEGIN
+    UPDATE cache_size SET total = total + NEW.size WHERE id = 0;
+END;
+CREATE TRIGGER IF NOT EXISTS cache_size_delete AFTER DELETE ON cache BEGIN
+    UPDATE cache_size SET total = total - OLD.size WHERE id = 0;
+END;
+CREATE TRIGGER IF NOT EXISTS cache_size_update AFTER UPDATE OF size ON cache BEGIN
+    UPDATE cache_size SET total = total + NEW.size - OLD.size WHERE id = 0;
+END;
+COMMIT;
+"""
+
+_UPSERT = (
+    "INSERT INTO cache (key, value, size, expires_at, accessed_at) VALUES (?, ?, ?, ?, ?) "
+    "ON CONFLICT(key) DO UPDATE SET value = excluded.value, size = excluded.size, "
+    "expires_at = excluded.expires_at, accessed_at = excluded.accessed_at"
+)
+
+
+def _byte_size(value: Any) -> int:
+    """Stored size of a serialized value: ``str`` values are stored as UTF-8."""
+    return len(value.encode("utf-8")) if isinstance(value, str) else len(value)
+
+
+class SQLiteCache(BaseCache):
+    """
+    aiocache backend persisting entries to a SQLite database file.
+
+    Values are stored exactly as the serializer produces them: ``str`` from
+    ``JsonSerializer`` or ``bytes`` from a binary serializer such as
+    ``MsgPackSerializer``. SQLite calls run in a worker thread so they never
+    block the event loop.
+
+    Args:
+        path: Location of the SQLite database file.
+        max_size: Maximum total size in bytes of stored values before the
+            least recently used entries are evicted. ``None`` disables the cap.
+        serializer: aiocache serializer (defaults to ``JsonSerializer``).
+        **kwargs: Passed to ``aiocache.base.BaseCache`` (namespace, timeout...).
+    """
+
+    NAME = "sqlite"
+
+    def __init__(
+        self,
+        path: str = ".cache/perplexity.sqlite",
+        max_size: Optional[int] = None,
+        serializer=None,
+        **kwargs: Any,
+    ):
+        super().__init__(serializer=serializer or JsonSerializer(), **kwargs)
+        self.path = Path(path)
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self._pid: Optional[int] = None
+        # Keys read since the last write, with the time of their last read
+        self._touched: Dict[str, float] = {}
+
+    def __repr__(self) -> str:
+        return f"SQLiteCache ({self.path})"
+
+    # --- Connection handling (runs in worker threads) ---
+
+    def _connection(self) -> sqlite3.Connection:
+        # Reconnect in forked children; SQLite connections must not cross fork()
+        if self._db is None or self._pid != os.getpid():
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(
+                self.path, check_same_thread=False, isolation_level=None
+            )
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            # Rows deleted by a REPLACE must reach the size trigger too
+            self._db.execute("PRAGMA recursive_triggers=ON")
+            self._db.executescript(_SCHEMA)
+            self._pid = os.getpid()
+            self._touched = {}
+        return self._db
+
+    async def _run(self, func, *args: Any) -> Any:
+        def call() -> Any:
+            with self._lock:
+                return func(self._connection(), *args)
+
+        return await asyncio.to_thread(call)
+
+    def _fetch(self, db: sqlite3.Connection, key: str) -> Any:
+        now = time.time()
+        row = db.execute(
+            "SELECT value, expires_at FROM cache WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        value, expires_at = row
+        if expires_at is not None and expires_at <= now:
+            db.execute("DELETE FROM cache WHERE key = ?", (key,))
+            return None
+        # A hit stays a pure read: its access time is written with the next
+        # write, which is also the only time entries are evicted
+        self._touched[key] = now
+        if len(self._touched) >= _MAX_PENDING_TOUCHES:
+            self._write_touches(db)
+        return value
+
+    def _write_touches(self, db: sqlite3.Connection) -> None:
+        if not self._touched:
+            return
+        db.executemany(
+            "UPDATE cache SET accessed_at = ? WHERE key = ? AND accessed_at < ?",
+            [(at, key, at) for key, at in self._touched.items()],
+        )
+        self._touched.clear()
+
+    def _store(self, db: sqlite3.Connection, pairs: List[tuple], ttl: Optional[float]) -> None:
+        now = time.time()
+        expires_at = now + ttl if ttl else None
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            self._write_touches(db)
+            db.executemany(
+                _UPSERT,
+                [(key, value, _byte_size(value), expires_at, now) for key, value in pairs],
+            )
+            self._evict(db, now)
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        db.execute("COMMIT")
+
+    def _evict(self, db: sqlite3.Connection, now: float) -> None:
+        db.execute(
+            "DELETE FROM cache WHERE expires_at IS NOT NULL AND expires_at <= ?", (now,)
+        )
+        if self.max_size is None:
+            return
+        (total,) = db.execute("SELECT total FROM cache_size WHERE id = 0").fetchone()
+        if total <= self.max_size:
+            return
+        excess = total - self.max_size
+        victims = []
+        for key, size in db.execute("SELECT key, size FROM cache ORDER BY accessed_at"):
+            victims.append((key,))
+            excess -= size
+            if excess <= 0:
+                break
+        db.executemany("DELETE FROM cache WHERE key = ?", victims)
+        logger.debug("Evicted least recently used cache entries", count=len(victims))
+
+    # --- aiocache backend interface ---
+
+    async def _get(self, key, encoding="utf-8", _conn=None):
+        return await self._run(self._fetch, key)
+
+    async def _gets(self, key, encoding="utf-8", _conn=None):
+        return await self._get(key, encoding=encoding, _conn=_conn)
+
+    async def _multi_get(self, keys, encoding="utf-8", _conn=None):
+        return await self._run(lambda db: [self._fetch(db, key) for key in keys])
+
+    async def _set(self, key, value, ttl=None, _cas_token=None, _conn=None):
+        def set_one(db: sqlite3.Connection) -> Any:
+            if _cas_token is not None and _cas_token != self._fetch(db, key):
+                return 0
+            self._store(db, [(key, value)], ttl)
+            return True
+
+        return await self._run(set_one)
+
+    async def _multi_set(self, pairs, ttl=None, _conn=None):
+        await self._run(self._store, list(pairs), ttl)
+        return True
+
+    async def _add(self, key, value, ttl=None, _conn=None):
+        def add_one(db: sqlite3.Connection) -> bool:
+            if self._fetch(db, key) is not None:
+                raise ValueError(
+                    f"Key {key} already exists, use .set to update the value"
+                )
+            self._store(db, [(key, value)], ttl)
+            return True
+
+        return await self._run(add_one)
+
+    async def _exists(self, key, _conn=None):
+        return await self._run(self._fetch, key) is not None
+
+    async def _increment(self, key, delta, _conn=None):
+        def increment(db: sqlite3.Connection) -> int:
+            current = self._fetch(db, key)
+            try:
+                value = delta if current is None else int(current) + delta
+            except ValueError:
+                raise TypeError("Value is not an integer") from None
+            db.execute(
+                "INSERT INTO cache (key, value, size, expires_at, accessed_at) "
+                "VALUES (?, ?, ?, NULL, ?) "
+                "ON CONFLICT(key) DO UPDATE SET value = excluded.value, "
+                "size = excluded.size, accessed_at = excluded.accessed_at",
+                (key, value, len(str(value)), time.time()),
+            )
+            return value
+
+        return await self._run(increment)
+
+    async def _expire(self, key, ttl, _conn=None):
+        def expire(db: sqlite3.Connection) -> bool:
+            expires_at = time.time() + ttl if ttl else None
+            cursor = db.execute(
+                "UPDATE cache SET expires_at = ? WHERE key = ?", (expires_at, key)
+            )
+            return cursor.rowcount > 0
+
+        return await self._run(expire)
+
+    async def _delete(self, key, _conn=None):
+        return await self._run(
+            lambda db: db.execute("DELETE FROM cache WHERE key = ?", (key,)).rowcount
+        )
+
+    async def _clear(self, namespace=None, _conn=None):
+        def clear(db: sqlite3.Connection) -> bool:
+            if namespace:
+                db.execute(
+                    "DELETE FROM cache WHERE substr(key, 1, ?) = ?",
+                    (len(namespace), namespace),
+                )
+            else:
+                db.execute("DELETE FROM cache")
+            return True
+
+        return await self._run(clear)
+
+    async def _raw(self, command, *args, encoding="utf-8", _conn=None, **kwargs):
+        return await self._run(
+            lambda db: getattr(db, command)(*args, **kwargs).fetchall()
+        )
+
+    async def _redlock_release(self, key, value):
+        def release(db: sqlite3.Connection) -> int:
+            if self._fetch(db, key) == value:
+                return db.execute("DELETE FROM cache WHERE key = ?", (key,)).rowcount
+            return 0
+
+        return await self._run(release)
+
+    async def _close(self, *args, _conn=None, **kwargs):
+        def close() -> None:
+            with self._lock:
+                if self._db is not None:
+                    if self._pid == os.getpid():
+                        self._write_touches(self._db)
+                    self._db.close()
+                    self._db = None
+
+        await asyncio.to_thread(close)
@@ -0,0 +1,309 @@
+"""
+Orchestrates concurrent generation of study guide chapters.
+"""
+
+import asyncio
+import contextlib
+import re
+from typing import (
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    List,
+    Optional,
+    Tuple,
+    Union,
+)
+
+import structlog
+from pydantic import BaseModel, Field, model_validator
+
+from studyguide import api_client
+from studyguide.chapter_cache import ChapterCache, get_default_cache
+from studyguide.config import get_settings
+from studyguide.parser import Chapter, ChapterStreamParser, QuizItem, Section
+
+logger = structlog.get_logger()
+
+DEFAULT_MODEL = "sonar-medium-chat"
+
+# One entry per chapter; a guide always has five chapters
+CHAPTER_FOCUS = (
+    "Foundations and key terminology",
+    "Core concepts and how they fit together",
+    "Practical applications and worked examples",
+    "Advanced topics and common pitfalls",
+    "Review, synthesis and next steps",
+)
+
+SYSTEM_PROMPT = """You are an expert teacher writing one chapter of a study guide.
+Answer ONLY in the following Markdown structure, keeping every marker verbatim:
+
+# Chapter Title: <title>
+
+**Introduction:**
+<one or two paragraphs>
+---
+
+## Section 1: <heading>
+<content>
+---
+
+(repeat sections as needed, numbering them)
+
+**Summary:**
+<summary paragraph>
+---
+
+**Keywords:**
+- <keyword>
+---
+
+**Quiz:**
+
+1. **Question:** <question>
+    * <option>
+    * <option>
+    **Correct Answer:** <one of the options, copied exactly>
+"""
+
+AskFn = Callable[[str, str, Optional[str]], Awaitable[dict]]
+StreamFn = Callable[[str, str, Optional[str]], AsyncIterator[str]]
+
+
+class EngineError(Exception):
+    """Raised when a study guide (or one of its chapters) cannot be generated."""
+
+    pass
+
+
+def slugify(topic: str) -> str:
+    """Returns the filesystem- and URL-safe name of a topic's guide."""
+    return re.sub(r"[^a-z0-9]+", "-", topic.lower()).strip("-") or "guide"
+
+
+class StudyGuide(BaseModel):
+    """A generated study guide: a topic and its ordered chapters."""
+
+    topic: str = Field(..., description="The topic the guide was generated for.")
+    chapters: List[Chapter] = Field(
+        ..., description="The chapters of the guide, in reading order."
+    )
+    slug: str = Field(
+        "",
+        description="Filesystem- and URL-safe name of the guide's files; "
+        "slugify(topic) when not given.",
+    )
+
+    @model_validator(mode="after")
+    def default_slug(self) -> "StudyGuide":
+        """Derives the slug from the topic unless one was given."""
+        if not self.slug:
+            self.slug = slugify(self.topic)
+        return self
+
+
+def build_chapter_prompt(topic: str, index: int) -> str:
+    """
+    Builds the user prompt for a single chapter of a guide.
+
+    Args:
+        topic: The study guide topic.
+        index: Zero-based chapter index into CHAPTER_FOCUS.
+
+    Returns:
+        The prompt text for the chapter.
+    """
+    return (
+        f"Write chapter {index + 1} of {len(CHAPTER_FOCUS)} of a study guide on "
+        f"'{topic}'. This chapter covers: {CHAPTER_FOCUS[index]}."
+    )
+
+
+def extract_content(response: dict) -> str:
+    """
+    Extracts the assistant message text from a chat completions response.
+
+    Raises:
+        EngineError: If the response does not contain a message.
+    """
+    try:
+        return response["choices"][0]["message"]["content"]
+    except (KeyError, IndexError, TypeError) as e:
+        raise EngineError(f"Malformed completion response: {e!r}") from e
+
+
+class Engine:
+    """
+    Generates study guides by fanning chapter prompts out concurrently.
+
+    All API calls made through one engine share a semaphore, so the number of
+    in-flight requests never exceeds ``max_concurrency`` no matter how many
+    chapters (or follow-up calls) are pending. ``per_guide_concurrency``
+    additionally caps the calls of any single guide, so that one topic cannot
+    monopolise the global limit when many guides are generated together.
+    Each response is parsed as soon as it arrives rather than after the whole
+    guide has been fetched, through ``chapter_cache`` so that responses seen
+    before (e.g. served from the API cache) are not parsed again.
+    """
+
+    def __init__(
+        self,
+        model: str = DEFAULT_MODEL,
+        max_concurrency: Optional[int] = None,
+        per_guide_concurrency: Optional[int] = None,
+        ask: Optional[AskFn] = None,
+        stream: Optional[StreamFn] = None,
+        chapter_cache: Optional[ChapterCache] = None,
+    ):
+        self.model = model
+        self.max_concurrency = max_concurrency or get_settings().app.max_concurrency
+        self.per_guide_concurrency = per_guide_concurrency
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._ask = ask or api_client.ask_perplexity
+        self._stream = stream or api_client.stream_perplexity
+        self._chapter_cache = chapter_cache or get_default_cache()
+
+    async def ask(self, prompt: str, system_prompt: Optional[str] = None) -> dict:
+        """
+        Sends a single request through the engine's concurrency limit.
+
+        Use this for follow-up calls so they share the same bound as chapters.
+        """
+        async with self._semaphore:
+            return await self._ask(self.model, prompt, system_prompt)
+
+    async def generate_chapter(
+        self,
+        topic: str,
+        index: int,
+        guide_limit: Optional[asyncio.Semaphore] = None,
+    ) -> Chapter:
+        """
+        Fetches and parses a single chapter.
+
+        Args:
+            topic: The study guide topic.
+            index: Zero-based chapter index.
+            guide_limit: Optional per-guide semaphore, acquired before the
+                engine-wide one so waiting guides do not hold global slots.
+
+        Raises:
+            EngineError: If the API call or parsing fails.
+        """
+        try:
+            async with guide_limit or contextlib.nullcontext():
+                response = await self.ask(
+                    build_chapter_prompt(topic, index), SYSTEM_PROMPT
+                )
+            # Parsing (and hashing for the cache) is CPU work; keep it off the loop
+            chapter = await asyncio.to_thread(
+                self._chapter_cache.parse, extract_content(response)
+            )
+        except EngineError:
+            raise
+        except Exception as e:
+            logger.error(
+                "Chapter generation failed",
+                topic=topic,
+                chapter=index + 1,
+                error=str(e),
+            )
+            raise EngineError(
+                f"Chapter {index + 1} of '{topic}' failed: {e}"
+            ) from e
+        logger.info("Chapter generated", topic=topic, chapter=index + 1)
+        return chapter
+
+    async def stream_chapter(
+        self, topic: str, index: int
+    ) -> AsyncIterator[Union[Section, QuizItem, Chapter]]:
+        """
+        Streams a single chapter, yielding parts as soon as they are complete.
+
+        Yields each ``Section`` and ``QuizItem`` as its block finishes
+        streaming, then the fully parsed ``Chapter`` last. Intended for
+        previews that want to show content before generation has finished.
+
+        Raises:
+            EngineError: If the stream or the final parse fails.
+        """
+        stream_parser = ChapterStreamParser()
+
+        async def deltas() -> AsyncIterator[str]:
+            async with self._semaphore:
+                async for delta in self._stream(
+                    self.model, build_chapter_prompt(topic, index), SYSTEM_PROMPT
+                ):
+                    yield delta
+
+        try:
+            # Read ahead, so a slow consumer never holds an engine-wide slot
+            async for delta in api_client.read_ahead(deltas()):
+                for part in stream_parser.feed(delta):
+                    yield part
+            chapter = await asyncio.to_thread(stream_parser.close)
+        except Exception as e:
+            logger.error(
+                "Chapter streaming failed",
+                topic=topic,
+                chapter=index + 1,
+                error=str(e),
+            )
+            raise EngineError(
+                f"Chapter {index + 1} of '{topic}' failed: {e}"
+            ) from e
+        yield chapter
+
+    async def iter_chapters(self, topic: str) -> AsyncIterator[Tuple[int, Chapter]]:
+        """
+        Yields ``(index, chapter)`` pairs in completion order.
+
+        All chapter requests are started immediately; if one fails the
+        remaining ones are cancelled and the error is raised.
+        """
+        guide_limit = (
+            asyncio.Semaphore(self.per_guide_concurrency)
+            if self.per_guide_concurrency
+            else None
+        )
+        tasks = [
+            asyncio.create_task(self._indexed_chapter(topic, index, guide_limit))
+            for index in range(len(CHAPTER_FOCUS))
+        ]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def generate_guide(self, topic: str) -> StudyGuide:
+        """
+        Generates all chapters of a guide concurrently.
+
+        Args:
+            topic: The study guide topic.
+
+        Returns:
+            The StudyGuide with chapters in reading order.
+
+        Raises:
+            EngineError: If any chapter fails.
+        """
+        logger.info(
+            "Starting guide generation",
+            topic=topic,
+            max_concurrency=self.max_concurrency,
+        )
+        chapters: List[Optional[Chapter]] = [None] * len(CHAPTER_FOCUS)
+        async for index, chapter in self.iter_chapters(topic):
+            chapters[index] = chapter
+        logger.info("Guide generation complete", topic=topic)
+        return StudyGuide(topic=topic, chapters=chapters)
+
+    async def _indexed_chapter(
+        self, topic: str, index: int, guide_limit: Optional[asyncio.Semaphore]
+    ) -> Tuple[int, Chapter]:
+        return index, await self.generate_chapter(topic, index, guide_limit)
@@ -0,0 +1,85 @@
+"""
+File helpers shared by the caches, the asset pipeline and the site build.
+
+Files are replaced through a temporary file in the target's directory that
+is renamed over the target, so readers never see a partial file and a
+killed process leaves at most a stray ``.tmp`` file behind.
+"""
+
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Callable, List, Pattern
+
+import structlog
+
+logger = structlog.get_logger()
+
+
+def replace_atomic(target: Path, fill: Callable[[Path], None]) -> None:
+    """
+    Atomically replaces ``target`` with the file ``fill`` creates.
+
+    Args:
+        target: The file to create or replace. Its directory must exist.
+        fill: Creates the new file at the temporary path it is given (the
+            path does not exist yet), e.g. by writing, copying or linking.
+
+    Raises:
+        OSError: If the file cannot be created or renamed; the temporary
+            file is removed first. Errors raised by ``fill`` propagate the
+            same way.
+    """
+    target = Path(target)
+    fd, tmp = tempfile.mkstemp(dir=target.parent, suffix=".tmp")
+    os.close(fd)
+    os.unlink(tmp)
+    try:
+        fill(Path(tmp))
+        os.replace(tmp, target)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+
+
+def write_atomic(target: Path, data: bytes) -> None:
+    """Atomically replaces ``target`` with ``data``."""
+    replace_atomic(target, lambda tmp: tmp.write_bytes(data))
+
+
+def link_or_copy(source: Path, target: Path) -> None:
+    """Atomically places ``source`` at ``target``, hard-linked where possible."""
+
+    def fill(tmp: Path) -> None:
+        try:
+            os.link(source, tmp)
+        except OSError:
+            shutil.copyfile(source, tmp)
+
+    replace_atomic(target, fill)
+
+
+def prune_versions(directory: Path, current: str, pattern: Pattern[str]) -> List[Path]:
+    """
+    Deletes the version directories of a cache other than ``current``.
+
+    Only subdirectories whose whole name matches ``pattern`` are candidates,
+    so a cache directory shared with other files never loses anything else.
+
+    Returns:
+        The directories removed (none if ``directory`` does not exist).
+    """
+    try:
+        stale = [
+            entry
+            for entry in Path(directory).iterdir()
+            if entry.is_dir() and entry.name != current and pattern.fullmatch(entry.name)
+        ]
+    except FileNotFoundError:
+        return []
+    for entry in stale:
+        logger.info("Removing cache directory of another version", path=str(entry))
+        shutil.rmtree(entry, ignore_errors=True)
+    return stale
+
@@ -1,12 +1,210 @@
-"""Logging configuration using structlog."""
+"""
+Logging configuration using structlog.
 
+Every log line is one JSON object on stdout. By default it is rendered and
+written by the thread that logs. With ``use_queue=True`` the logging thread
+only runs the cheap structlog processors (level, logger name, timestamp,
+exception formatting) and enqueues the record; a ``QueueListener`` thread
+renders it to JSON and writes it, so a slow or blocked stdout never stalls
+the event loop.
+
+JSON is rendered with orjson when it is installed, and with the standard
+library's ``json`` otherwise.
+
+Levels are filtered before any processor runs (structlog's filtering bound
+logger turns disabled methods into no-ops), and ``sample_rates`` keeps only
+a random fraction of chosen high-volume events; warnings and errors are
+never sampled. Hot paths that build expensive debug fields check
+``is_enabled(logger, logging.DEBUG)`` first.
+"""
+
+import atexit
 import logging
+import logging.handlers
+import queue
+import random
 import sys
+from typing import Any, Callable, Dict, Iterable, Mapping, Optional
 
 import structlog
 
+# What a full log queue does to records below WARNING: wait for space
+# ("block") or discard them ("drop"); warnings and errors always wait
+QUEUE_OVERFLOW_POLICIES = ("block", "drop")
+
+# Bound logger methods that are never sampled out
+_UNSAMPLED_METHODS = frozenset(
+    {"warning", "warn", "error", "err", "exception", "critical", "fatal"}
+)
+
+_listener: Optional["_Listener"] = None
+
+
+class _LevelFilteringBoundLogger(structlog.BoundLoggerBase):
+    """
+    structlog's filtering bound logger, with the level of the latest
+    ``configure_logging`` call.
+
+    structlog bakes the level into the filtering logger's class, and loggers
+    cached on first use keep their class, so configuring a new level would
+    not reach them. ``_set_level`` instead copies the methods of structlog's
+    class for the new level onto this one, which every logger shares.
+    """
+
+
+def _set_level(level: int) -> None:
+    filtering = structlog.make_filtering_bound_logger(level)
+    for name, method in vars(filtering).items():
+        if not name.startswith("__"):
+            setattr(_LevelFilteringBoundLogger, name, method)
+
+
+_set_level(logging.INFO)
+
+
+def is_enabled(logger: Any, level: int) -> bool:
+    """
+    Whether ``logger`` emits events at ``level``.
+
+    Guard log calls whose fields are expensive to compute; a disabled call
+    is already a no-op, but its arguments are still evaluated.
+    """
+    check = getattr(logger, "is_enabled_for", None)
+    if check is not None:
+        return check(level)
+    return logger.isEnabledFor(level) # structlog.stdlib.BoundLogger
+
+
+class EventSampler:
+    """
+    structlog processor keeping a random fraction of selected events.
+
+    Args:
+        rates: Fraction (0 to 1) of each event name to keep; ``"*"`` sets the
+            rate of events not listed (default 1). Kept sampled events carry
+            a ``sample_rate`` field so counts can be scaled back up.
+
+    Raises:
+        ValueError: If a rate is outside [0, 1].
+    """
+
+    def __init__(self, rates: Mapping[str, float]):
+        for event, rate in rates.items():
+            if not 0.0 <= rate <= 1.0:
+                raise ValueError(f"Sample rate of {event!r} must be within [0, 1], got {rate}")
+        self.rates = dict(rates)
+        self.default_rate = self.rates.pop("*", 1.0)
+
+    def __call__(self, logger: Any, method_name: str, event_dict: Dict[str, Any]) -> Dict[str, Any]:
+        if method_name in _UNSAMPLED_METHODS:
+            return event_dict
+        rate = self.rates.get(event_dict.get("event"), self.default_rate)
+        if rate >= 1.0:
+            return event_dict
+        if random.random() >= rate:
+            raise structlog.DropEvent
+        event_dict["sample_rate"] = rate
+        return event_dict
+
 
-def configure_logging(log_level: str = "INFO") -> None:
+def parse_sample_rates(specs: Iterable[str]) -> Dict[str, float]:
+    """
+    Parses ``EVENT=RATE`` strings (as given on the command line).
+
+    Raises:
+        ValueError: If a spec has no ``=`` or its rate is not a number.
+    """
+    rates = {}
+    for spec in specs:
+        event, sep, rate = spec.rpartition("=")
+        if not sep or not event:
+            raise ValueError(f"Expected EVENT=RATE, got {spec!r}")
+        rates[event] = float(rate)
+    return rates
+
+
+def _orjson_dumps() -> Optional[Callable[..., str]]:
+    try:
+        import orjson
+    except ImportError:
+        return None
+
+    def dumps(obj: Any, default: Optional[Callable[[Any], Any]] = None, **kwargs: Any) -> str:
+        return orjson.dumps(obj, default=default, option=orjson.OPT_NON_STR_KEYS).decode()
+
+    return dumps
+
+
+def json_renderer() -> structlog.processors.JSONRenderer:
+    """Returns the JSON renderer for log lines: orjson-backed if available."""
+    dumps = _orjson_dumps()
+    if dumps is None:
+        return structlog.processors.JSONRenderer()
+    return structlog.processors.JSONRenderer(serializer=dumps)
+
+
+class _EnqueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler that leaves rendering to the listener thread and applies the
+    overflow policy when the queue is full.
+    """
+
+    def __init__(self, log_queue: queue.Queue, overflow: str):
+        super().__init__(log_queue)
+        self.overflow = overflow
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # The stock QueueHandler formats here, on the logging thread
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        if self.overflow == "block" or record.levelno >= logging.WARNING:
+            self.queue.put(record)
+        else:
+            try:
+                self.queue.put_nowait(record)
+            except queue.Full:
+                self.dropped += 1
+                return
+        if self.dropped:
+            dropped, self.dropped = self.dropped, 0
+            self.queue.put(
+                logging.makeLogRecord(
+                    {
+                        "name": __name__,
+                        "levelno": logging.WARNING,
+                        "levelname": "WARNING",
+                        "msg": f"Dropped {dropped} log records: log queue full",
+                    }
+                )
+            )
+
+
+class _Listener(logging.handlers.QueueListener):
+    def enqueue_sentinel(self) -> None:
+        # The stock listener uses put_nowait, which fails on a full queue
+        self.queue.put(self._sentinel)
+
+
+def shutdown_logging() -> None:
+    """Writes every queued log record and stops the listener thread, if any."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(shutdown_logging)
+
+
+def configure_logging(
+    log_level: str = "INFO",
+    use_queue: bool = False,
+    queue_size: int = 10_000,
+    overflow: str = "block",
+    sample_rates: Optional[Mapping[str, float]] = None,
+) -> None:
     """
     Configure structlog for structured logging.
 
@@ -14,7 +212,24 @@ def configure_logging(log_level: str = "INFO") -> None:
 
     Args:
         log_level: The minimum log level to output (e.g., "DEBUG", "INFO").
+        use_queue: Render and write log lines on a background thread.
+        queue_size: Records the queue holds before ``overflow`` applies.
+        overflow: ``block`` (wait for space) or ``drop`` (discard records
+            below WARNING while the queue is full; a warning reports how
+            many were dropped).
+        sample_rates: Fraction of each named event to keep, below WARNING
+            (see ``EventSampler``).
+
+    Raises:
+        ValueError: If ``overflow`` is not a known policy or a sample rate
+            is outside [0, 1].
     """
+    global _listener
+    if overflow not in QUEUE_OVERFLOW_POLICIES:
+        raise ValueError(
+            f"Unknown log queue overflow policy {overflow!r}; "
+            f"expected one of {QUEUE_OVERFLOW_POLICIES}"
+        )
     log_level_upper = log_level.upper()
     numeric_log_level = getattr(logging, log_level_upper, logging.INFO)
 
@@ -29,22 +244,28 @@ def configure_logging(log_level: str = "INFO") -> None:
         structlog.processors.UnicodeDecoder(),
     ]
 
+    # Sampling runs first, so dropped events skip the other processors
+    sampling = [EventSampler(sample_rates)] if sample_rates else []
+
     # Configure structlog
     structlog.configure(
-        processors=shared_processors
+        processors=sampling
+        + shared_processors
         + [
             # Prepare event dict for standard library logging
             structlog.stdlib.ProcessorFormatter.wrap_for_formatter,
         ],
         logger_factory=structlog.stdlib.LoggerFactory(),
-        wrapper_class=structlog.stdlib.BoundLogger,
+        # Methods below the level are no-ops: no processors, no LogRecord
+        wrapper_class=_LevelFilteringBoundLogger,
         cache_logger_on_first_use=True,
     )
+    _set_level(numeric_log_level)
 
     # Configure the underlying standard library logging handler
     formatter = structlog.stdlib.ProcessorFormatter(
         # Render event dict as JSON
-        processor=structlog.processors.JSONRenderer(),
+        processor=json_renderer(),
         # Add foreign processors if needed (e.g., from other libraries)
         foreign_pre_chain=shared_processors,
     )
@@ -52,13 +273,24 @@ def configure_logging(log_level: str = "INFO") -> None:
     handler = logging.StreamHandler(sys.stdout)
     handler.setFormatter(formatter)
 
+    previous_listener, _listener = _listener, None
+    root_handler: logging.Handler = handler
+    if use_queue:
+        log_queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        root_handler = _EnqueueHandler(log_queue, overflow)
+        _listener = _Listener(log_queue, handler)
+        _listener.start()
+
     # Configure the root logger
     root_logger = logging.getLogger()
     # Remove existing handlers if any to avoid duplicates
     if root_logger.hasHandlers():
         root_logger.handlers.clear()
-    root_logger.addHandler(handler)
+    root_logger.addHandler(root_handler)
     root_logger.setLevel(numeric_log_level)
+    # Flush what the previous listener still holds, now that nothing feeds it
+    if previous_listener is not None:
+        previous_listener.stop()
 
     # Suppress overly verbose logs from libraries if needed
     # logging.getLogger("httpx").setLevel(logging.WARNING)
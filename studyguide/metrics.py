@@ -0,0 +1,253 @@
+"""
+Prometheus metrics for the Study Guide Generator.
+
+Metrics are off until ``enable()`` is called (the CLI does so for
+``--metrics-port`` and ``--metrics-file``). Until then every metric below is
+a no-op stand-in, so instrumented code neither imports ``prometheus_client``
+(an optional dependency that takes tens of milliseconds to import) nor pays
+for lock-protected updates on its hot paths.
+
+Call sites look the metrics up on this module when they update them
+(``metrics.API_RETRIES.labels(...).inc()``), never with ``from ... import``,
+so they see the real metrics once ``enable()`` has replaced the stand-ins.
+
+Only the process that calls ``enable()`` is measured: work done in worker
+processes (``parse_many``, diagram and minifier pools) is not counted.
+"""
+
+import functools
+import threading
+import time
+from typing import Any, Callable, Mapping, Optional
+
+# Request latency of LLM completions: sub-second cache-warm calls up to the
+# 60 s read timeout
+API_DURATION_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 45.0, 60.0, 120.0)
+# Pipeline stages: parsing takes a fraction of a millisecond, rendering a
+# page a few milliseconds
+STAGE_DURATION_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0
+)
+
+
+class _NullMetric:
+    """Stands in for every metric until ``enable()``: each update is a no-op."""
+
+    def labels(self, *args: Any, **kwargs: Any) -> "_NullMetric":
+        return self
+
+    def inc(self, amount: float = 1) -> None:
+        pass
+
+    def dec(self, amount: float = 1) -> None:
+        pass
+
+    def set(self, value: float) -> None:
+        pass
+
+    def observe(self, amount: float) -> None:
+        pass
+
+
+_NULL = _NullMetric()
+
+API_REQUEST_DURATION: Any = _NULL
+API_RESPONSES: Any = _NULL
+API_RETRIES: Any = _NULL
+API_IN_FLIGHT: Any = _NULL
+API_TOKENS: Any = _NULL
+API_COST: Any = _NULL
+CACHE_LOOKUPS: Any = _NULL
+CACHE_MISSES: Any = _NULL
+STAGE_DURATION: Any = _NULL
+
+# The registry holding the metrics; None until enable()
+registry: Optional[Any] = None
+_enable_lock = threading.Lock()
+
+
+def enable() -> Any:
+    """
+    Creates the metrics, once per process, in a dedicated registry.
+
+    Returns:
+        The ``prometheus_client.CollectorRegistry`` holding them.
+
+    Raises:
+        ImportError: If ``prometheus_client`` is not installed.
+    """
+    global registry, API_REQUEST_DURATION, API_RESPONSES, API_RETRIES, API_IN_FLIGHT
+    global API_TOKENS, API_COST, CACHE_LOOKUPS, CACHE_MISSES, STAGE_DURATION
+    with _enable_lock:
+        if registry is not None:
+            return registry
+        try:
+            import prometheus_client as prom
+        except ImportError as e:
+            raise ImportError(
+                "Metrics export requires prometheus_client (pip install prometheus-client)"
+            ) from e
+
+        new_registry = prom.CollectorRegistry()
+        API_REQUEST_DURATION = prom.Histogram(
+            "studyguide_api_request_duration_seconds",
+            "Time from sending a Perplexity API request to its response (or the end of its stream)",
+            ["model", "mode"],
+            buckets=API_DURATION_BUCKETS,
+            registry=new_registry,
+        )
+        API_RESPONSES = prom.Counter(
+            "studyguide_api_responses_total",
+            "Perplexity API requests by HTTP status, or by exception type if none arrived",
+            ["model", "mode", "status"],
+            registry=new_registry,
+        )
+        API_RETRIES = prom.Counter(
+            "studyguide_api_retries_total",
+            "Perplexity API calls retried after a transient error",
+            ["model"],
+            registry=new_registry,
+        )
+        API_IN_FLIGHT = prom.Gauge(
+            "studyguide_api_requests_in_flight",
+            "Perplexity API requests sent and not yet answered",
+            registry=new_registry,
+        )
+        API_TOKENS = prom.Counter(
+            "studyguide_api_tokens_total",
+            "Tokens billed by the Perplexity API",
+            ["model", "type"],
+            registry=new_registry,
+        )
+        API_COST = prom.Counter(
+            "studyguide_api_cost_usd_total",
+            "Estimated Perplexity API spend in USD",
+            ["model"],
+            registry=new_registry,
+        )
+        CACHE_LOOKUPS = prom.Counter(
+            "studyguide_cache_lookups_total",
+            "Cache lookups (hits are lookups minus misses)",
+            ["cache"],
+            registry=new_registry,
+        )
+        CACHE_MISSES = prom.Counter(
+            "studyguide_cache_misses_total",
+            "Cache lookups that found nothing",
+            ["cache"],
+            registry=new_registry,
+        )
+        STAGE_DURATION = prom.Histogram(
+            "studyguide_stage_duration_seconds",
+            "Time spent in a pipeline stage, per chapter parsed or page rendered",
+            ["stage"],
+            buckets=STAGE_DURATION_BUCKETS,
+            registry=new_registry,
+        )
+        registry = new_registry
+        return registry
+
+
+def start_http_server(port: int, addr: str = "127.0.0.1") -> None:
+    """
+    Enables the metrics and serves them for scraping at ``http://addr:port/metrics``
+    from a daemon thread.
+
+    Raises:
+        ImportError: If ``prometheus_client`` is not installed.
+        OSError: If the address cannot be bound.
+    """
+    import prometheus_client
+
+    prometheus_client.start_http_server(port, addr=addr, registry=enable())
+
+
+def write_textfile(path: str) -> None:
+    """
+    Writes the current metrics to ``path`` in the text exposition format, for
+    the node exporter's textfile collector. The file is replaced atomically.
+    Does nothing if the metrics were never enabled.
+    """
+    if registry is None:
+        return
+    import prometheus_client
+
+    prometheus_client.write_to_textfile(str(path), registry)
+
+
+def timed_stage(stage: str) -> Callable[[Callable], Callable]:
+    """
+    Decorator recording the duration of each call, whether it returns or
+    raises, in ``studyguide_stage_duration_seconds{stage=...}``.
+    """
+
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            if registry is None:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                STAGE_DURATION.labels(stage=stage).observe(time.perf_counter() - start)
+
+        return wrapper
+
+    return decorator
+
+
+class _RequestTracker:
+    __slots__ = ("model", "mode", "status", "_start")
+
+    def __init__(self, model: str, mode: str):
+        self.model = model
+        self.mode = mode
+        self.status: Any = None
+        self._start: Optional[float] = None
+
+    def __enter__(self) -> "_RequestTracker":
+        if registry is not None:
+            API_IN_FLIGHT.inc()
+            self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if self._start is None:
+            return
+        API_IN_FLIGHT.dec()
+        API_REQUEST_DURATION.labels(model=self.model, mode=self.mode).observe(
+            time.perf_counter() - self._start
+        )
+        status = self.status
+        if status is None:
+            status = exc_type.__name__ if exc_type is not None else "unknown"
+        API_RESPONSES.labels(model=self.model, mode=self.mode, status=str(status)).inc()
+
+
+def track_request(model: str, mode: str = "complete") -> _RequestTracker:
+    """
+    Returns a context manager measuring one Perplexity API request: the
+    in-flight gauge, its duration and its outcome.
+
+    Set the tracker's ``status`` to the HTTP status code once the response
+    arrives. If the block raises before that, the exception's type name
+    (e.g. ``ReadTimeout``) is recorded instead.
+
+    Args:
+        model: The model the request was sent to.
+        mode: ``complete`` or ``stream``.
+    """
+    return _RequestTracker(model, mode)
+
+
+def record_usage(model: str, usage: Optional[Mapping[str, Any]], cost_usd: float) -> None:
+    """Counts the tokens and cost of one completed API call."""
+    if registry is None:
+        return
+    if usage:
+        for kind in ("prompt", "completion"):
+            tokens = usage.get(f"{kind}_tokens")
+            if tokens:
+                API_TOKENS.labels(model=model, type=kind).inc(tokens)
+    API_COST.labels(model=model).inc(cost_usd)
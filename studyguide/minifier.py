@@ -0,0 +1,38 @@
+"""
+HTML minification stage of the site build.
+
+``encode_page`` minifies a rendered page with minify-html and encodes it for
+writing (``studyguide.writer`` does the I/O). It runs in ``SiteBuild``'s
+worker processes, so this module deliberately imports nothing but the
+standard library and minify-html: spawned workers start fast and never load
+the API client or the settings.
+"""
+
+import time
+from typing import Tuple
+
+import minify_html
+
+# Output stays valid HTML5; inline CSS/JS in templates is minified too
+MINIFY_OPTIONS = {"minify_css": True, "minify_js": True}
+
+
+def minify_page(html: str) -> str:
+    """Returns the minified form of an HTML page."""
+    return minify_html.minify(html, **MINIFY_OPTIONS)
+
+
+def encode_page(html: str, minify: bool = True) -> Tuple[int, bytes, float]:
+    """
+    Minifies (optionally) and UTF-8 encodes a page.
+
+    Returns:
+        ``(rendered_bytes, data, minify_seconds)``.
+    """
+    rendered = len(html.encode("utf-8"))
+    seconds = 0.0
+    if minify:
+        start = time.perf_counter()
+        html = minify_page(html)
+        seconds = time.perf_counter() - start
+    return rendered, html.encode("utf-8"), seconds
@@ -2,20 +2,32 @@
 Parses raw text content (expected from Perplexity API) into structured Pydantic models.
 """
 
+import bisect
+import logging
+import math
+import os
 import re
-from typing import Any, Dict, List, Optional
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence, Union
 
 import structlog
 from pydantic import (
     BaseModel,
     Field,
     ValidationError,
-    field_validator,
+    ValidationInfo, # Import ValidationInfo
     model_validator,
 )
 
+from studyguide import metrics
+from studyguide.logging_config import is_enabled
+
 logger = structlog.get_logger() # Use default logger name
 
+# Bump whenever a change alters what parse_chapter_response returns for some
+# input; cached parse results from other versions are then ignored.
+PARSER_VERSION = 1
+
 
 class ParseError(Exception):
     """Custom exception for parsing failures."""
@@ -23,33 +35,8 @@ class ParseError(Exception):
     pass
 
 
-class QuizItem(BaseModel):
-    """Represents a single quiz question with options and the correct answer."""
-
-    question: str = Field(..., description="The quiz question.")
-    options: List[str] = Field(
-        ..., min_length=2, description="List of possible answers."
-    )
-    correct_answer: str = Field(
-        ..., description="The correct answer from the options."
-    )
-
-from pydantic import (
-    BaseModel,
-    Field,
-    ValidationError,
-    ValidationInfo, # Import ValidationInfo
-    field_validator,
-    model_validator,
-)
-
-logger = structlog.get_logger() # Use default logger name
-
-
-class ParseError(Exception):
-    """Custom exception for parsing failures."""
-
-    pass
+# Validation context marking data this package has already validated
+_TRUSTED = {"trusted": True}
 
 
 class QuizItem(BaseModel):
@@ -63,22 +50,22 @@ class QuizItem(BaseModel):
         ..., description="The correct answer from the options."
     )
 
-    @field_validator("correct_answer")
-    def correct_answer_must_be_in_options(cls, v: str, info: ValidationInfo) -> str: # Change 'values' to 'info: ValidationInfo'
+    @model_validator(mode="after")
+    def correct_answer_must_be_in_options(self, info: ValidationInfo) -> "QuizItem":
         """Validate that the correct answer is indeed one of the options."""
-        # Pydantic v2: Access field values via the info.data dictionary
-        # The validator receives the value `v` and the `info` object which has `info.data`
-        options = info.data.get("options")
-        if options and v not in options:
+        if info.context is _TRUSTED:
+            return self # Checked when the data was first parsed
+        # Options and answer are checked together, once both are validated
+        if self.correct_answer not in set(self.options):
             logger.warning( # Use warning level for validation logic issues
                 "Validation Warning: Correct answer not in options",
-                correct_answer=v,
-                options=options,  # Use the variable 'options' defined above
+                correct_answer=self.correct_answer,
+                options=self.options,
             )
             raise ValueError(
                 "Correct answer must be one of the provided options"
             )
-        return v
+        return self
 
 
 class Section(BaseModel):
@@ -109,10 +96,217 @@ class Chapter(BaseModel):
     )
 
 
+def load_chapter(data: Dict[str, Any], trusted: bool = False) -> Chapter:
+    """
+    Builds a Chapter from plain data, such as a ``model_dump()`` read back
+    from a cache.
+
+    Nested sections and quiz items are built in the same single pass as the
+    chapter. With ``trusted``, the semantic checks that already passed when
+    the data was first parsed (the correct answer being one of the options)
+    are skipped; only the cheap structural coercion done by pydantic-core
+    remains, which measures faster than ``model_construct`` (pure Python).
+
+    Args:
+        data: The chapter fields, with sections and quiz items as dicts.
+        trusted: Skip re-checking data this package validated itself (e.g.
+            our own cache). Never set it for data from anywhere else.
+
+    Returns:
+        The Chapter.
+
+    Raises:
+        ValidationError: If the data does not fit the Chapter structure.
+    """
+    return Chapter.model_validate(data, context=_TRUSTED if trusted else None)
+
+
+# --- Tokenizer ---
+# One pattern finds every structural marker of a chapter in a single
+# left-to-right scan. Fields are then resolved from the token positions,
+# reproducing what the former per-field regexes extracted without rescanning
+# the text or backtracking over it. The leading character class lets the
+# regex engine skip straight to candidate characters.
+_TOKEN_PATTERN = re.compile(
+    r"[#*\d-]"
+    r"(?:(?<=#)(?:(?P<title>\s*Chapter Title:)|(?P<section>#\s*Section\s*\d+:))"
+    r"|(?<=\*)\*(?:(?P<intro>Introduction:)|(?P<summary>Summary:)|(?P<keywords>Keywords:)"
+    r"|(?P<quiz>Quiz:)|(?P<answer>Correct Answer:))(?=\*\*)"
+    r"|(?<=\d)(?P<number>\d*\.)(?P<question>\s*\*\*Question:(?=\*\*))?"
+    r"|(?<=-)(?P<rule>--))"
+)
+# The closing "**" of a bold marker is matched by lookahead, since the
+# next marker may open with the same asterisks
+_BOLD_CLOSE = 2
+_SPACE_PATTERN = re.compile(r"\s*")
+_QUIZ_OPTION_PATTERN = re.compile(r"^\s*\*\s*(.+?)\s*$", re.MULTILINE)
+
+
+class _Tokens:
+    """Marker positions of one chapter text, collected in a single scan."""
+
+    __slots__ = (
+        "title", "intro", "section", "summary", "keywords", "quiz",
+        "question", "answer", "item", "rule", "line_rule",
+    )
+
+    def __init__(self, text: str):
+        found = {name: [] for name in self.__slots__}
+        item, rule, line_rule = found["item"], found["rule"], found["line_rule"]
+        for match in _TOKEN_PATTERN.finditer(text):
+            kind = match.lastgroup
+            start = match.start()
+            at_line_start = start == 0 or text[start - 1] == "\n"
+            if kind == "rule":
+                rule.append(start)
+                if at_line_start:
+                    line_rule.append(start)
+                continue
+            if kind == "number" or kind == "question":
+                # A numbered line ends the previous quiz answer
+                if at_line_start:
+                    item.append(start)
+                if kind == "number":
+                    continue
+            elif kind == "title" and not _opens_line(text, start):
+                continue
+            end = match.end()
+            if kind != "title" and kind != "section":
+                end += _BOLD_CLOSE
+            found[kind].append((start, end))
+        for name, positions in found.items():
+            setattr(self, name, positions)
+
+
+def _opens_line(text: str, pos: int) -> bool:
+    """Whether only whitespace precedes ``pos`` on its line."""
+    while pos and text[pos - 1] != "\n":
+        if not text[pos - 1].isspace():
+            return False
+        pos -= 1
+    return True
+
+
+def _next_at(positions: List[int], pos: int, default: int) -> int:
+    """Returns the first position >= ``pos``, or ``default``."""
+    index = bisect.bisect_left(positions, pos)
+    return positions[index] if index < len(positions) else default
+
+
+def _value_after(
+    text: str, pos: int, end: int, newline_required: bool = False
+) -> Optional[tuple]:
+    """
+    Reads a marker's value: the line holding the first non-blank character
+    at or after ``pos``, with surrounding whitespace removed.
+
+    Returns:
+        ``(value, end_of_line)``, or None if there is no such line (or it is
+        not terminated by a newline when ``newline_required``).
+    """
+    start = _SPACE_PATTERN.match(text, pos, end).end()
+    if start >= end:
+        return None
+    eol = text.find("\n", start, end)
+    if eol == -1:
+        if newline_required:
+            return None
+        eol = end
+    return text[start:eol].rstrip(), eol
+
+
+def _delimited(text: str, tokens: _Tokens, markers: List[tuple]) -> Optional[str]:
+    """Content between the first marker and the next ``---``."""
+    if not markers:
+        return None
+    start = markers[0][1]
+    end = _next_at(tokens.rule, start, -1)
+    if end == -1:
+        return None
+    return text[start:end].strip()
+
+
+def _scan_sections(text: str, tokens: _Tokens) -> List[tuple]:
+    """Each heading's content runs to the next ``---`` (or the end of text)."""
+    sections = []
+    pos = 0
+    for start, end in tokens.section:
+        if start < pos:
+            continue # Swallowed by the previous section's content
+        heading = _value_after(text, end, len(text), newline_required=True)
+        if heading is None:
+            break
+        heading, eol = heading
+        content_start = eol + 1
+        pos = _next_at(tokens.rule, content_start, len(text))
+        sections.append((heading, text[content_start:pos].strip()))
+        if pos == len(text):
+            break
+    return sections
+
+
+def _scan_keywords(text: str, tokens: _Tokens) -> Optional[str]:
+    """The block after a ``**Keywords:**`` line, up to a line starting ``---``."""
+    for _, end in tokens.keywords:
+        blank_end = _SPACE_PATTERN.match(text, end).end()
+        newline = text.rfind("\n", end, blank_end)
+        if newline == -1:
+            continue # Keywords on the marker line itself are not supported
+        start = newline + 1
+        # The terminating newline must lie inside the block
+        stop = _next_at(tokens.line_rule, start + 1, len(text) + 1) - 1
+        return text[start:stop].strip()
+    return None
+
+
+def _scan_quiz(text: str, tokens: _Tokens) -> Optional[List[tuple]]:
+    """
+    Extracts ``(question, options_block, answer)`` triples from the quiz block.
+
+    Returns:
+        None if there is no quiz section.
+    """
+    if not tokens.quiz:
+        return None
+    block_start = _SPACE_PATTERN.match(text, tokens.quiz[0][1]).end()
+    block_end = len(text.rstrip())
+    items = []
+    pos = block_start
+    for start, end in tokens.question:
+        if start < pos:
+            continue # Before the quiz block or inside a previous item
+        question = _value_after(text, end, block_end, newline_required=True)
+        if question is None:
+            break
+        question, eol = question
+        options_start = eol + 1
+        index = bisect.bisect_left(tokens.answer, (options_start,))
+        if index == len(tokens.answer):
+            break
+        marker_start, marker_end = tokens.answer[index]
+        answer_start = _SPACE_PATTERN.match(text, marker_end, block_end).end()
+        if answer_start >= block_end:
+            break
+        # An answer runs until the next numbered line
+        next_item = _next_at(tokens.item, answer_start + 1, block_end + 1)
+        pos = min(next_item - 1, block_end)
+        items.append(
+            (
+                question,
+                text[options_start:marker_start].rstrip(),
+                text[answer_start:pos].strip(),
+            )
+        )
+    return items
+
+
+@metrics.timed_stage("parse")
 def parse_chapter_response(raw_text: str) -> Chapter:
     """
     Parses raw text (expected Markdown-like format) into a Chapter object.
 
+    The text is tokenized in a single pass; see ``_TOKEN_PATTERN``.
+
     Args:
         raw_text: The raw string response from the AI API.
 
@@ -123,106 +317,86 @@ def parse_chapter_response(raw_text: str) -> Chapter:
         ParseError: If the text cannot be parsed into the Chapter structure.
         ValidationError: If the extracted data fails Pydantic validation.
     """
-    logger.debug("Starting chapter response parsing", raw_text_length=len(raw_text))
-
-    # Define regex patterns for extraction based on the assumed Markdown structure
-    # Making patterns robust to variations in whitespace and line endings
-    title_pattern = re.compile(r"^\s*#\s*Chapter Title:\s*(.+?)\s*$", re.MULTILINE)
-    intro_pattern = re.compile(
-        r"\*\*Introduction:\*\*\s*(.*?)\s*---", re.MULTILINE | re.DOTALL
-    )
-    section_pattern = re.compile(
-        r"##\s*Section\s*\d+:\s*(.+?)\s*\n(.*?)\s*(?=(?:---|\Z))",
-        re.MULTILINE | re.DOTALL,
-    )
-    summary_pattern = re.compile(
-        r"\*\*Summary:\*\*\s*(.*?)\s*---", re.MULTILINE | re.DOTALL
-    )
-    keywords_pattern = re.compile(
-        r"\*\*Keywords:\*\*\s*\n(.*?)(?=\n---|\Z)", re.MULTILINE | re.DOTALL
-    )
-    quiz_pattern = re.compile(
-        r"\*\*Quiz:\*\*\s*(.*)", re.MULTILINE | re.DOTALL
-    )
-    quiz_item_pattern = re.compile(
-        r"\d+\.\s*\*\*Question:\*\*\s*(.+?)\s*\n(.*?)\s*\*\*Correct Answer:\*\*\s*(.+?)\s*(?=\n\d+\.|\Z)",
-        re.MULTILINE | re.DOTALL,
-    )
-    quiz_option_pattern = re.compile(r"^\s*\*\s*(.+?)\s*$", re.MULTILINE)
+    # Checked once: disabled debug calls would still build their fields
+    debug = is_enabled(logger, logging.DEBUG)
+    if debug:
+        logger.debug("Starting chapter response parsing", raw_text_length=len(raw_text))
 
     try:
+        tokens = _Tokens(raw_text)
+
         # Extract Title
-        title_match = title_pattern.search(raw_text)
-        if not title_match:
+        title = None
+        for _, end in tokens.title:
+            value = _value_after(raw_text, end, len(raw_text))
+            if value is not None:
+                title = value[0]
+                break
+        if title is None:
             raise ParseError("Could not find chapter title matching pattern.")
-        title = title_match.group(1).strip()
-        logger.debug("Extracted title", title=title)
+        if debug:
+            logger.debug("Extracted title", title=title)
 
         # Extract Introduction
-        intro_match = intro_pattern.search(raw_text)
-        if not intro_match:
+        introduction = _delimited(raw_text, tokens, tokens.intro)
+        if introduction is None:
             raise ParseError("Could not find introduction section.")
-        introduction = intro_match.group(1).strip()
-        logger.debug("Extracted introduction", length=len(introduction))
+        if debug:
+            logger.debug("Extracted introduction", length=len(introduction))
 
         # Extract Sections
-        sections_data = section_pattern.findall(raw_text)
+        sections_data = _scan_sections(raw_text, tokens)
         if not sections_data:
             raise ParseError("Could not find any sections.")
+        # Nested models are validated once, with the chapter
         sections = [
-            Section(heading=heading.strip(), content=content.strip())
+            {"heading": heading, "content": content}
             for heading, content in sections_data
         ]
-        logger.debug("Extracted sections", count=len(sections))
+        if debug:
+            logger.debug("Extracted sections", count=len(sections))
 
         # Extract Summary
-        summary_match = summary_pattern.search(raw_text)
-        if not summary_match:
+        summary = _delimited(raw_text, tokens, tokens.summary)
+        if summary is None:
             raise ParseError("Could not find summary section.")
-        summary = summary_match.group(1).strip()
-        logger.debug("Extracted summary", length=len(summary))
+        if debug:
+            logger.debug("Extracted summary", length=len(summary))
 
         # Extract Keywords (Optional)
-        keywords_match = keywords_pattern.search(raw_text)
+        keyword_block = _scan_keywords(raw_text, tokens)
         keywords = None
-        if keywords_match:
-            keyword_block = keywords_match.group(1).strip()
+        if keyword_block is not None:
             # Extract keywords assuming they are bullet points
             keywords = [
                 line.strip("-* ").strip()
                 for line in keyword_block.split("\n")
                 if line.strip()
             ]
-            logger.debug("Extracted keywords", keywords=keywords)
+            if debug:
+                logger.debug("Extracted keywords", keywords=keywords)
         else:
-            logger.debug("No keywords section found.")
+            if debug:
+                logger.debug("No keywords section found.")
 
 
         # Extract Quiz
-        quiz_match = quiz_pattern.search(raw_text)
-        if not quiz_match:
+        quiz_items_data = _scan_quiz(raw_text, tokens)
+        if quiz_items_data is None:
             raise ParseError("Could not find quiz section.")
-        quiz_block = quiz_match.group(1).strip()
-
-        quiz_items_data = quiz_item_pattern.findall(quiz_block)
         if not quiz_items_data:
             raise ParseError("Could not find any quiz items within the quiz section.")
 
         quiz = []
         for question, options_block, correct_answer in quiz_items_data:
-            options = quiz_option_pattern.findall(options_block)
+            options = _QUIZ_OPTION_PATTERN.findall(options_block)
             if not options:
                  raise ParseError(f"Could not find options for question: {question[:50]}...")
-            cleaned_options = [opt.strip() for opt in options]
-            cleaned_correct_answer = correct_answer.strip()
-
-            quiz_item = QuizItem(
-                question=question.strip(),
-                options=cleaned_options,
-                correct_answer=cleaned_correct_answer,
+            quiz.append(
+                {"question": question, "options": options, "correct_answer": correct_answer}
             )
-            quiz.append(quiz_item)
-        logger.debug("Extracted quiz items", count=len(quiz))
+        if debug:
+            logger.debug("Extracted quiz items", count=len(quiz))
 
 
         # Assemble Chapter object
@@ -235,7 +409,7 @@ def parse_chapter_response(raw_text: str) -> Chapter:
             "keywords": keywords,
         }
 
-        chapter = Chapter(**chapter_data)
+        chapter = Chapter.model_validate(chapter_data)
         logger.info("Successfully parsed and validated chapter response", title=chapter.title)
         return chapter
 
@@ -260,3 +434,173 @@ def parse_chapter_response(raw_text: str) -> Chapter:
              raise ParseError(f"Could not parse raw text: {e}") from e
         else:
              raise # Re-raise if it's already a ParseError
+
+
+# --- Batch parsing ---
+ParseResult = Union[Chapter, ParseError]
+
+
+def _parse_chunk(raw_texts: List[str]) -> List[ParseResult]:
+    """Parses a chunk of responses, returning each failure in place of its chapter."""
+    results: List[ParseResult] = []
+    for raw_text in raw_texts:
+        try:
+            results.append(parse_chapter_response(raw_text))
+        except ParseError as e:
+            results.append(e)
+    return results
+
+
+def parse_many(
+    raw_texts: Sequence[str],
+    workers: Optional[int] = None,
+    chunksize: Optional[int] = None,
+) -> List[ParseResult]:
+    """
+    Parses many raw chapter responses across a pool of worker processes.
+
+    Responses are sent to the workers in chunks to amortise inter-process
+    overhead. A response that fails to parse does not abort the batch: its
+    ``ParseError`` is returned in its place (without the original
+    ``__cause__``, which does not survive the trip between processes).
+
+    Args:
+        raw_texts: The raw responses to parse.
+        workers: Number of worker processes; defaults to the CPU count. With
+            one worker (or a single chunk) parsing runs in this process.
+        chunksize: Responses per task; defaults to about four tasks per worker.
+
+    Returns:
+        One ``Chapter`` or ``ParseError`` per response, in input order.
+    """
+    raw_texts = list(raw_texts)
+    workers = workers or os.cpu_count() or 1
+    if chunksize is None:
+        chunksize = max(1, math.ceil(len(raw_texts) / (workers * 4)))
+    chunks = [
+        raw_texts[start:start + chunksize]
+        for start in range(0, len(raw_texts), chunksize)
+    ]
+
+    if workers == 1 or len(chunks) <= 1:
+        results = _parse_chunk(raw_texts)
+    else:
+        results = []
+        with ProcessPoolExecutor(max_workers=min(workers, len(chunks))) as executor:
+            for chunk_results in executor.map(_parse_chunk, chunks):
+                results.extend(chunk_results)
+
+    logger.info(
+        "Parsed chapter batch",
+        count=len(results),
+        failed=sum(isinstance(result, ParseError) for result in results),
+        workers=min(workers, len(chunks)),
+    )
+    return results
+
+
+# --- Incremental (streaming) parsing ---
+_STREAM_SECTION_HEADING = re.compile(r"##\s*Section\s*\d+:\s*(.+?)\s*$")
+_STREAM_QUESTION = re.compile(r"\d+\.\s*\*\*Question:\*\*\s*(.+?)\s*$")
+_STREAM_OPTION = re.compile(r"^\s*\*\s*(.+?)\s*$")
+_STREAM_ANSWER = re.compile(r"\*\*Correct Answer:\*\*\s*(.+?)\s*$")
+
+
+class ChapterStreamParser:
+    """
+    Incrementally parses a chapter while its text is still being streamed.
+
+    Feed text fragments as they arrive; ``feed()`` returns the ``Section`` and
+    ``QuizItem`` objects completed by that fragment. A section is complete at
+    its ``---`` delimiter, a quiz item at its ``**Correct Answer:**`` line.
+    Items that fail validation are skipped. ``close()`` parses the full text
+    with ``parse_chapter_response``, which remains the authoritative result.
+    """
+
+    def __init__(self):
+        self._chunks: List[str] = []
+        self._partial_line = ""
+        self._section_heading: Optional[str] = None
+        self._section_lines: List[str] = []
+        self._in_quiz = False
+        self._question: Optional[str] = None
+        self._options: List[str] = []
+
+    def feed(self, text: str) -> List[BaseModel]:
+        """
+        Consumes the next fragment of streamed text.
+
+        Args:
+            text: The next fragment (any length, may split lines).
+
+        Returns:
+            Sections and quiz items completed by this fragment, in order.
+        """
+        self._chunks.append(text)
+        lines = (self._partial_line + text).split("\n")
+        self._partial_line = lines.pop()
+        completed: List[BaseModel] = []
+        for line in lines:
+            item = self._consume_line(line)
+            if item is not None:
+                completed.append(item)
+        return completed
+
+    def close(self) -> Chapter:
+        """
+        Finishes the stream and returns the fully parsed chapter.
+
+        Raises:
+            ParseError: If the complete text cannot be parsed.
+        """
+        return parse_chapter_response("".join(self._chunks))
+
+    def _consume_line(self, line: str) -> Optional[BaseModel]:
+        if self._section_heading is not None:
+            delimiter = line.find("---")
+            if delimiter == -1:
+                self._section_lines.append(line)
+                return None
+            self._section_lines.append(line[:delimiter])
+            section = Section(
+                heading=self._section_heading,
+                content="\n".join(self._section_lines).strip(),
+            )
+            self._section_heading = None
+            self._section_lines = []
+            return section
+
+        heading = _STREAM_SECTION_HEADING.search(line)
+        if heading:
+            self._section_heading = heading.group(1)
+            return None
+
+        if "**Quiz:**" in line:
+            self._in_quiz = True
+            return None
+        if not self._in_quiz:
+            return None
+
+        if self._question is None:
+            question = _STREAM_QUESTION.search(line)
+            if question:
+                self._question = question.group(1)
+                self._options = []
+            return None
+
+        answer = _STREAM_ANSWER.search(line)
+        if answer:
+            question, options = self._question, self._options
+            self._question, self._options = None, []
+            try:
+                return QuizItem(
+                    question=question, options=options, correct_answer=answer.group(1)
+                )
+            except ValidationError:
+                logger.debug("Skipping invalid streamed quiz item", question=question[:50])
+                return None
+
+        option = _STREAM_OPTION.match(line)
+        if option:
+            self._options.append(option.group(1))
+        return None
@@ -0,0 +1,278 @@
+"""
+Client-side rate limiting for the Perplexity API.
+
+Combines token buckets (requests per second, tokens per minute) with an
+AIMD (additive increase, multiplicative decrease) concurrency limit, and
+honours the server's ``Retry-After`` and ``x-ratelimit-*`` headers. The aim is
+to keep throughput just under the provider's limit instead of discovering it
+through 429 responses.
+"""
+
+import asyncio
+import collections
+import contextlib
+import email.utils
+import re
+import time
+from typing import AsyncIterator, Deque, Mapping, Optional
+
+import structlog
+
+logger = structlog.get_logger()
+
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_DURATION_UNITS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+
+def parse_duration(value: Optional[str]) -> Optional[float]:
+    """
+    Parses a rate limit duration header into seconds.
+
+    Accepts plain seconds (``"2"``, ``"0.5"``), Go-style durations used by
+    ``x-ratelimit-reset-*`` headers (``"1m30s"``, ``"250ms"``) and HTTP dates
+    used by ``Retry-After``.
+
+    Returns:
+        The duration in seconds, or None if the value cannot be parsed.
+    """
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    parts = _DURATION_PART.findall(value)
+    if parts and "".join(n + u for n, u in parts) == value:
+        return sum(float(n) * _DURATION_UNITS[u] for n, u in parts)
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, when.timestamp() - time.time())
+
+
+class TokenBucket:
+    """
+    A token bucket refilled continuously at ``rate`` tokens per second.
+
+    Args:
+        rate: Refill rate in tokens per second.
+        capacity: Maximum number of tokens (the allowed burst).
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self._updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, amount: float = 1.0) -> None:
+        """Waits until ``amount`` tokens are available, then takes them."""
+        # A single request larger than the bucket could never fit otherwise
+        amount = min(amount, self.capacity)
+        self._refill()
+        while self.tokens < amount:
+            await asyncio.sleep((amount - self.tokens) / self.rate)
+            self._refill()
+        self.tokens -= amount
+
+    def adjust(self, delta: float) -> None:
+        """
+        Corrects the bucket once the true cost of a request is known.
+
+        A positive ``delta`` takes extra tokens (the bucket may go negative,
+        delaying later requests); a negative one gives tokens back.
+        """
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens - delta)
+
+
+class Permit:
+    """A granted request slot; report the response with ``observe()``."""
+
+    def __init__(self, estimated_tokens: int):
+        self.estimated_tokens = estimated_tokens
+        self.started = time.monotonic()
+        self.status_code: Optional[int] = None
+        self.headers: Mapping[str, str] = {}
+        self.tokens_used: Optional[int] = None
+
+    def observe(
+        self,
+        status_code: int,
+        headers: Mapping[str, str],
+        tokens_used: Optional[int] = None,
+    ) -> None:
+        """Records the outcome of the request made under this permit."""
+        self.status_code = status_code
+        self.headers = headers
+        self.tokens_used = tokens_used
+
+
+class RateLimiter:
+    """
+    Paces requests and adapts concurrency to the provider's observed limits.
+
+    Args:
+        requests_per_second: Sustained request rate.
+        burst: Number of requests allowed back to back before pacing applies.
+        tokens_per_minute: Sustained token rate; ``0``/None disables the bucket.
+        max_concurrency: Upper bound for the adaptive concurrency limit.
+        min_concurrency: Lower bound for the adaptive concurrency limit.
+        latency_tolerance: Back off when the smoothed latency exceeds this
+            multiple of the best smoothed latency seen so far.
+    """
+
+    def __init__(
+        self,
+        requests_per_second: float,
+        burst: int = 1,
+        tokens_per_minute: Optional[int] = None,
+        max_concurrency: int = 5,
+        min_concurrency: int = 1,
+        latency_tolerance: float = 3.0,
+    ):
+        self.requests = TokenBucket(requests_per_second, max(1, burst))
+        self.tokens = (
+            TokenBucket(tokens_per_minute / 60.0, tokens_per_minute)
+            if tokens_per_minute
+            else None
+        )
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min_concurrency
+        self.latency_tolerance = latency_tolerance
+        self.concurrency = float(max_concurrency)
+        self.in_flight = 0
+        self._waiters: Deque[asyncio.Future] = collections.deque()
+        self._paused_until = 0.0
+        self._latency: Optional[float] = None
+        self._best_latency: Optional[float] = None
+        self._last_decrease = 0.0
+
+    @property
+    def limit(self) -> int:
+        """The current whole-number concurrency limit."""
+        return max(self.min_concurrency, int(self.concurrency))
+
+    def pause(self, seconds: float, reason: str) -> None:
+        """Stops new requests from starting for ``seconds``."""
+        until = time.monotonic() + seconds
+        if until > self._paused_until:
+            self._paused_until = until
+            logger.warning("Pausing API requests", seconds=round(seconds, 3), reason=reason)
+
+    @contextlib.asynccontextmanager
+    async def limit_request(self, estimated_tokens: int = 0) -> AsyncIterator[Permit]:
+        """
+        Context manager wrapping one API request.
+
+        Waits for a concurrency slot, any server-imposed pause and both token
+        buckets before yielding a Permit. On exit the slot is released and the
+        observed outcome feeds the adaptive limit.
+        """
+        await self._acquire_slot()
+        permit = None
+        try:
+            await self._wait_for_pause()
+            await self.requests.acquire()
+            if self.tokens is not None and estimated_tokens:
+                await self.tokens.acquire(estimated_tokens)
+            permit = Permit(estimated_tokens)
+            yield permit
+        finally:
+            self._release_slot()
+            if permit is not None:
+                self._record(permit)
+
+    async def _acquire_slot(self) -> None:
+        while self.in_flight >= self.limit:
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                self._wake()  # Pass on a wake-up this waiter may have consumed
+                raise
+            finally:
+                with contextlib.suppress(ValueError):
+                    self._waiters.remove(waiter)
+        self.in_flight += 1
+
+    def _release_slot(self) -> None:
+        self.in_flight -= 1
+        self._wake()
+
+    def _wake(self) -> None:
+        free = self.limit - self.in_flight
+        for waiter in list(self._waiters):
+            if free <= 0:
+                break
+            if not waiter.done():
+                waiter.set_result(None)
+                free -= 1
+
+    async def _wait_for_pause(self) -> None:
+        while (remaining := self._paused_until - time.monotonic()) > 0:
+            await asyncio.sleep(remaining)
+
+    def _record(self, permit: Permit) -> None:
+        latency = time.monotonic() - permit.started
+        if self.tokens is not None and permit.tokens_used is not None:
+            self.tokens.adjust(permit.tokens_used - permit.estimated_tokens)
+        if permit.status_code is None:
+            return  # Transport error; no signal about the provider's limits
+
+        self._apply_headers(permit.headers)
+        if permit.status_code == 429:
+            retry_after = parse_duration(permit.headers.get("retry-after"))
+            self.pause(retry_after if retry_after is not None else 1.0, "429 response")
+            self._decrease("429 response", force=True)
+            return
+
+        self._latency = (
+            latency if self._latency is None else 0.8 * self._latency + 0.2 * latency
+        )
+        if self._best_latency is None or self._latency < self._best_latency:
+            self._best_latency = self._latency
+        if self._latency > self.latency_tolerance * self._best_latency:
+            self._decrease("latency above tolerance")
+        else:
+            # Additive increase: roughly +1 slot per window of successful calls
+            self.concurrency = min(
+                float(self.max_concurrency), self.concurrency + 1.0 / self.concurrency
+            )
+            self._wake()
+
+    def _apply_headers(self, headers: Mapping[str, str]) -> None:
+        for kind in ("requests", "tokens"):
+            remaining = headers.get(f"x-ratelimit-remaining-{kind}")
+            if remaining is None:
+                continue
+            try:
+                exhausted = float(remaining) <= 0
+            except ValueError:
+                continue
+            reset = parse_duration(headers.get(f"x-ratelimit-reset-{kind}"))
+            if exhausted and reset:
+                self.pause(reset, f"{kind} limit exhausted")
+
+    def _decrease(self, reason: str, force: bool = False) -> None:
+        now = time.monotonic()
+        # Back off at most once per smoothed round trip unless throttled
+        if not force and now - self._last_decrease < (self._latency or 0.0):
+            return
+        self._last_decrease = now
+        previous = self.limit
+        self.concurrency = max(float(self.min_concurrency), self.concurrency / 2)
+        logger.info(
+            "Reducing API concurrency",
+            reason=reason,
+            previous=previous,
+            current=self.limit,
+        )
@@ -0,0 +1,615 @@
+"""
+Renders study guides to HTML pages with Jinja2.
+
+Templates are loaded once per template directory into a shared
+``Environment`` (with ``auto_reload`` off, so looking a template up never
+stats the file), and compiled template code is persisted in a
+``FileSystemBytecodeCache``, so neither a batch of thousands of pages nor a
+new process recompiles them. Each ``Renderer`` resolves its templates once
+and renders every page from the same ``Template`` objects.
+
+``SiteBuild`` adds incremental builds: each page's inputs are hashed into a
+build manifest, and only pages whose hash changed are rendered again. Pages
+stream from rendering to a pool of worker processes that minify them
+(``studyguide.minifier``), so minification runs in parallel with rendering
+and never on the event loop. A writer thread then swaps each changed guide
+into place atomically (``studyguide.writer``). Static assets are published
+once per site under fingerprinted names (``studyguide.assets``).
+"""
+
+import functools
+import hashlib
+import json
+import multiprocessing
+import os
+import threading
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from pathlib import Path
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Deque,
+    Dict,
+    Iterable,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+)
+
+import structlog
+from jinja2 import (
+    Environment,
+    FileSystemBytecodeCache,
+    FileSystemLoader,
+    Template,
+    TemplateError,
+    TemplateRuntimeError,
+    meta,
+    pass_context,
+    select_autoescape,
+)
+from markdown_it import MarkdownIt
+from markupsafe import Markup
+from pydantic import BaseModel
+
+from studyguide import metrics
+from studyguide.assets import STATIC_DIR, Asset, fingerprint_assets, publish_assets
+from studyguide.config import get_settings
+from studyguide.files import write_atomic
+from studyguide.minifier import encode_page
+from studyguide.writer import FSYNC_MODES, GuideWriter, commit_guide, recover_staging
+
+if TYPE_CHECKING:
+    # Only annotations need the engine; importing it would load the API client
+    from studyguide.engine import StudyGuide
+
+logger = structlog.get_logger()
+
+# Bump whenever a code change alters rendered output; every page is then
+# rebuilt on the next incremental build
+RENDERER_VERSION = 2
+MANIFEST_NAME = ".build-manifest.json"
+
+# Raw HTML in model output is escaped, never passed through
+_markdown = MarkdownIt("commonmark", {"html": False})
+
+# Pages live one directory below the site's static directory
+STATIC_PREFIX = f"../{STATIC_DIR}/"
+
+# Rendered guides allowed to queue per minify worker before rendering waits
+_GUIDES_QUEUED_PER_WORKER = 2
+
+
+class RenderError(Exception):
+    """Raised when a page cannot be rendered."""
+
+
+def chapter_filename(index: int) -> str:
+    """Returns the file name of the page for the zero-based chapter ``index``."""
+    return f"chapter-{index + 1}.html"
+
+
+@pass_context
+def asset_url(context: Any, name: str) -> str:
+    """
+    Jinja global returning the fingerprinted URL of a static asset, relative
+    to a guide page, from the page context's ``assets`` mapping.
+    """
+    try:
+        return context["assets"][name]
+    except KeyError:
+        raise TemplateRuntimeError(f"Unknown static asset {name!r}") from None
+
+
+def markdown_filter(text: str) -> Markup:
+    """Jinja filter rendering Markdown (CommonMark, raw HTML escaped)."""
+    return Markup(_markdown.render(text))
+
+
+@functools.lru_cache(maxsize=None)
+def get_environment(
+    template_dir: Path, bytecode_cache_dir: Optional[Path] = None
+) -> Environment:
+    """
+    Returns the shared Jinja2 environment for ``template_dir``.
+
+    Args:
+        template_dir: Directory containing the templates.
+        bytecode_cache_dir: Where compiled templates are persisted between
+            runs; ``None`` keeps them in memory only.
+    """
+    bytecode_cache = None
+    if bytecode_cache_dir is not None:
+        Path(bytecode_cache_dir).mkdir(parents=True, exist_ok=True)
+        bytecode_cache = FileSystemBytecodeCache(str(bytecode_cache_dir))
+    env = Environment(
+        loader=FileSystemLoader(str(template_dir)),
+        autoescape=select_autoescape(["html"]),
+        bytecode_cache=bytecode_cache,
+        auto_reload=False,
+        trim_blocks=True,
+        lstrip_blocks=True,
+    )
+    env.filters["markdown"] = markdown_filter
+    env.globals.update(asset_url=asset_url, chapter_filename=chapter_filename)
+    logger.debug(
+        "Created template environment",
+        template_dir=str(template_dir),
+        bytecode_cache_dir=str(bytecode_cache_dir) if bytecode_cache_dir else None,
+    )
+    return env
+
+
+def _context_default(value: Any) -> Any:
+    if isinstance(value, BaseModel):
+        return value.model_dump()
+    raise TypeError(f"Cannot hash {type(value).__name__} in a page context")
+
+
+class Renderer:
+    """
+    Renders a ``StudyGuide`` to an index page plus one page per chapter.
+
+    Templates only see an explicit per-page context (``topic``, chapter
+    ``titles``, the fingerprinted ``assets`` URLs and, on chapter pages,
+    ``chapter`` and ``index``), so that context plus the template sources
+    fully determine a page's output.
+
+    Args:
+        template_dir: Template directory (defaults to ``AppSettings.template_dir``).
+        bytecode_cache: Persist compiled templates under
+            ``AppSettings.template_cache_dir``.
+        asset_dir: Static asset directory (defaults to ``AppSettings.asset_dir``).
+        minify: Minify written pages (defaults to ``AppSettings.minify_html``).
+        asset_store: Hard-link published assets from the content-addressed
+            store under ``AppSettings.asset_store_dir`` instead of copying.
+
+    Raises:
+        RenderError: If the templates cannot be loaded.
+    """
+
+    def __init__(
+        self,
+        template_dir: Optional[Path] = None,
+        bytecode_cache: bool = True,
+        asset_dir: Optional[Path] = None,
+        minify: Optional[bool] = None,
+        asset_store: bool = True,
+    ):
+        settings = get_settings()
+        self.template_dir = Path(template_dir or settings.app.template_dir).resolve()
+        self.asset_dir = Path(asset_dir or settings.app.asset_dir)
+        self.minify = settings.app.minify_html if minify is None else minify
+        self.asset_store_dir = settings.app.asset_store_dir if asset_store else None
+        cache_dir = settings.app.template_cache_dir.resolve() if bytecode_cache else None
+        self.env = get_environment(self.template_dir, cache_dir)
+        try:
+            # Compile every template (including layouts pulled in by
+            # ``extends``) up front; pages then render from the env's cache
+            for name in self.env.list_templates(extensions=["html"]):
+                self.env.get_template(name)
+            self._index = self.env.get_template("index.html")
+            self._chapter = self.env.get_template("chapter.html")
+            self._template_hashes = {
+                name: self._template_hash(name) for name in ("index.html", "chapter.html")
+            }
+        except TemplateError as e:
+            raise RenderError(f"Cannot load templates from {self.template_dir}: {e}") from e
+
+    def _template_hash(self, name: str) -> str:
+        """Hashes a template's source together with every template it references."""
+        digest = hashlib.blake2b(digest_size=16)
+        pending, seen = [name], set()
+        while pending:
+            current = pending.pop()
+            if current in seen:
+                continue
+            seen.add(current)
+            source, _, _ = self.env.loader.get_source(self.env, current)
+            digest.update(f"{current}\0{source}\0".encode("utf-8"))
+            pending.extend(
+                ref
+                for ref in meta.find_referenced_templates(self.env.parse(source))
+                if ref is not None
+            )
+        return digest.hexdigest()
+
+    @functools.cached_property
+    def assets(self) -> Dict[str, Asset]:
+        """The fingerprinted static assets, keyed by name (hashed once)."""
+        try:
+            return fingerprint_assets(self.asset_dir)
+        except OSError as e:
+            raise RenderError(f"Cannot read assets from {self.asset_dir}: {e}") from e
+
+    @functools.cached_property
+    def asset_urls(self) -> Dict[str, str]:
+        """Fingerprinted URL of each asset relative to a guide page."""
+        return {name: STATIC_PREFIX + asset.filename for name, asset in self.assets.items()}
+
+    def pages(self, guide: "StudyGuide") -> Dict[str, Tuple[Template, Dict[str, Any]]]:
+        """Returns the template and context of every page, keyed by file name."""
+        titles = [chapter.title for chapter in guide.chapters]
+        shared = {"topic": guide.topic, "titles": titles, "assets": self.asset_urls}
+        pages = {"index.html": (self._index, shared)}
+        for index, chapter in enumerate(guide.chapters):
+            pages[chapter_filename(index)] = (
+                self._chapter,
+                {**shared, "chapter": chapter, "index": index},
+            )
+        return pages
+
+    def page_hash(self, template: Template, context: Dict[str, Any]) -> str:
+        """
+        Hashes everything a page's output depends on: the renderer version
+        and minify setting, the template sources and the page context (whose
+        fingerprinted asset URLs change with the assets' content).
+        """
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(
+            f"{RENDERER_VERSION}\0{self.minify:d}\0{self._template_hashes[template.name]}\0".encode()
+        )
+        digest.update(json.dumps(context, default=_context_default).encode("utf-8"))
+        return digest.hexdigest()
+
+    @metrics.timed_stage("render")
+    def render_page(self, template: Template, context: Dict[str, Any]) -> str:
+        """Renders one page from ``pages()``."""
+        try:
+            return template.render(context)
+        except TemplateError as e:
+            raise RenderError(
+                f"Rendering {template.name} of '{context['topic']}' failed: {e}"
+            ) from e
+
+    def render_index(self, guide: "StudyGuide") -> str:
+        """Renders the guide's table of contents page."""
+        return self.render_page(*self.pages(guide)["index.html"])
+
+    def render_chapter(self, guide: "StudyGuide", index: int) -> str:
+        """Renders the page for the zero-based chapter ``index``."""
+        return self.render_page(*self.pages(guide)[chapter_filename(index)])
+
+    def render_guide(self, guide: "StudyGuide") -> Dict[str, str]:
+        """
+        Renders every page of a guide.
+
+        Returns:
+            Page HTML keyed by file name (``index.html``, ``chapter-N.html``).
+        """
+        return {
+            name: self.render_page(template, context)
+            for name, (template, context) in self.pages(guide).items()
+        }
+
+    def write_guide(self, guide: "StudyGuide", output_dir: Path) -> List[Path]:
+        """
+        Renders a guide and atomically replaces ``output_dir`` with its pages,
+        in the calling thread (see ``SiteBuild`` for parallel, incremental
+        builds). Syncs as set by ``AppSettings.write_fsync``.
+
+        Returns:
+            The paths written.
+        """
+        output_dir = Path(output_dir)
+        pages = {
+            name: encode_page(html, self.minify)[1]
+            for name, html in self.render_guide(guide).items()
+        }
+        commit_guide(output_dir, pages, fsync=get_settings().app.write_fsync)
+        logger.info("Guide rendered", topic=guide.topic, pages=len(pages))
+        return [output_dir / name for name in pages]
+
+    def publish_assets(
+        self, site_dir: Path, assets: Optional[Iterable[Asset]] = None
+    ) -> List[Path]:
+        """
+        Publishes static assets (default: all of them) under their
+        fingerprinted names to ``<site_dir>/_static``, where the pages of
+        guides written to ``<site_dir>/<slug>/`` expect them. Assets already
+        published are skipped.
+
+        Returns:
+            The files created.
+        """
+        if assets is None:
+            assets = self.assets.values()
+        try:
+            return publish_assets(assets, Path(site_dir) / STATIC_DIR, self.asset_store_dir)
+        except OSError as e:
+            raise RenderError(f"Cannot publish assets to {site_dir}: {e}") from e
+
+
+class _GuideJob(NamedTuple):
+    """A guide's changed pages on their way to the writer thread."""
+
+    slug: str
+    keep: List[str]
+    pages: List[Tuple[str, str, Future]]  # (file name, hash, encode_page future)
+
+
+class SiteBuild:
+    """
+    Incremental build of a site of guides under ``site_dir``.
+
+    The manifest (``<site_dir>/.build-manifest.json``) maps every page and
+    asset written by a build to the hash of its inputs. A page whose hash is
+    unchanged, and whose file still exists, is skipped. Call ``finish()``
+    once every guide has been written, to wait for pending writes, delete
+    pages the build no longer produced (orphans) and save the manifest.
+
+    Changed pages are rendered in the calling thread and handed to a pool of
+    ``workers`` processes that minify them, so rendering the next page
+    overlaps minifying the previous ones. minify-html holds the GIL, hence
+    processes rather than threads. Once all of a guide's pages are minified,
+    a ``GuideWriter`` thread swaps the new version of the guide directory in
+    atomically, so a killed build never leaves a half-written guide. At most
+    ``_GUIDES_QUEUED_PER_WORKER`` guides per worker are queued before
+    rendering waits for the pool. Page hashes are recorded only once their
+    guide is committed; a failed commit is logged, leaves the previous
+    version of the guide in place and is retried by the next build.
+
+    Thread-safe, so guides can be written from ``asyncio.to_thread`` workers.
+
+    Args:
+        renderer: Renders the pages.
+        site_dir: Root directory of the site.
+        workers: Minify processes (defaults to ``AppSettings.minify_workers``,
+            else one per CPU). With one worker, pages are minified in the
+            calling thread.
+        fsync: ``none``, ``guide`` or ``file`` (defaults to
+            ``AppSettings.write_fsync``; see ``studyguide.writer``).
+
+    Raises:
+        ValueError: If ``fsync`` is not a known mode.
+    """
+
+    def __init__(
+        self,
+        renderer: Renderer,
+        site_dir: Path,
+        workers: Optional[int] = None,
+        fsync: Optional[str] = None,
+    ):
+        self.renderer = renderer
+        self.site_dir = Path(site_dir)
+        self.manifest_path = self.site_dir / MANIFEST_NAME
+        settings = get_settings()
+        self.workers = workers or settings.app.minify_workers or os.cpu_count() or 1
+        self.fsync = fsync or settings.app.write_fsync
+        if self.fsync not in FSYNC_MODES:
+            raise ValueError(f"Unknown fsync mode {self.fsync!r}; expected one of {FSYNC_MODES}")
+        self.written = self.skipped = self.deleted = self.failed = 0
+        self.pages_written = self.bytes_rendered = self.bytes_written = 0
+        self.minify_seconds = 0.0
+        recover_staging(self.site_dir)
+        self._previous = self._load_manifest()
+        self._current: Dict[str, str] = {}
+        self._pending: Deque[_GuideJob] = deque()
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._writer: Optional[GuideWriter] = None
+        self._lock = threading.Lock()
+
+    def _load_manifest(self) -> Dict[str, str]:
+        try:
+            data = json.loads(self.manifest_path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logger.warning(
+                "Ignoring unreadable build manifest; rebuilding every page",
+                path=str(self.manifest_path),
+                error=str(e),
+            )
+            return {}
+        return data.get("pages", {}) if isinstance(data, dict) else {}
+
+    def _unchanged(self, key: str, digest: str) -> bool:
+        return self._previous.get(key) == digest and (self.site_dir / key).exists()
+
+    def write_guide(self, guide: "StudyGuide") -> List[Path]:
+        """
+        Renders the pages of ``guide`` whose inputs changed since the last
+        build and queues them to be committed to ``<site_dir>/<slug>/``.
+
+        Returns:
+            The paths being written (unchanged pages are not included). They
+            are committed, all at once, by ``finish()`` at the latest.
+        """
+        keep: List[str] = []
+        changed: List[Tuple[str, str, Future]] = []
+        for name, (template, context) in self.renderer.pages(guide).items():
+            key = f"{guide.slug}/{name}"
+            digest = self.renderer.page_hash(template, context)
+            if self._unchanged(key, digest):
+                keep.append(name)
+                with self._lock:
+                    self._current[key] = digest
+                    self.skipped += 1
+                continue
+            html = self.renderer.render_page(template, context)
+            changed.append((name, digest, self._encode(html)))
+        if changed:
+            with self._lock:
+                self._pending.append(_GuideJob(guide.slug, keep, changed))
+            self._drain(self.workers * _GUIDES_QUEUED_PER_WORKER)
+        logger.debug(
+            "Guide pages built", topic=guide.topic, written=len(changed), slug=guide.slug
+        )
+        return [self.site_dir / guide.slug / name for name, _, _ in changed]
+
+    def _encode(self, html: str) -> Future:
+        if self.workers <= 1:
+            future: Future = Future()
+            try:
+                future.set_result(encode_page(html, self.renderer.minify))
+            except Exception as e:
+                future.set_exception(e)
+            return future
+        with self._lock:
+            if self._executor is None:
+                # Spawned (not forked) workers: the build runs next to the
+                # event loop and its threads, which fork() would copy mid-flight
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            return self._executor.submit(encode_page, html, self.renderer.minify)
+
+    def _drain(self, limit: int) -> None:
+        """
+        Hands minified guides to the writer in submission order, waiting for
+        the oldest ones until at most ``limit`` are pending.
+        """
+        while True:
+            with self._lock:
+                if not self._pending or (
+                    len(self._pending) <= limit
+                    and not all(future.done() for _, _, future in self._pending[0].pages)
+                ):
+                    return
+                job = self._pending.popleft()
+            self._commit(job)
+
+    def _commit(self, job: _GuideJob) -> None:
+        try:
+            encoded = {name: future.result() for name, _, future in job.pages}
+        except Exception as e:
+            self._fail(job, e)
+            return
+        with self._lock:
+            if self._writer is None:
+                self._writer = GuideWriter(self.site_dir, self.fsync)
+            writer = self._writer
+        committed = writer.submit(
+            job.slug, {name: data for name, (_, data, _) in encoded.items()}, job.keep
+        )
+        committed.add_done_callback(functools.partial(self._settle, job, encoded))
+
+    def _settle(
+        self, job: _GuideJob, encoded: Dict[str, Tuple[int, bytes, float]], committed: Future
+    ) -> None:
+        try:
+            dropped = committed.result()
+        except Exception as e:
+            self._fail(job, e)
+            return
+        with self._lock:
+            for name, digest, _ in job.pages:
+                self._current[f"{job.slug}/{name}"] = digest
+            self.written += len(job.pages)
+            self.pages_written += len(job.pages)
+            self.deleted += len(dropped)
+            for rendered, data, seconds in encoded.values():
+                self.bytes_rendered += rendered
+                self.bytes_written += len(data)
+                self.minify_seconds += seconds
+
+    def _fail(self, job: _GuideJob, error: Exception) -> None:
+        logger.error("Writing guide failed", slug=job.slug, error=str(error))
+        with self._lock:
+            self.failed += len(job.pages)
+            # The previous version of the guide is still live: keep tracking
+            # it (its old hashes make the next build retry these pages)
+            for name, _, _ in job.pages:
+                key = f"{job.slug}/{name}"
+                if key in self._previous:
+                    self._current.setdefault(key, self._previous[key])
+
+    def keep_guide(self, slug: str) -> None:
+        """
+        Keeps a guide's pages from the previous build without rebuilding them
+        (e.g. its regeneration failed), so ``finish()`` does not delete them.
+        """
+        prefix = f"{slug}/"
+        with self._lock:
+            for key, digest in self._previous.items():
+                if key.startswith(prefix):
+                    self._current.setdefault(key, digest)
+
+    def publish_assets(self) -> None:
+        """
+        Publishes the static assets not already in the site. A changed asset
+        gets a new fingerprinted name; ``finish()`` deletes the old one.
+        """
+        assets = list(self.renderer.assets.values())
+        created = self.renderer.publish_assets(self.site_dir, assets)
+        with self._lock:
+            for asset in assets:
+                self._current[f"{STATIC_DIR}/{asset.filename}"] = asset.digest
+            self.written += len(created)
+
+    def finish(self, prune: bool = True) -> None:
+        """
+        Commits pending guides, deletes orphaned pages and saves the manifest.
+
+        Args:
+            prune: Delete pages of the previous build that this build did not
+                produce. Pass False for an interrupted build; their manifest
+                entries are then kept instead.
+        """
+        try:
+            self._drain(0)
+        finally:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
+        with self._lock:
+            stale = [key for key in self._previous if key not in self._current]
+            if prune:
+                for key in stale:
+                    self._delete(key)
+            else:
+                for key in stale:
+                    self._current[key] = self._previous[key]
+            self._save_manifest()
+            self._previous = dict(self._current)
+        logger.info(
+            "Site build complete",
+            site_dir=str(self.site_dir),
+            written=self.written,
+            skipped=self.skipped,
+            deleted=self.deleted,
+            failed=self.failed,
+            **self.minify_stats(),
+        )
+
+    def minify_stats(self) -> Dict[str, Any]:
+        """Bytes saved by minification and minify time per written page."""
+        pages = self.pages_written
+        return {
+            "bytes_rendered": self.bytes_rendered,
+            "bytes_written": self.bytes_written,
+            "bytes_saved": self.bytes_rendered - self.bytes_written,
+            "minify_ms_per_page": round(self.minify_seconds * 1000 / pages, 3) if pages > 0 else 0.0,
+        }
+
+    def _delete(self, key: str) -> None:
+        path = self.site_dir / key
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            pass
+        else:
+            self.deleted += 1
+        # Remove directories left empty, up to (not including) the site root
+        parent = path.parent
+        while parent != self.site_dir:
+            try:
+                parent.rmdir()
+            except OSError:
+                break
+            parent = parent.parent
+
+    def _save_manifest(self) -> None:
+        self.site_dir.mkdir(parents=True, exist_ok=True)
+        document = json.dumps(
+            {"renderer_version": RENDERER_VERSION, "pages": self._current},
+            sort_keys=True,
+        )
+        write_atomic(self.manifest_path, document.encode("utf-8"))
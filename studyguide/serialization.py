@@ -0,0 +1,189 @@
+"""
+Compact, versioned binary serialization of parsed chapters.
+
+Layout (little endian)::
+
+    header   magic "SGCH", version (B), flags (B), sections (H), quiz items (H),
+             keywords (H)
+    quiz     per item: option count (B), answer index (B)
+    lengths  character length (I) of every string, in field order
+    text     all strings concatenated, UTF-8 encoded
+
+With ``compress``, everything after the header is zlib-compressed (level 1)
+and the header's flags record it.
+
+Strings appear in field order: title, introduction, summary, each section's
+heading and content, each quiz item's question and options (plus the answer
+when it is not one of the options), then the keywords. Storing the correct
+answer as an option index keeps the most repeated string out of the payload.
+
+Decoding unpacks all lengths with a single ``struct`` call, decodes the text
+blob once and slices it, and hands plain data to ``parser.load_chapter``
+(trusted: the chapter was validated before it was encoded).
+"""
+
+import struct
+import zlib
+from typing import Any, Dict, List
+
+from studyguide.parser import Chapter, load_chapter
+
+FORMAT_VERSION = 1
+_MAGIC = b"SGCH"
+_HEADER = struct.Struct("<4sBBHHH")
+_FLAG_KEYWORDS = 0x01
+_FLAG_ZLIB = 0x02
+# Answer index meaning "the answer follows the options as its own string"
+_ANSWER_INLINE = 0xFF
+_MAX_OPTIONS = 0xFE
+
+
+class SerializationError(Exception):
+    """Raised when a payload cannot be decoded."""
+
+
+def encode_chapter(chapter: Chapter, compress: bool = False) -> bytes:
+    """
+    Encodes a chapter into the binary format.
+
+    Args:
+        chapter: The chapter to encode.
+        compress: zlib-compress the body; trades a little CPU for a payload
+            several times smaller (worthwhile for memory-bound caches).
+
+    Raises:
+        SerializationError: If the chapter exceeds the format's limits
+            (65535 sections, quiz items or keywords; 254 options per item).
+    """
+    strings: List[str] = [chapter.title, chapter.introduction, chapter.summary]
+    for section in chapter.sections:
+        strings.append(section.heading)
+        strings.append(section.content)
+
+    quiz_table = bytearray()
+    for item in chapter.quiz:
+        if len(item.options) > _MAX_OPTIONS:
+            raise SerializationError(f"Too many options: {len(item.options)}")
+        strings.append(item.question)
+        strings.extend(item.options)
+        try:
+            answer = item.options.index(item.correct_answer)
+        except ValueError:
+            answer = _ANSWER_INLINE
+            strings.append(item.correct_answer)
+        quiz_table.append(len(item.options))
+        quiz_table.append(answer)
+
+    keywords = chapter.keywords
+    flags = _FLAG_ZLIB if compress else 0
+    if keywords is not None:
+        flags |= _FLAG_KEYWORDS
+        strings.extend(keywords)
+
+    try:
+        header = _HEADER.pack(
+            _MAGIC,
+            FORMAT_VERSION,
+            flags,
+            len(chapter.sections),
+            len(chapter.quiz),
+            len(keywords or ()),
+        )
+    except struct.error as e:
+        raise SerializationError(f"Chapter too large to encode: {e}") from e
+    lengths = struct.pack(f"<{len(strings)}I", *map(len, strings))
+    body = b"".join((quiz_table, lengths, "".join(strings).encode("utf-8")))
+    if compress:
+        body = zlib.compress(body, 1)
+    return header + body
+
+
+def decode_chapter_data(payload: bytes) -> Dict[str, Any]:
+    """
+    Decodes a payload into plain chapter data (``Chapter.model_dump()`` shape).
+
+    Raises:
+        SerializationError: If the payload is truncated, corrupt or was written
+            by an unsupported format version.
+    """
+    view = memoryview(payload)
+    try:
+        magic, version, flags, n_sections, n_quiz, n_keywords = _HEADER.unpack_from(view)
+    except struct.error as e:
+        raise SerializationError("Truncated chapter payload") from e
+    if magic != _MAGIC:
+        raise SerializationError("Not a chapter payload")
+    if version != FORMAT_VERSION:
+        raise SerializationError(f"Unsupported chapter format version {version}")
+
+    offset = _HEADER.size
+    if flags & _FLAG_ZLIB:
+        try:
+            view = memoryview(zlib.decompress(view[offset:]))
+        except zlib.error as e:
+            raise SerializationError("Corrupt chapter payload") from e
+        offset = 0
+    quiz_table = bytes(view[offset:offset + 2 * n_quiz])
+    if len(quiz_table) != 2 * n_quiz:
+        raise SerializationError("Truncated chapter payload")
+    offset += 2 * n_quiz
+    option_counts, answers = quiz_table[0::2], quiz_table[1::2]
+    for options, answer in zip(option_counts, answers, strict=True):
+        if options > _MAX_OPTIONS or (answer != _ANSWER_INLINE and answer >= options):
+            raise SerializationError("Corrupt chapter payload")
+    n_strings = (
+        3 + 2 * n_sections + n_keywords + n_quiz
+        + sum(option_counts) + answers.count(_ANSWER_INLINE)
+    )
+
+    try:
+        lengths = struct.unpack_from(f"<{n_strings}I", view, offset)
+        text = str(view[offset + 4 * n_strings:], "utf-8")
+    except (struct.error, UnicodeDecodeError) as e:
+        raise SerializationError("Corrupt chapter payload") from e
+    if sum(lengths) != len(text):
+        raise SerializationError("Corrupt chapter payload")
+
+    strings = []
+    position = 0
+    for length in lengths:
+        strings.append(text[position:position + length])
+        position += length
+
+    data: Dict[str, Any] = {
+        "title": strings[0],
+        "introduction": strings[1],
+        "summary": strings[2],
+        "sections": [
+            {"heading": strings[i], "content": strings[i + 1]}
+            for i in range(3, 3 + 2 * n_sections, 2)
+        ],
+    }
+    cursor = 3 + 2 * n_sections
+    quiz = []
+    for options, answer in zip(option_counts, answers, strict=True):
+        question = strings[cursor]
+        choices = strings[cursor + 1:cursor + 1 + options]
+        cursor += 1 + options
+        if answer == _ANSWER_INLINE:
+            correct = strings[cursor]
+            cursor += 1
+        else:
+            correct = choices[answer]
+        quiz.append({"question": question, "options": choices, "correct_answer": correct})
+    data["quiz"] = quiz
+    data["keywords"] = strings[cursor:] if flags & _FLAG_KEYWORDS else None
+    return data
+
+
+def decode_chapter(payload: bytes) -> Chapter:
+    """
+    Decodes a payload produced by ``encode_chapter``.
+
+    The chapter was validated before it was encoded, so it is rebuilt with
+    ``load_chapter(..., trusted=True)``.
+
+    Raises:
+        SerializationError: If the payload cannot be decoded.
+    """
+    return load_chapter(decode_chapter_data(payload), trusted=True)
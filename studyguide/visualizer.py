@@ -1,12 +1,22 @@
 """
 Generates graphical diagrams representing the study guide structure.
+
+Two backends draw the same picture (one cluster per chapter holding the
+intro -> sections -> summary -> quiz chain):
+
+* ``builtin``: emits SVG from a fixed layered layout, or DOT text, directly
+  in Python. No Graphviz process, no heavy imports; used for ``svg`` and
+  ``dot`` output.
+* ``diagrams``: the optional ``diagrams`` package plus the Graphviz ``dot``
+  executable; needed for raster formats such as ``png``. It is imported on
+  first use only.
 """
 
 import os
-from typing import List
+from typing import List, Optional, Tuple
+from xml.sax.saxutils import escape
 
 import structlog
-from diagrams import Cluster, Diagram, Node
 
 # Assuming Chapter is defined in studyguide.parser
 try:
@@ -27,6 +37,36 @@ except ImportError:
 # Configure logger for this module
 logger = structlog.get_logger()
 
+# Bump whenever a change alters drawn diagrams (invalidates diagram caches)
+DIAGRAM_VERSION = 1
+DIAGRAM_BACKENDS = ("builtin", "diagrams")
+BUILTIN_FORMATS = ("svg", "dot")
+_DIAGRAMS_API = ("Cluster", "Diagram", "Node")
+
+
+def __getattr__(name: str):
+    """Imports the optional ``diagrams`` classes on first access."""
+    if name not in _DIAGRAMS_API:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    try:
+        import diagrams
+    except ImportError as e:
+        raise ImportError(
+            "The 'diagrams' backend needs the diagrams package and Graphviz; "
+            "use output_format='svg' for the builtin backend"
+        ) from e
+    value = getattr(diagrams, name)
+    globals()[name] = value
+    return value
+
+
+def _diagrams_api() -> Tuple:
+    # Module attributes (possibly patched in tests) win over a fresh import
+    namespace = globals()
+    return tuple(
+        namespace[name] if name in namespace else __getattr__(name) for name in _DIAGRAMS_API
+    )
+
 # Define custom node attributes for better visual distinction if needed
 # Example:
 # graph_attr = {
@@ -44,35 +84,180 @@ logger = structlog.get_logger()
 #     "bgcolor": "lightgrey"
 # }
 
+def resolve_backend(output_format: str, backend: Optional[str] = None) -> str:
+    """
+    Returns the backend drawing ``output_format``: ``backend`` if given, else
+    'builtin' for the formats it supports and 'diagrams' otherwise.
+
+    Raises:
+        ValueError: If the backend is unknown or cannot write ``output_format``.
+    """
+    if backend is None:
+        backend = "builtin" if output_format in BUILTIN_FORMATS else "diagrams"
+    if backend not in DIAGRAM_BACKENDS:
+        raise ValueError(f"Unknown diagram backend {backend!r}; expected one of {DIAGRAM_BACKENDS}")
+    if backend == "builtin" and output_format not in BUILTIN_FORMATS:
+        raise ValueError(f"The builtin backend writes {BUILTIN_FORMATS}, not {output_format!r}")
+    return backend
+
+
+def chapter_labels(chapter: Chapter) -> List[str]:
+    """Returns the node labels of a chapter's chain, in flow order."""
+    return [
+        f"Introduction\n({len(chapter.introduction.split())} words)",
+        *(
+            f"Section: {sec.heading}\n({len(sec.content.split())} words)"
+            for sec in chapter.sections
+        ),
+        f"Summary\n({len(chapter.summary.split())} words)",
+        f"Quiz ({len(chapter.quiz)} Qs)",
+    ]
+
+
+def _rows(chapters: List[Chapter]) -> List[Tuple[str, List[str]]]:
+    if not chapters:
+        return [("", ["Empty Guide"])]
+    return [(f"Chapter: {chapter.title}", chapter_labels(chapter)) for chapter in chapters]
+
+
+def _dot_string(text: str) -> str:
+    escaped = text.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return f'"{escaped}"'
+
+
+def render_dot(chapters: List[Chapter], title: str = "Study Guide Structure") -> str:
+    """Returns the diagram as Graphviz DOT source."""
+    lines = [
+        f"digraph {_dot_string(title)} {{",
+        f"  graph [label={_dot_string(title)}, labelloc=t, rankdir=LR, "
+        'fontname="sans-serif", fontsize=15];',
+        '  node [shape=box, style=rounded, fontname="sans-serif", fontsize=11];',
+    ]
+    for c, (label, nodes) in enumerate(_rows(chapters)):
+        ids = [f"c{c}n{i}" for i in range(len(nodes))]
+        indent = "    " if label else "  "
+        if label:
+            lines.append(f"  subgraph cluster_{c} {{")
+            lines.append(f"    label={_dot_string(label)};")
+        lines.extend(f"{indent}{id_} [label={_dot_string(node)}];" for id_, node in zip(ids, nodes))
+        if len(ids) > 1:
+            lines.append(f"{indent}{' -> '.join(ids)};")
+        if label:
+            lines.append("  }")
+    lines.append("}")
+    return "\n".join(lines) + "\n"
+
+
+# Geometry of the builtin SVG layout, in px
+_NODE_WIDTH, _NODE_HEIGHT, _NODE_GAP = 170, 44, 28
+_CLUSTER_PAD, _CLUSTER_LABEL, _ROW_GAP = 12, 22, 16
+_MARGIN, _TITLE_HEIGHT = 16, 32
+_CHAR_WIDTH = 6.5  # average glyph width at font-size 11
+
+
+def _fit(text: str, width: int) -> str:
+    limit = int((width - 12) / _CHAR_WIDTH)
+    return text if len(text) <= limit else text[: limit - 1] + "\u2026"
+
+
+def render_svg(chapters: List[Chapter], title: str = "Study Guide Structure") -> str:
+    """
+    Returns the diagram as a standalone SVG document.
+
+    One row per chapter: a labelled cluster holding the chapter's nodes left
+    to right, joined by arrows. Labels too wide for a node are truncated
+    (the full text is kept as a tooltip).
+    """
+    row_height = _CLUSTER_LABEL + 2 * _CLUSTER_PAD + _NODE_HEIGHT
+    body: List[str] = []
+    # The title is set at font-size 15
+    widest = int(len(title) * _CHAR_WIDTH * 15 / 11)
+    y = _MARGIN + _TITLE_HEIGHT
+    for label, nodes in _rows(chapters):
+        width = 2 * _CLUSTER_PAD + len(nodes) * _NODE_WIDTH + (len(nodes) - 1) * _NODE_GAP
+        widest = max(widest, width)
+        if label:
+            body.append(
+                f'<g class="cluster"><rect x="{_MARGIN}" y="{y}" width="{width}" '
+                f'height="{row_height}" rx="8" fill="#f3f4f6" stroke="#d1d5db"/>'
+                f'<text x="{_MARGIN + _CLUSTER_PAD}" y="{y + 16}" font-size="12" '
+                f'font-weight="bold">{escape(_fit(label, width))}</text></g>'
+            )
+        node_y = y + _CLUSTER_LABEL + _CLUSTER_PAD
+        for i, node in enumerate(nodes):
+            x = _MARGIN + _CLUSTER_PAD + i * (_NODE_WIDTH + _NODE_GAP)
+            if i:
+                mid = node_y + _NODE_HEIGHT // 2
+                body.append(
+                    f'<path d="M{x - _NODE_GAP},{mid} H{x - 2}" stroke="#6b7280" '
+                    'marker-end="url(#arrow)"/>'
+                )
+            lines = node.split("\n")
+            first = node_y + _NODE_HEIGHT // 2 + 4 - 7 * (len(lines) - 1)
+            text = "".join(
+                f'<tspan x="{x + _NODE_WIDTH // 2}" y="{first + 14 * j}">'
+                f"{escape(_fit(line, _NODE_WIDTH))}</tspan>"
+                for j, line in enumerate(lines)
+            )
+            body.append(
+                f'<g class="node"><title>{escape(node)}</title>'
+                f'<rect x="{x}" y="{node_y}" width="{_NODE_WIDTH}" height="{_NODE_HEIGHT}" '
+                f'rx="6" fill="#ffffff" stroke="#6b7280"/>'
+                f'<text text-anchor="middle" font-size="11">{text}</text></g>'
+            )
+        y += row_height + _ROW_GAP
+    width = widest + 2 * _MARGIN
+    height = y - _ROW_GAP + _MARGIN
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+        f'viewBox="0 0 {width} {height}" font-family="sans-serif" fill="#1f2937">'
+        f"<title>{escape(title)}</title>"
+        '<defs><marker id="arrow" viewBox="0 0 10 10" refX="10" refY="5" '
+        'markerWidth="7" markerHeight="7" orient="auto">'
+        '<path d="M0,0 L10,5 L0,10 z" fill="#6b7280"/></marker></defs>'
+        f'<text x="{width // 2}" y="{_MARGIN + 18}" text-anchor="middle" '
+        f'font-size="15" font-weight="bold">{escape(title)}</text>'
+        + "".join(body)
+        + "</svg>\n"
+    )
+
+
 def create_study_guide_diagram(
     chapters: List[Chapter],
     output_filename: str,
     title: str = "Study Guide Structure",
     output_format: str = "png", # Default format
+    backend: Optional[str] = None,
 ) -> None:
     """
-    Generates a diagram of the study guide structure using the diagrams library.
+    Generates a diagram of the study guide structure.
 
     Args:
         chapters: A list of Chapter objects.
         output_filename: The base path and name for the output file (e.g., 'output/study_guide').
                          The format extension will be added automatically.
         title: The title of the diagram.
-        output_format: The output format for the diagram (e.g., 'png', 'svg', 'jpg').
+        output_format: The output format for the diagram (e.g., 'png', 'svg', 'jpg', 'dot').
+        backend: 'builtin' or 'diagrams'; defaults to 'builtin' for the formats
+                 it supports ('svg', 'dot') and to 'diagrams' otherwise.
 
     Raises:
+        ValueError: If the backend is unknown or cannot write ``output_format``.
+        ImportError: If the 'diagrams' backend is used without the package installed.
         FileNotFoundError: If Graphviz executable is not found.
         PermissionError: If there's an issue writing the file or creating directories.
         Exception: For other errors during diagram generation.
     """
     output_dir = os.path.dirname(output_filename)
     base_name = os.path.basename(output_filename)
+    backend = resolve_backend(output_format, backend)
 
     logger.info(
         "Starting diagram generation",
         output_file=f"{output_filename}.{output_format}",
         title=title,
         chapter_count=len(chapters),
+        backend=backend,
     )
 
     if not chapters:
@@ -86,55 +271,43 @@ def create_study_guide_diagram(
             os.makedirs(output_dir, exist_ok=True)
             logger.debug("Ensured output directory exists", path=output_dir)
 
-        # Use diagrams context manager
-        # Note: filename in Diagram is the base name without extension or path
-        with Diagram(
-            title,
-            show=False,
-            filename=base_name,
-            outformat=output_format,
-            # graph_attr=graph_attr, # Optional styling
-            # node_attr=node_attr,   # Optional styling
-            # cluster_attr=cluster_attr # Optional styling
-            # The actual file will be saved in the CWD relative to 'filename',
-            # so we might need to move it or handle paths carefully if CWD isn't output_dir.
-            # Let's assume diagrams saves relative to CWD for now.
-            # We will move the file later if needed, or adjust path handling.
-            # For simplicity, let's assume output_filename includes the desired path.
-            # Correction: `filename` is just the base, `directory` attr can specify path.
-            directory=output_dir if output_dir else ".", # Specify output directory
-        ) as diag:
-            # Create a top-level node for the overall guide (optional)
-            # guide_node = Node("Study Guide Topic") # Example
-
-            if not chapters:
-                 Node("Empty Guide") # Add a node for empty diagrams
-
-            for chapter in chapters:
-                chapter_label = f"Chapter: {chapter.title}"
-                with Cluster(chapter_label):
-                    # Create nodes within the chapter cluster
-                    intro_node = Node(f"Introduction\n({len(chapter.introduction.split())} words)")
-                    section_nodes = [
-                        Node(f"Section: {sec.heading}\n({len(sec.content.split())} words)")
-                        for sec in chapter.sections
-                    ]
-                    summary_node = Node(f"Summary\n({len(chapter.summary.split())} words)")
-                    quiz_node = Node(f"Quiz ({len(chapter.quiz)} Qs)")
-
-                    # Define edges for flow within the chapter
-                    current_node = intro_node
-                    if section_nodes:
-                        current_node >> section_nodes[0] # Intro -> First Section
-                        for i in range(len(section_nodes) - 1):
-                            section_nodes[i] >> section_nodes[i+1] # Section -> Next Section
-                        current_node = section_nodes[-1] # Last section becomes current
-
-                    current_node >> summary_node # Last Section (or Intro) -> Summary
-                    summary_node >> quiz_node    # Summary -> Quiz
-
-                    # Connect top-level guide node to this chapter cluster (optional)
-                    # guide_node >> intro_node # Or connect to the cluster itself if preferred
+        if backend == "builtin":
+            render = render_svg if output_format == "svg" else render_dot
+            with open(f"{output_filename}.{output_format}", "w", encoding="utf-8") as f:
+                f.write(render(chapters, title))
+        else:
+            Cluster, Diagram, Node = _diagrams_api()
+            # Use diagrams context manager
+            # Note: filename in Diagram is the base name without extension or path
+            with Diagram(
+                title,
+                show=False,
+                filename=base_name,
+                outformat=output_format,
+                # graph_attr=graph_attr, # Optional styling
+                # node_attr=node_attr,   # Optional styling
+                # cluster_attr=cluster_attr # Optional styling
+                # The actual file will be saved in the CWD relative to 'filename',
+                # so we might need to move it or handle paths carefully if CWD isn't output_dir.
+                # Let's assume diagrams saves relative to CWD for now.
+                # We will move the file later if needed, or adjust path handling.
+                # For simplicity, let's assume output_filename includes the desired path.
+                # Correction: `filename` is just the base, `directory` attr can specify path.
+                directory=output_dir if output_dir else ".", # Specify output directory
+            ) as diag:
+                # Create a top-level node for the overall guide (optional)
+                # guide_node = Node("Study Guide Topic") # Example
+
+                # Same rows and labels as the builtin renderers
+                for label, labels in _rows(chapters):
+                    if not label:
+                        Node(labels[0])  # Empty guide: a lone node, no cluster
+                        continue
+                    with Cluster(label):
+                        nodes = [Node(text) for text in labels]
+                        # Intro -> sections -> summary -> quiz
+                        for upstream, downstream in zip(nodes, nodes[1:]):
+                            upstream >> downstream
 
         logger.info(
             "Diagram generated successfully",
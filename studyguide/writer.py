@@ -0,0 +1,228 @@
+"""
+Crash-safe output stage of the site build.
+
+A guide's pages are never written in place. ``commit_guide`` builds the new
+version of a guide directory under ``<site>/.staging/`` (hard-linking the
+pages that did not change from the live directory), then swaps it in with
+two renames. A build killed at any point leaves either the old or the new
+version of each guide, never a half-written page; ``recover_staging`` undoes
+a swap interrupted between its two renames and clears leftovers.
+
+``fsync`` controls durability against power loss (renames alone already
+protect against the process being killed):
+
+* ``none``: no syncing (the default). Pages are build output and can be
+  regenerated; a power loss may lose the latest commits but the renames
+  never expose a half-written guide.
+* ``guide``: once a guide's pages are staged, fsync the pages written and
+  the staged directory, then the site directory after the swap. Writeback
+  of the earlier pages overlaps writing the later ones.
+* ``file``: fsync every page as it is written, then the directories as in
+  ``guide``.
+
+Only the files and directories of the commit are synced, never the whole
+machine (``os.sync()`` would also flush every other filesystem, including
+slow network mounts).
+
+``GuideWriter`` runs the commits on a dedicated thread, so rendering and
+minifying never wait on file I/O.
+"""
+
+import os
+import queue
+import shutil
+import tempfile
+import threading
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import structlog
+
+logger = structlog.get_logger()
+
+FSYNC_MODES = ("none", "guide", "file")
+STAGING_DIR = ".staging"
+_NEW_PREFIX = "new-"
+_OLD_PREFIX = "old-"
+
+
+def _check_fsync(fsync: str) -> str:
+    if fsync not in FSYNC_MODES:
+        raise ValueError(f"Unknown fsync mode {fsync!r}; expected one of {FSYNC_MODES}")
+    return fsync
+
+
+def _fsync_path(path: Path) -> None:
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _write_file(path: Path, data: bytes, sync: bool) -> None:
+    with open(path, "wb") as f:
+        f.write(data)
+        if sync:
+            f.flush()
+            os.fsync(f.fileno())
+
+
+def _remove_if_empty(directory: Path) -> None:
+    try:
+        directory.rmdir()
+    except OSError:
+        pass
+
+
+def recover_staging(site_dir: Path) -> None:
+    """
+    Cleans up after a build killed mid-commit.
+
+    A guide directory moved aside but not yet replaced is moved back; staged
+    directories that were never swapped in are deleted.
+    """
+    staging_root = Path(site_dir) / STAGING_DIR
+    if not staging_root.is_dir():
+        return
+    for entry in staging_root.iterdir():
+        if entry.name.startswith(_OLD_PREFIX):
+            for moved in entry.iterdir():
+                live = Path(site_dir) / moved.name
+                if not live.exists():
+                    logger.warning("Restoring guide from an interrupted commit", path=str(live))
+                    os.rename(moved, live)
+        shutil.rmtree(entry, ignore_errors=True)
+    _remove_if_empty(staging_root)
+
+
+def commit_guide(
+    target: Path,
+    pages: Dict[str, bytes],
+    keep: Iterable[str] = (),
+    fsync: str = "none",
+) -> List[str]:
+    """
+    Atomically replaces the guide directory ``target``.
+
+    Args:
+        target: The guide directory, e.g. ``<site>/<slug>``.
+        pages: New page contents, keyed by file name.
+        keep: File names carried over unchanged from the current ``target``.
+        fsync: ``none``, ``guide`` or ``file`` (see the module docstring).
+
+    Returns:
+        The names of files in the previous ``target`` that the new version
+        no longer has.
+
+    Raises:
+        OSError: If staging or swapping fails; ``target`` is then unchanged.
+        ValueError: If ``fsync`` is not a known mode.
+    """
+    _check_fsync(fsync)
+    target = Path(target)
+    staging_root = target.parent / STAGING_DIR
+    staging_root.mkdir(parents=True, exist_ok=True)
+    staged = Path(tempfile.mkdtemp(prefix=_NEW_PREFIX, dir=staging_root))
+    per_file = fsync == "file"
+    unsynced: List[Path] = []
+    try:
+        for name in keep:
+            try:
+                # Live pages are never modified in place, so linking is safe
+                os.link(target / name, staged / name)
+            except OSError:
+                shutil.copy2(target / name, staged / name)
+                unsynced.append(staged / name)
+        for name, data in pages.items():
+            _write_file(staged / name, data, per_file)
+            if not per_file:
+                unsynced.append(staged / name)
+        if fsync != "none":
+            for path in unsynced:
+                _fsync_path(path)
+            _fsync_path(staged)
+        previous = set(os.listdir(target)) if target.is_dir() else set()
+        _swap(staged, target, staging_root)
+    except BaseException:
+        shutil.rmtree(staged, ignore_errors=True)
+        raise
+    finally:
+        _remove_if_empty(staging_root)
+    if fsync != "none":
+        # Makes the rename itself durable
+        _fsync_path(target.parent)
+    return sorted(previous - set(pages) - set(keep))
+
+
+def _swap(staged: Path, target: Path, staging_root: Path) -> None:
+    if not target.exists():
+        os.rename(staged, target)
+        return
+    # Move the live directory aside (recover_staging moves it back if we die
+    # before the second rename), then put the staged one in its place
+    aside = Path(tempfile.mkdtemp(prefix=_OLD_PREFIX, dir=staging_root))
+    os.rename(target, aside / target.name)
+    try:
+        os.rename(staged, target)
+    except BaseException:
+        os.rename(aside / target.name, target)
+        raise
+    finally:
+        shutil.rmtree(aside, ignore_errors=True)
+
+
+class GuideWriter:
+    """
+    Dedicated thread committing guides with ``commit_guide``, in submission
+    order.
+
+    Args:
+        site_dir: Root directory of the site.
+        fsync: ``none``, ``guide`` or ``file``.
+        max_pending: Guides queued before ``submit`` blocks.
+
+    Raises:
+        ValueError: If ``fsync`` is not a known mode.
+    """
+
+    def __init__(self, site_dir: Path, fsync: str = "none", max_pending: int = 16):
+        self.site_dir = Path(site_dir)
+        self.fsync = _check_fsync(fsync)
+        self._queue: "queue.Queue[Optional[Tuple[str, Dict[str, bytes], List[str], Future]]]" = (
+            queue.Queue(maxsize=max_pending)
+        )
+        self._thread = threading.Thread(target=self._run, name="guide-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, slug: str, pages: Dict[str, bytes], keep: Iterable[str] = ()) -> Future:
+        """
+        Queues a guide to be committed to ``<site_dir>/<slug>``.
+
+        Returns:
+            A future resolving to ``commit_guide``'s result.
+        """
+        future: Future = Future()
+        self._queue.put((slug, pages, list(keep), future))
+        return future
+
+    def close(self) -> None:
+        """Commits every queued guide, then stops the thread."""
+        self._queue.put(None)
+        self._thread.join()
+
+    def _run(self) -> None:
+        while True:
+            job = self._queue.get()
+            if job is None:
+                return
+            slug, pages, keep, future = job
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(commit_guide(self.site_dir / slug, pages, keep, self.fsync))
+            except BaseException as e:
+                # Even SystemExit goes to the caller through the future: letting
+                # it end this thread would leave later guides waiting forever
+                future.set_exception(e)
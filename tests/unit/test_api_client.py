@@ -1,18 +1,18 @@
 """Unit tests for the Perplexity API client."""
 
 import asyncio
-from unittest.mock import AsyncMock, patch
+import json
+from unittest.mock import AsyncMock, MagicMock, patch
 
 import httpx
 import pytest
 import structlog
-from aiocache import Cache
-from aiocache.serializers import JsonSerializer
 from pytest_httpx import HTTPXMock
 
 # Import the module to test
 from studyguide import api_client
-from studyguide.config import settings
+from studyguide.budget import BudgetExceededError
+from studyguide.config import get_settings
 
 # Configure logger for tests
 structlog.configure(processors=[structlog.processors.JSONRenderer()])
@@ -24,15 +24,15 @@ log = structlog.get_logger()
 @pytest.fixture(autouse=True)
 async def clear_cache_and_client():
     """Fixture to ensure a clean cache and client state for each test."""
-    # Clear aiocache (assuming memory backend for tests)
-    cache = Cache(
-        Cache.MEMORY,
-        serializer=JsonSerializer(),
-        namespace="perplexity_api",
-    )
-    await cache.clear()
+    # Clear the response cache (built on the first call)
+    cache = getattr(api_client.ask_perplexity, "cache", None)
+    if cache is not None:
+        await cache.clear()
     log.debug("Cleared aiocache")
 
+    # Start every test with a full rate limiter bucket
+    api_client.get_rate_limiter.cache_clear()
+
     # Reset tenacity retry stats if needed (usually not necessary per test)
     api_client.ask_perplexity.retry.statistics.clear()
 
@@ -94,7 +94,7 @@ async def test_ask_perplexity_success(
     assert request is not None
     assert request.method == "POST"
     assert str(request.url) == "https://api.perplexity.ai/chat/completions"
-    assert f"Bearer {settings.api.api_key.get_secret_value()}" in request.headers.get("Authorization", "")
+    assert f"Bearer {get_settings().api.api_key.get_secret_value()}" in request.headers.get("Authorization", "")
     request_data = json.loads(request.content)
     assert request_data["model"] == model
     assert request_data["messages"][0]["role"] == "system"
@@ -228,9 +228,9 @@ async def test_ask_perplexity_caching(
     response1 = await api_client.ask_perplexity(model, prompt, system_prompt)
     assert httpx_mock.get_request() is not None # Check API was called
 
-    # Clear mock requests before second call
-    httpx_mock.reset(True)
-    httpx_mock.add_response(url=url, method="POST", json=mock_perplexity_response, status_code=200) # Re-add mock
+    # Clear mock requests before second call; with no response registered,
+    # a request reaching the API would fail the call
+    httpx_mock.reset()
 
     # Second call with same arguments - should hit cache
     response2 = await api_client.ask_perplexity(model, prompt, system_prompt)
@@ -243,12 +243,292 @@ async def test_ask_perplexity_caching(
 @pytest.mark.asyncio
 async def test_close_client():
     """Test the close_client function."""
-    # Ensure client is open first (it's created at module level)
-    assert not api_client.async_client.is_closed
+    client = api_client.get_async_client()
+    assert not client.is_closed
+    assert api_client.get_async_client() is client
 
     await api_client.close_client()
-    assert api_client.async_client.is_closed
+    assert client.is_closed
 
     # Calling close again should be safe
     await api_client.close_client()
-    assert api_client.async_client.is_closed
+    assert client.is_closed
+
+    # The next caller gets a fresh client
+    reopened = api_client.get_async_client()
+    assert reopened is not client and not reopened.is_closed
+
+
+def test_client_per_event_loop():
+    """Each event loop gets its own client."""
+
+    async def open_client():
+        client = api_client.get_async_client()
+        await api_client.close_client()
+        return client
+
+    assert asyncio.run(open_client()) is not asyncio.run(open_client())
+
+
+@pytest.mark.asyncio
+async def test_concurrent_identical_calls_are_coalesced(
+    httpx_mock: HTTPXMock, mock_perplexity_response: dict, monkeypatch
+):
+    """Identical calls in flight at the same time share a single request."""
+    httpx_mock.add_response(
+        url="https://api.perplexity.ai/chat/completions",
+        method="POST",
+        json=mock_perplexity_response,
+        status_code=200,
+    )
+
+    results = await asyncio.gather(
+        api_client.ask_perplexity("sonar-medium-chat", "What is single-flight?"),
+        api_client.ask_perplexity(
+            model="sonar-medium-chat", prompt="What is single-flight?"
+        ),
+        api_client.ask_perplexity("sonar-medium-chat", "What is single-flight?", None),
+    )
+
+    assert all(result == mock_perplexity_response for result in results)
+    assert len(httpx_mock.get_requests()) == 1
+    assert not api_client._in_flight
+
+
+@pytest.mark.asyncio
+async def test_different_calls_are_not_coalesced(
+    httpx_mock: HTTPXMock, mock_perplexity_response: dict, monkeypatch
+):
+    """Calls with different arguments are sent separately."""
+    httpx_mock.add_response(
+        url="https://api.perplexity.ai/chat/completions",
+        method="POST",
+        json=mock_perplexity_response,
+        status_code=200,
+        is_reusable=True,
+    )
+
+    await asyncio.gather(
+        api_client.ask_perplexity("sonar-medium-chat", "Coalesce me?"),
+        api_client.ask_perplexity("sonar-medium-chat", "Coalesce me?", "Be brief."),
+    )
+
+    assert len(httpx_mock.get_requests()) == 2
+
+
+def test_build_cache_key_normalizes_arguments():
+    """Positional, keyword and defaulted spellings of a call share one key."""
+    func = api_client.ask_perplexity
+    key = api_client.build_cache_key(func, "m", "p")
+    assert key == api_client.build_cache_key(func, model="m", prompt="p")
+    assert key == api_client.build_cache_key(func, "m", "p", None)
+    assert key != api_client.build_cache_key(func, "m", "p", "system")
+
+
+def _retry_state_for(response: httpx.Response):
+    """Builds a minimal tenacity retry state failing with the given response."""
+    error = httpx.HTTPStatusError("error", request=response.request, response=response)
+    state = MagicMock()
+    state.outcome.exception.return_value = error
+    state.attempt_number = 1
+    return state
+
+
+def test_retry_waits_for_retry_after_on_429():
+    """A 429 with Retry-After waits exactly as long as the server asks."""
+    request = httpx.Request("POST", "https://api.perplexity.ai/chat/completions")
+    response = httpx.Response(429, headers={"Retry-After": "7"}, request=request)
+
+    assert api_client._wait_for_retry(_retry_state_for(response)) == 7.0
+
+
+def test_retry_falls_back_to_exponential_backoff():
+    """Errors without Retry-After use the exponential back-off."""
+    request = httpx.Request("POST", "https://api.perplexity.ai/chat/completions")
+    response = httpx.Response(503, request=request)
+
+    assert api_client._wait_for_retry(_retry_state_for(response)) == 2
+
+
+@pytest.mark.asyncio
+async def test_stream_perplexity_yields_deltas(httpx_mock: HTTPXMock, monkeypatch):
+    """Server-sent event deltas are yielded in order until [DONE]."""
+    events = [
+        {"choices": [{"delta": {"role": "assistant", "content": "Hello"}}]},
+        {"choices": [{"delta": {"content": ", world"}}]},
+        {"choices": [{"delta": {}}], "usage": {"total_tokens": 12}},
+    ]
+    body = "".join(f"data: {json.dumps(event)}\n\n" for event in events)
+    body += "data: [DONE]\n\n"
+    httpx_mock.add_response(
+        url="https://api.perplexity.ai/chat/completions",
+        method="POST",
+        content=body.encode(),
+        headers={"Content-Type": "text/event-stream"},
+    )
+
+    deltas = [d async for d in api_client.stream_perplexity("sonar-medium-chat", "Hi")]
+
+    assert deltas == ["Hello", ", world"]
+    request_data = json.loads(httpx_mock.get_request().content)
+    assert request_data["stream"] is True
+
+
+@pytest.mark.asyncio
+async def test_slow_stream_consumer_holds_no_rate_limiter_slot(httpx_mock: HTTPXMock):
+    """The permit ends with the response, not when the consumer catches up."""
+    events = [{"choices": [{"delta": {"content": word}}]} for word in ("a", "b", "c")]
+    body = "".join(f"data: {json.dumps(event)}\n\n" for event in events) + "data: [DONE]\n\n"
+    httpx_mock.add_response(
+        url="https://api.perplexity.ai/chat/completions", method="POST", content=body.encode()
+    )
+    limiter = api_client.get_rate_limiter()
+    stream = api_client.stream_perplexity("sonar-medium-chat", "Hi")
+
+    assert await stream.__anext__() == "a"
+    async with asyncio.timeout(1):
+        while limiter.in_flight:  # The rest of the response is read meanwhile
+            await asyncio.sleep(0.001)
+
+    assert [d async for d in stream] == ["b", "c"]
+
+
+@pytest.mark.asyncio
+async def test_stopping_a_stream_early_cancels_its_reader():
+    """Closing a read-ahead iterator cancels the stream it drains."""
+    finished = asyncio.Event()
+
+    async def endless():
+        try:
+            while True:
+                yield "delta"
+                await asyncio.sleep(0)
+        finally:
+            finished.set()
+
+    stream = api_client.read_ahead(endless())
+    assert await stream.__anext__() == "delta"
+    await stream.aclose()
+
+    assert finished.is_set()
+
+
+@pytest.mark.asyncio
+async def test_stream_perplexity_raises_on_error_status(
+    httpx_mock: HTTPXMock, monkeypatch
+):
+    """Error statuses are raised before any delta is yielded."""
+    httpx_mock.add_response(
+        url="https://api.perplexity.ai/chat/completions",
+        method="POST",
+        status_code=401,
+        json={"error": "unauthorized"},
+    )
+
+    with pytest.raises(httpx.HTTPStatusError):
+        async for _ in api_client.stream_perplexity("sonar-medium-chat", "Hi"):
+            pass
+
+
+@pytest.mark.asyncio
+async def test_ask_perplexity_records_cost(
+    httpx_mock: HTTPXMock, mock_perplexity_response: dict, monkeypatch
+):
+    """Successful calls are charged to the ledger from their reported usage."""
+    ledger = api_client.CostLedger(budget_usd=1.0)
+    monkeypatch.setattr(api_client, "get_ledger", lambda: ledger)
+    httpx_mock.add_response(
+        url="https://api.perplexity.ai/chat/completions",
+        method="POST",
+        json=mock_perplexity_response,
+    )
+
+    await api_client.ask_perplexity("sonar-medium-chat", "What does this cost?")
+
+    request_data = json.loads(httpx_mock.get_requests()[0].content)
+    assert request_data["max_tokens"] == get_settings().app.max_completion_tokens
+    assert ledger.spent_usd == pytest.approx(70 * 0.6 / 1_000_000)
+    assert ledger.reserved_usd == 0
+
+
+@pytest.mark.asyncio
+async def test_ask_perplexity_refuses_over_budget(httpx_mock: HTTPXMock, monkeypatch):
+    """An exhausted budget refuses the call before anything is sent."""
+    ledger = api_client.CostLedger(budget_usd=0.0001)
+    ledger.spent_usd = 0.0001
+    monkeypatch.setattr(api_client, "get_ledger", lambda: ledger)
+
+    with pytest.raises(BudgetExceededError):
+        await api_client.ask_perplexity("sonar-medium-chat", "Can I afford this?")
+
+    assert not httpx_mock.get_requests()
+
+
+@pytest.mark.asyncio
+async def test_cancelled_call_releases_its_reservation(httpx_mock: HTTPXMock, monkeypatch):
+    """A call cancelled mid-request returns its budget hold and is not charged."""
+    ledger = api_client.CostLedger(budget_usd=1.0)
+    monkeypatch.setattr(api_client, "get_ledger", lambda: ledger)
+    sent = asyncio.Event()
+
+    async def hang(request):
+        sent.set()
+        await asyncio.Event().wait()
+
+    httpx_mock.add_callback(hang, url="https://api.perplexity.ai/chat/completions")
+
+    task = asyncio.create_task(api_client.ask_perplexity("sonar-medium-chat", "Cancel me"))
+    await sent.wait()
+    assert ledger.reserved_usd > 0
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+    assert ledger.reserved_usd == 0
+    assert ledger.spent_usd == 0
+
+
+@pytest.mark.asyncio
+async def test_error_after_commit_keeps_other_holds(
+    httpx_mock: HTTPXMock, mock_perplexity_response: dict, monkeypatch
+):
+    """A failure after the call was charged does not return its hold a second time."""
+    ledger = api_client.CostLedger(budget_usd=1.0)
+    monkeypatch.setattr(api_client, "get_ledger", lambda: ledger)
+    other = ledger.reserve("sonar-medium-chat", 1000, 1500)  # A concurrent call
+    httpx_mock.add_response(
+        url="https://api.perplexity.ai/chat/completions", method="POST", json=mock_perplexity_response
+    )
+
+    def failing_record_usage(*args):
+        raise RuntimeError("exporter down")
+
+    monkeypatch.setattr(api_client.metrics, "record_usage", failing_record_usage)
+    with pytest.raises(RuntimeError, match="exporter down"):
+        await api_client.ask_perplexity("sonar-medium-chat", "Charge me once")
+
+    assert ledger.spent_usd > 0
+    assert ledger.reserved_usd == pytest.approx(other.estimated_usd)
+
+
+@pytest.mark.asyncio
+async def test_ask_perplexity_degraded_response_is_not_cached(
+    httpx_mock: HTTPXMock, mock_perplexity_response: dict, monkeypatch
+):
+    """Calls degraded to a cheaper model are marked and not cached."""
+    ledger = api_client.CostLedger(budget_usd=0.0008)
+    monkeypatch.setattr(api_client, "get_ledger", lambda: ledger)
+    httpx_mock.add_response(
+        url="https://api.perplexity.ai/chat/completions",
+        method="POST",
+        json=mock_perplexity_response,
+        is_reusable=True,
+    )
+
+    for _ in range(2):
+        result = await api_client.ask_perplexity("sonar-medium-chat", "Degrade me")
+        assert result["degraded_from"] == "sonar-medium-chat"
+
+    requests = httpx_mock.get_requests()
+    assert len(requests) == 2
+    assert json.loads(requests[0].content)["model"] == "sonar-small-chat"
@@ -0,0 +1,88 @@
+"""
+Unit tests for the studyguide.assets module.
+"""
+
+import os
+
+import pytest
+
+from studyguide.assets import Asset, fingerprint_assets, publish_assets
+
+
+@pytest.fixture
+def asset_dir(tmp_path):
+    root = tmp_path / "assets"
+    (root / "fonts").mkdir(parents=True)
+    (root / "tailwind.css").write_text("body{margin:0}")
+    (root / "input.css").write_text("@tailwind base;")
+    (root / "fonts" / "inter.woff2").write_bytes(b"\x00font")
+    (root / ".DS_Store").write_bytes(b"junk")
+    return root
+
+
+def test_fingerprint_assets_names_files_by_content(asset_dir):
+    """Publishable files get a content hash in their name; inputs are skipped."""
+    assets = fingerprint_assets(asset_dir)
+
+    assert sorted(assets) == ["fonts/inter.woff2", "tailwind.css"]
+    css = assets["tailwind.css"]
+    assert css.filename == f"tailwind.{css.digest[:10]}.css"
+    assert assets["fonts/inter.woff2"].filename.startswith("fonts/inter.")
+
+    (asset_dir / "tailwind.css").write_text("body{margin:1px}")
+    assert fingerprint_assets(asset_dir)["tailwind.css"].filename != css.filename
+
+
+def test_fingerprint_assets_missing_directory(tmp_path):
+    """A missing asset directory simply has no assets."""
+    assert fingerprint_assets(tmp_path / "missing") == {}
+
+
+def test_publish_hard_links_from_store(asset_dir, tmp_path):
+    """Every site links the same stored copy; republishing writes nothing."""
+    assets = fingerprint_assets(asset_dir).values()
+    store = tmp_path / "store"
+    first = publish_assets(assets, tmp_path / "a" / "static", store)
+    second = publish_assets(assets, tmp_path / "b" / "static", store)
+
+    assert len(first) == len(second) == 2
+    for a, b in zip(first, second):
+        assert os.path.samefile(a, b)
+    assert publish_assets(assets, tmp_path / "a" / "static", store) == []
+
+
+def test_published_files_survive_in_place_source_edits(asset_dir, tmp_path):
+    """Links come from the store, so rewriting a source never alters output."""
+    asset = fingerprint_assets(asset_dir)["tailwind.css"]
+    [published] = publish_assets([asset], tmp_path / "static", tmp_path / "store")
+
+    with open(asset_dir / "tailwind.css", "w") as f:
+        f.write("rebuilt")
+
+    assert published.read_text() == "body{margin:0}"
+
+
+def test_publish_falls_back_to_copy(asset_dir, tmp_path, monkeypatch):
+    """Where hard links fail (e.g. across filesystems) the asset is copied."""
+
+    def no_link(src, dst):
+        raise OSError("Invalid cross-device link")
+
+    monkeypatch.setattr(os, "link", no_link)
+    asset = fingerprint_assets(asset_dir)["tailwind.css"]
+    [published] = publish_assets([asset], tmp_path / "static", tmp_path / "store")
+
+    assert published.read_text() == "body{margin:0}"
+    assert published.stat().st_nlink == 1
+
+
+def test_publish_without_store_copies_source(tmp_path):
+    """Without a store, assets are copied straight from their source."""
+    source = tmp_path / "app.js"
+    source.write_text("run()")
+    asset = Asset(name="app.js", source=source, digest="0123456789abcdef")
+
+    [published] = publish_assets([asset], tmp_path / "static")
+
+    assert published == tmp_path / "static" / "app.0123456789.js"
+    assert published.read_text() == "run()"
@@ -0,0 +1,230 @@
+"""
+Unit tests for the studyguide.batch module.
+"""
+
+import asyncio
+import json
+from pathlib import Path
+
+import pytest
+
+from studyguide import chapter_cache, diagram_pool
+from studyguide.assets import STATIC_DIR
+from studyguide.batch import assign_slugs, iter_batch, load_topics, run_batch
+from studyguide.config import get_settings
+from studyguide.diagram_pool import DiagramPool
+from studyguide.engine import Engine
+from studyguide.renderer import Renderer
+from tests.unit.test_engine import chapter_index, chapter_markdown, make_response
+
+
+@pytest.fixture(autouse=True)
+def chapter_cache_dir(tmp_path_factory, monkeypatch):
+    """Keeps the default chapter cache's disk tier out of the working directory."""
+    directory = tmp_path_factory.mktemp("chapters")
+    monkeypatch.setattr(get_settings().app, "chapter_cache_dir", directory)
+    chapter_cache.get_default_cache.cache_clear()
+    yield directory
+    chapter_cache.get_default_cache.cache_clear()
+
+
+def test_load_topics_skips_blanks_comments_and_duplicates(tmp_path):
+    """Topic files may contain comments, blank lines and repeated topics."""
+    path = tmp_path / "topics.txt"
+    path.write_text("# nightly run\nAsyncio\n\n  Rust ownership  \nAsyncio\n")
+
+    assert load_topics(path) == ["Asyncio", "Rust ownership"]
+
+
+@pytest.mark.asyncio
+async def test_iter_batch_respects_global_and_per_guide_caps():
+    """The engine-wide and per-guide limits both hold across many topics."""
+    in_flight = {}
+    peak_total = 0
+    peak_per_topic = 0
+
+    async def fake_ask(model, prompt, system_prompt=None):
+        nonlocal peak_total, peak_per_topic
+        topic = prompt.split("'")[1]
+        in_flight[topic] = in_flight.get(topic, 0) + 1
+        peak_total = max(peak_total, sum(in_flight.values()))
+        peak_per_topic = max(peak_per_topic, in_flight[topic])
+        await asyncio.sleep(0.005)
+        in_flight[topic] -= 1
+        return make_response(chapter_markdown(chapter_index(prompt)))
+
+    engine = Engine(max_concurrency=4, per_guide_concurrency=2, ask=fake_ask)
+    topics = [f"Topic {i}" for i in range(6)]
+    results = [r async for r in iter_batch(engine, topics, max_guides=3)]
+
+    assert sorted(r.topic for r in results) == sorted(topics)
+    assert all(r.ok for r in results)
+    assert peak_total == 4
+    assert peak_per_topic == 2
+
+
+@pytest.mark.asyncio
+async def test_iter_batch_reports_failures_without_aborting():
+    """A failing topic is reported and the rest of the batch still completes."""
+
+    async def fake_ask(model, prompt, system_prompt=None):
+        if "'Broken'" in prompt:
+            return make_response("This is just random text.")
+        return make_response(chapter_markdown(chapter_index(prompt)))
+
+    engine = Engine(ask=fake_ask)
+    results = {r.topic: r async for r in iter_batch(engine, ["Good", "Broken"])}
+
+    assert results["Good"].ok
+    assert not results["Broken"].ok
+    assert "failed" in results["Broken"].error
+
+
+@pytest.mark.asyncio
+async def test_run_batch_writes_each_guide(tmp_path):
+    """Every successful guide is written as JSON named after its slug."""
+
+    async def fake_ask(model, prompt, system_prompt=None):
+        return make_response(chapter_markdown(chapter_index(prompt)))
+
+    engine = Engine(ask=fake_ask)
+    results = [
+        r async for r in run_batch(engine, ["Python Asyncio!"], tmp_path / "out")
+    ]
+
+    assert results[0].output_path == tmp_path / "out" / "python-asyncio.json"
+    data = json.loads(results[0].output_path.read_text())
+    assert data["topic"] == "Python Asyncio!"
+    assert len(data["chapters"]) == 5
+
+
+
+def test_assign_slugs_disambiguates_collisions():
+    """Topics with the same slug each get a hash suffix; others keep their slug."""
+    slugs = assign_slugs(["C++", "C#", "Asyncio", "Ελληνικά", "日本語"])
+
+    assert slugs["Asyncio"] == "asyncio"
+    assert slugs["C++"].startswith("c-") and slugs["C#"].startswith("c-")
+    assert slugs["Ελληνικά"].startswith("guide-") and slugs["日本語"].startswith("guide-")
+    assert len(set(slugs.values())) == 5
+    assert assign_slugs(["C#", "C++"]) == {"C#": slugs["C#"], "C++": slugs["C++"]}
+
+
+@pytest.mark.asyncio
+async def test_run_batch_colliding_topics_get_separate_files(tmp_path):
+    """Topics whose slugs collide are written to distinct files."""
+    async def fake_ask(model, prompt, system_prompt=None):
+        return make_response(chapter_markdown(chapter_index(prompt)))
+
+    results = [r async for r in run_batch(Engine(ask=fake_ask), ["C++", "C#"], tmp_path)]
+
+    paths = {r.topic: r.output_path for r in results}
+    assert paths["C++"] != paths["C#"]
+    for topic, path in paths.items():
+        assert json.loads(path.read_text())["topic"] == topic
+
+@pytest.mark.asyncio
+async def test_run_batch_renders_html(tmp_path, monkeypatch):
+    """With a renderer, every guide is also written as HTML pages."""
+    async def fake_ask(model, prompt, system_prompt=None):
+        return make_response(chapter_markdown(chapter_index(prompt)))
+
+    root = Path(__file__).resolve().parents[2]
+    monkeypatch.setattr(get_settings().app, "asset_dir", root / "assets")
+    renderer = Renderer(root / "templates", bytecode_cache=False, asset_store=False)
+
+    results = [
+        r
+        async for r in run_batch(
+            Engine(ask=fake_ask), ["Asyncio"], tmp_path, renderer=renderer
+        )
+    ]
+
+    assert results[0].site_path == tmp_path / "asyncio"
+    assert (tmp_path / "asyncio" / "index.html").is_file()
+    assert (tmp_path / "asyncio" / "chapter-5.html").is_file()
+    assert (tmp_path / STATIC_DIR / renderer.assets["tailwind.css"].filename).is_file()
+
+
+
+@pytest.mark.asyncio
+async def test_topic_named_static_keeps_assets(tmp_path, monkeypatch):
+    """A guide whose slug matches the old asset directory name cannot replace the assets."""
+    async def fake_ask(model, prompt, system_prompt=None):
+        return make_response(chapter_markdown(chapter_index(prompt)))
+
+    root = Path(__file__).resolve().parents[2]
+    monkeypatch.setattr(get_settings().app, "asset_dir", root / "assets")
+    renderer = Renderer(root / "templates", bytecode_cache=False, asset_store=False)
+
+    results = [
+        r
+        async for r in run_batch(
+            Engine(ask=fake_ask), ["Static", "Asyncio"], tmp_path, renderer=renderer
+        )
+    ]
+
+    assert all(r.ok for r in results)
+    assert (tmp_path / "static" / "index.html").is_file()
+    stylesheet = renderer.assets["tailwind.css"].filename
+    assert (tmp_path / STATIC_DIR / stylesheet).is_file()
+    assert f"../{STATIC_DIR}/{stylesheet}" in (tmp_path / "asyncio" / "index.html").read_text()
+
+@pytest.mark.asyncio
+async def test_rerun_batch_is_incremental(tmp_path, monkeypatch):
+    """A rerun rewrites no pages; dropping a topic deletes its pages."""
+
+    async def fake_ask(model, prompt, system_prompt=None):
+        return make_response(chapter_markdown(chapter_index(prompt)))
+
+    root = Path(__file__).resolve().parents[2]
+    renderer = Renderer(
+        root / "templates", bytecode_cache=False, asset_dir=root / "assets", asset_store=False
+    )
+
+    async def run(topics):
+        return [
+            r
+            async for r in run_batch(
+                Engine(ask=fake_ask), topics, tmp_path, renderer=renderer
+            )
+        ]
+
+    await run(["Asyncio", "Rust"])
+    page = tmp_path / "asyncio" / "chapter-1.html"
+    mtime = page.stat().st_mtime_ns
+
+    await run(["Asyncio"])
+
+    assert page.stat().st_mtime_ns == mtime
+    assert not (tmp_path / "rust").exists()
+
+
+@pytest.mark.asyncio
+async def test_rerun_over_unchanged_guides_draws_no_diagrams(tmp_path, monkeypatch):
+    """Diagrams are drawn once; a second batch links them from the diagram cache."""
+    monkeypatch.setattr(get_settings().app, "diagram_cache_dir", tmp_path / "diagrams")
+    drawn = []
+    real_draw = diagram_pool.create_study_guide_diagram
+
+    def counting_draw(chapters, output_filename, *args):
+        drawn.append(output_filename)
+        return real_draw(chapters, output_filename, *args)
+
+    monkeypatch.setattr(diagram_pool, "create_study_guide_diagram", counting_draw)
+
+    async def fake_ask(model, prompt, system_prompt=None):
+        return make_response(chapter_markdown(chapter_index(prompt)))
+
+    async def run(output_dir):
+        async with DiagramPool(workers=1) as pool:
+            batch = run_batch(Engine(ask=fake_ask), ["Asyncio", "Rust"], output_dir, diagrams=pool)
+            return [result async for result in batch]
+
+    first = await run(tmp_path / "first")
+    second = await run(tmp_path / "second")
+
+    assert len(drawn) == 2
+    assert sorted(r.diagram_path.name for r in second) == ["asyncio.svg", "rust.svg"]
+    for result in first + second:
+        assert result.diagram_path.read_text().startswith("<svg")
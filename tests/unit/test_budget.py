@@ -0,0 +1,132 @@
+"""
+Unit tests for the studyguide.budget module.
+"""
+
+import pytest
+
+from studyguide.budget import (
+    MODEL_PRICES,
+    BudgetExceededError,
+    CostLedger,
+    ModelPrice,
+    estimate_prompt_tokens,
+)
+
+
+def test_model_price_cost():
+    """Cost combines the flat fee with input and output token prices."""
+    price = ModelPrice(input_per_million=1.0, output_per_million=2.0, per_request=0.01)
+    assert price.cost(1_000_000, 500_000) == pytest.approx(2.01)
+
+
+def test_estimate_prompt_tokens():
+    """Prompt tokens are estimated at roughly four characters per token."""
+    messages = [{"role": "system", "content": "a" * 40}, {"role": "user", "content": "b" * 60}]
+    assert estimate_prompt_tokens(messages) == 25
+
+
+def test_reserve_and_commit_records_actual_usage():
+    """Committing swaps the worst-case hold for the reported usage."""
+    ledger = CostLedger(budget_usd=1.0)
+    reservation = ledger.reserve("sonar-medium-chat", 1000, 1500)
+    assert reservation.model == "sonar-medium-chat"
+    assert ledger.reserved_usd == pytest.approx(2500 * 0.6 / 1_000_000)
+
+    cost = ledger.commit(reservation, {"prompt_tokens": 1000, "completion_tokens": 500})
+
+    assert cost == pytest.approx(1500 * 0.6 / 1_000_000)
+    assert ledger.reserved_usd == 0
+    assert ledger.spent_usd == pytest.approx(cost)
+    assert ledger.summary()["usage"]["sonar-medium-chat"] == {
+        "prompt_tokens": 1000,
+        "completion_tokens": 500,
+        "calls": 1,
+    }
+
+
+def test_commit_without_usage_charges_reservation():
+    """Missing usage is charged at the reserved worst case."""
+    ledger = CostLedger(budget_usd=1.0)
+    reservation = ledger.reserve("sonar-small-chat", 100, 100)
+    assert ledger.commit(reservation) == pytest.approx(reservation.estimated_usd)
+
+
+def test_release_returns_hold():
+    """Released reservations no longer count against the budget."""
+    ledger = CostLedger(budget_usd=1.0)
+    ledger.release(ledger.reserve("sonar-medium-chat", 1000, 1500))
+    assert ledger.remaining_usd == pytest.approx(1.0)
+    assert ledger.spent_usd == 0
+
+
+def test_settled_reservation_is_never_returned_twice():
+    """Releasing after commit leaves other holds alone; committing twice is an error."""
+    ledger = CostLedger(budget_usd=1.0)
+    other = ledger.reserve("sonar-medium-chat", 1000, 1500)
+    reservation = ledger.reserve("sonar-medium-chat", 1000, 1500)
+
+    ledger.commit(reservation)
+    ledger.release(reservation)
+
+    assert ledger.reserved_usd == pytest.approx(other.estimated_usd)
+    with pytest.raises(ValueError, match="already settled"):
+        ledger.commit(reservation)
+
+
+def test_degrades_to_cheaper_model():
+    """A request that no longer fits moves to a cheaper model first."""
+    full = MODEL_PRICES["sonar-medium-chat"].cost(1000, 1500)
+    ledger = CostLedger(budget_usd=full * 0.9)
+
+    reservation = ledger.reserve("sonar-medium-chat", 1000, 1500)
+
+    assert reservation.model == "sonar-small-chat"
+    assert reservation.max_tokens == 1500
+    assert reservation.degraded
+
+
+def test_degrades_max_tokens_when_no_cheaper_model_fits():
+    """Without a cheaper model the completion is shortened to what fits."""
+    full = MODEL_PRICES["sonar-small-chat"].cost(1000, 1500)
+    ledger = CostLedger(budget_usd=full * 0.8, min_completion_tokens=256)
+
+    reservation = ledger.reserve("sonar-small-chat", 1000, 1500)
+
+    assert reservation.model == "sonar-small-chat"
+    assert 256 <= reservation.max_tokens < 1500
+    assert reservation.estimated_usd <= ledger.budget_usd
+
+
+def test_refuses_when_budget_exhausted():
+    """Once even the cheapest, shortest option does not fit, calls are refused."""
+    ledger = CostLedger(budget_usd=0.001)
+    ledger.commit(ledger.reserve("sonar-medium-chat", 100, 1500))
+
+    with pytest.raises(BudgetExceededError, match="exceed the \\$0.00 budget"):
+        ledger.reserve("sonar-medium-chat", 100, 1000)
+
+
+def test_outstanding_reservations_count_against_budget():
+    """Queued requests are pre-charged, so concurrent calls cannot overshoot."""
+    cost = MODEL_PRICES["sonar-small-chat"].cost(0, 1000)
+    ledger = CostLedger(budget_usd=cost * 2.5, min_completion_tokens=1000)
+
+    ledger.reserve("sonar-small-chat", 0, 1000)
+    ledger.reserve("sonar-small-chat", 0, 1000)
+    with pytest.raises(BudgetExceededError):
+        ledger.reserve("sonar-small-chat", 0, 1000)
+
+
+def test_zero_budget_disables_enforcement():
+    """A budget of zero records costs without refusing anything."""
+    ledger = CostLedger(budget_usd=0)
+    reservation = ledger.reserve("sonar-pro", 10**6, 10**6)
+    assert reservation.model == "sonar-pro"
+    assert ledger.remaining_usd is None
+
+
+def test_unknown_model_uses_fallback_price():
+    """Unknown models are priced pessimistically instead of for free."""
+    ledger = CostLedger(budget_usd=1.0)
+    reservation = ledger.reserve("mystery-model", 1000, 1000)
+    assert reservation.estimated_usd > MODEL_PRICES["sonar-pro"].cost(1000, 1000) * 0.5
@@ -0,0 +1,155 @@
+"""
+Unit tests for the studyguide.chapter_cache module.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from studyguide import chapter_cache
+from studyguide.chapter_cache import ChapterCache, content_key
+from studyguide.parser import ParseError, parse_chapter_response
+from tests.unit.test_parser import VALID_MARKDOWN_INPUT
+
+
+@pytest.fixture
+def parse_calls(monkeypatch):
+    """Counts calls to the real parser made by the cache."""
+    calls = []
+
+    def counting_parse(text):
+        calls.append(text)
+        return parse_chapter_response(text)
+
+    monkeypatch.setattr(chapter_cache, "parse_chapter_response", counting_parse)
+    return calls
+
+
+def test_memory_hit_skips_parsing(parse_calls):
+    """The second parse of the same text is served from memory."""
+    cache = ChapterCache(max_entries=8)
+
+    first = cache.parse(VALID_MARKDOWN_INPUT)
+    second = cache.parse(VALID_MARKDOWN_INPUT)
+
+    assert first == parse_chapter_response(VALID_MARKDOWN_INPUT)
+    assert second is first
+    assert len(parse_calls) == 1
+    assert cache.hits == {"memory": 1, "disk": 0}
+    assert cache.misses == 1
+
+
+def test_disk_tier_survives_new_instance(tmp_path, parse_calls):
+    """A new cache on the same directory (a rerun) does not parse again."""
+    ChapterCache(directory=tmp_path).parse(VALID_MARKDOWN_INPUT)
+    rerun = ChapterCache(directory=tmp_path)
+
+    assert rerun.parse(VALID_MARKDOWN_INPUT) == parse_chapter_response(VALID_MARKDOWN_INPUT)
+    assert len(parse_calls) == 1
+    assert rerun.hits["disk"] == 1
+    # The disk hit is promoted to memory
+    rerun.parse(VALID_MARKDOWN_INPUT)
+    assert rerun.hits["memory"] == 1
+
+
+def test_lru_evicts_least_recently_used(parse_calls):
+    """Only max_entries chapters are kept in memory."""
+    cache = ChapterCache(max_entries=2)
+    texts = [VALID_MARKDOWN_INPUT.replace("Asyncio", f"Topic {i}") for i in range(3)]
+
+    cache.parse(texts[0])
+    cache.parse(texts[1])
+    cache.parse(texts[0])  # texts[1] is now least recently used
+    cache.parse(texts[2])
+
+    assert cache.get(texts[0]) is not None
+    assert cache.get(texts[1]) is None
+
+
+def test_parse_errors_are_not_cached(tmp_path):
+    """Unparseable text raises every time and leaves nothing behind."""
+    cache = ChapterCache(directory=tmp_path)
+    for _ in range(2):
+        with pytest.raises(ParseError):
+            cache.parse("This is just random text.")
+    assert cache.get("This is just random text.") is None
+    assert not list(tmp_path.rglob("*.bin"))
+
+
+def test_parser_version_bump_invalidates(tmp_path, monkeypatch, parse_calls):
+    """Entries of another parser version are neither used nor kept."""
+    ChapterCache(directory=tmp_path).parse(VALID_MARKDOWN_INPUT)
+    old_key = content_key(VALID_MARKDOWN_INPUT)
+    old_dir = tmp_path / chapter_cache._VERSION
+
+    monkeypatch.setattr(chapter_cache, "_VERSION", "v999.1")
+    assert content_key(VALID_MARKDOWN_INPUT) != old_key
+    ChapterCache(directory=tmp_path).parse(VALID_MARKDOWN_INPUT)
+
+    assert len(parse_calls) == 2
+    assert not old_dir.exists()
+    assert (tmp_path / "v999.1").is_dir()
+
+
+def test_pruning_spares_directories_not_named_like_versions(tmp_path):
+    """Only version directories are removed from a shared cache directory."""
+    for name in ("venv", "v2", "videos", "v0.9"):
+        (tmp_path / name).mkdir()
+
+    ChapterCache(directory=tmp_path).parse(VALID_MARKDOWN_INPUT)
+
+    assert sorted(p.name for p in tmp_path.iterdir()) == sorted(
+        ["venv", "v2", "videos", chapter_cache._VERSION]
+    )
+
+
+def test_corrupt_disk_entry_is_discarded(tmp_path, parse_calls):
+    """A damaged file is treated as a miss and replaced."""
+    ChapterCache(directory=tmp_path).parse(VALID_MARKDOWN_INPUT)
+    (entry,) = tmp_path.rglob("*.bin")
+    entry.write_bytes(b"garbage")
+
+    chapter = ChapterCache(directory=tmp_path).parse(VALID_MARKDOWN_INPUT)
+
+    assert chapter == parse_chapter_response(VALID_MARKDOWN_INPUT)
+    assert len(parse_calls) == 2
+    assert entry.read_bytes() != b"garbage"
+
+
+@pytest.mark.parametrize("error", [IndexError, KeyError])
+def test_entry_failing_to_decode_is_discarded(tmp_path, monkeypatch, parse_calls, error):
+    """Any decoding failure of a damaged payload is a miss, never a crash."""
+    ChapterCache(directory=tmp_path).parse(VALID_MARKDOWN_INPUT)
+
+    def broken_decode(payload):
+        raise error("corrupt")
+
+    monkeypatch.setattr(chapter_cache, "decode_chapter", broken_decode)
+    ChapterCache(directory=tmp_path).parse(VALID_MARKDOWN_INPUT)
+
+    assert len(parse_calls) == 2
+
+
+def test_disabled_tiers_always_parse(parse_calls):
+    """With both tiers disabled every call parses."""
+    cache = ChapterCache(max_entries=0)
+    cache.parse(VALID_MARKDOWN_INPUT)
+    cache.parse(VALID_MARKDOWN_INPUT)
+    assert len(parse_calls) == 2
+
+
+def test_counters_add_up_across_threads(tmp_path):
+    """Hits and misses counted from worker threads add up to the lookups made."""
+    cache = ChapterCache(max_entries=0, directory=tmp_path)
+    cache.parse(VALID_MARKDOWN_INPUT)
+
+    def lookups(_):
+        for _ in range(50):
+            cache.get(VALID_MARKDOWN_INPUT)
+            cache.get("never cached")
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(lookups, range(8)))
+
+    assert cache.hits == {"memory": 0, "disk": 400}
+    assert cache.misses == 401
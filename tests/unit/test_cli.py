@@ -0,0 +1,224 @@
+"""
+Unit tests for the studyguide.cli module.
+"""
+
+import json
+import logging
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+import structlog
+from typer.testing import CliRunner
+
+from studyguide import api_client, batch, metrics
+from studyguide.batch import BatchResult
+from studyguide.cli import app
+from studyguide.diagram_pool import DiagramPool
+from studyguide.logging_config import shutdown_logging
+
+# Modules the CLI must not load before a command needs them
+HEAVY_MODULES = [
+    "httpx",
+    "structlog",
+    "pydantic_settings",
+    "jinja2",
+    "diagrams",
+    "prometheus_client",
+    "studyguide.config",
+    "studyguide.api_client",
+    "studyguide.engine",
+    "studyguide.renderer",
+]
+
+# Generous bound on importing the CLI module (Typer alone is ~45 ms)
+IMPORT_BUDGET_SECONDS = 0.2
+
+
+def run_python(code: str) -> dict:
+    output = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.splitlines()[-1])
+
+
+def test_import_is_cheap():
+    """Importing the CLI loads none of the heavy modules and stays fast."""
+    result = run_python(
+        "import json, sys, time\n"
+        "start = time.perf_counter()\n"
+        "import studyguide.cli\n"
+        "seconds = time.perf_counter() - start\n"
+        f"loaded = [m for m in {HEAVY_MODULES!r} if m in sys.modules]\n"
+        "print(json.dumps({'seconds': seconds, 'loaded': loaded}))"
+    )
+
+    assert result["loaded"] == []
+    assert result["seconds"] < IMPORT_BUDGET_SECONDS
+
+
+def test_version_and_help_load_no_heavy_modules():
+    """--version and --help exit before any command imports its modules."""
+    result = run_python(
+        "import json, sys\n"
+        "from typer.testing import CliRunner\n"
+        "from studyguide.cli import app\n"
+        "runner = CliRunner()\n"
+        "codes = [runner.invoke(app, [arg]).exit_code for arg in ('--version', '--help')]\n"
+        f"loaded = [m for m in {HEAVY_MODULES!r} if m in sys.modules]\n"
+        "print(json.dumps({'codes': codes, 'loaded': loaded}))"
+    )
+
+    assert result == {"codes": [0, 0], "loaded": []}
+
+
+def test_version_option_prints_version():
+    """--version prints the package version."""
+    result = CliRunner().invoke(app, ["--version"])
+
+    assert result.exit_code == 0
+    assert result.output.startswith("studyguide ")
+
+
+@pytest.fixture(autouse=True)
+def reset_logging():
+    """Undo the logging configuration each invocation installs."""
+    root_handlers = logging.root.handlers[:]
+    root_level = logging.root.level
+    structlog_config = structlog.get_config()
+    yield
+    shutdown_logging()
+    logging.root.handlers = root_handlers
+    logging.root.level = root_level
+    structlog.configure(**structlog_config)
+
+
+@pytest.fixture
+def topics_file(tmp_path):
+    path = tmp_path / "topics.txt"
+    path.write_text("Asyncio\nRust\n")
+    return path
+
+
+@pytest.fixture
+def fake_batch(monkeypatch):
+    """Replaces run_batch: the first topic succeeds, every other one fails."""
+    calls = {}
+
+    async def fake_run_batch(
+        engine, topics, output_dir, max_guides=None, renderer=None, diagrams=None
+    ):
+        calls.update(
+            engine=engine, topics=topics, max_guides=max_guides, renderer=renderer, diagrams=diagrams
+        )
+        for index, topic in enumerate(topics):
+            if index == 0:
+                yield BatchResult(topic=topic, output_path=Path(output_dir) / "asyncio.json")
+            else:
+                yield BatchResult(topic=topic, error="boom")
+
+    monkeypatch.setattr(batch, "run_batch", fake_run_batch)
+    monkeypatch.setattr(api_client, "get_ledger", lambda: api_client.CostLedger(budget_usd=1.0))
+    return calls
+
+
+def test_batch_reports_each_topic_and_fails_if_any_failed(topics_file, tmp_path, fake_batch):
+    """Every result gets a line; a failed topic makes the exit code 1."""
+    result = CliRunner().invoke(
+        app,
+        [
+            "batch", str(topics_file), "--output-dir", str(tmp_path / "out"),
+            "--model", "sonar-test", "--max-concurrency", "3", "--max-guides", "2",
+        ],
+    )
+
+    assert result.exit_code == 1
+    assert f"ok\tAsyncio\t{tmp_path / 'out' / 'asyncio.json'}" in result.output
+    assert "failed\tRust\tboom" in result.output
+    assert "spent\t$0.0000\t0 calls" in result.output
+    assert fake_batch["topics"] == ["Asyncio", "Rust"]
+    assert fake_batch["engine"].model == "sonar-test"
+    assert fake_batch["max_guides"] == 2
+    assert fake_batch["renderer"] is None
+    assert fake_batch["diagrams"] is None
+
+
+def test_batch_diagrams_option_passes_a_pool(topics_file, tmp_path, fake_batch):
+    """--diagrams hands run_batch a diagram pool."""
+    CliRunner().invoke(
+        app, ["batch", str(topics_file), "--output-dir", str(tmp_path), "--diagrams"]
+    )
+
+    assert isinstance(fake_batch["diagrams"], DiagramPool)
+
+
+def test_batch_succeeds_with_queued_logging(tmp_path, fake_batch):
+    """The logging options are accepted and a clean batch exits with 0."""
+    topics = tmp_path / "topics.txt"
+    topics.write_text("Asyncio\n")
+
+    result = CliRunner().invoke(
+        app,
+        [
+            "--log-queue", "--log-overflow", "drop", "--log-sample", "Cache hit=0.1",
+            "batch", str(topics), "--output-dir", str(tmp_path / "out"),
+        ],
+    )
+
+    assert result.exit_code == 0, result.output
+
+
+@pytest.mark.parametrize(
+    "options, hint",
+    [
+        (["--log-sample", "Cache hit"], "--log-sample"),
+        (["--log-sample", "Cache hit=2"], "--log-sample"),
+        (["--log-queue", "--log-overflow", "discard"], "--log-overflow"),
+    ],
+)
+def test_invalid_logging_options_are_usage_errors(topics_file, fake_batch, options, hint):
+    """Malformed sample rates and overflow policies exit with a usage error."""
+    result = CliRunner().invoke(app, [*options, "batch", str(topics_file)])
+
+    assert result.exit_code == 2
+    assert hint in result.output
+
+
+def test_metrics_file_is_written_on_exit(topics_file, tmp_path, fake_batch):
+    """--metrics-file leaves the metrics behind even when the batch fails."""
+    path = tmp_path / "studyguide.prom"
+
+    result = CliRunner().invoke(
+        app,
+        ["--metrics-file", str(path), "batch", str(topics_file), "--output-dir", str(tmp_path)],
+    )
+
+    assert result.exit_code == 1
+    assert "# TYPE studyguide_api_requests_in_flight gauge" in path.read_text()
+
+
+def test_metrics_port_serves_metrics(topics_file, tmp_path, fake_batch, monkeypatch):
+    """--metrics-port starts the HTTP exporter on that port."""
+    ports = []
+    monkeypatch.setattr(metrics, "start_http_server", ports.append)
+
+    CliRunner().invoke(
+        app, ["--metrics-port", "9464", "batch", str(topics_file), "--output-dir", str(tmp_path)]
+    )
+
+    assert ports == [9464]
+
+
+def test_unavailable_metrics_port_is_a_usage_error(topics_file, fake_batch, monkeypatch):
+    """A port that cannot be bound is reported against the option."""
+
+    def fail(port):
+        raise OSError("Address already in use")
+
+    monkeypatch.setattr(metrics, "start_http_server", fail)
+
+    result = CliRunner().invoke(app, ["--metrics-port", "9464", "batch", str(topics_file)])
+
+    assert result.exit_code == 2
+    assert "Address already in use" in result.output
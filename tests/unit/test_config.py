@@ -1,11 +1,14 @@
 """Unit tests for the configuration loading."""
 
 import os
+import runpy
+import subprocess
+import sys
 from pathlib import Path
 from unittest.mock import patch
 
 import pytest
-from pydantic import ValidationError
+from pydantic import Field, ValidationError
 from pydantic_settings import SettingsConfigDict
 
 # Import the module that loads settings to potentially reload it
@@ -45,8 +48,8 @@ def reload_settings(monkeypatch):
         model_config = SettingsConfigDict(extra="ignore")  # No .env file for tests
 
     class TestSettings(config.Settings):
-        api: TestApiSettings = TestApiSettings()
-        app: TestAppSettings = TestAppSettings()
+        api: TestApiSettings = Field(default_factory=TestApiSettings)
+        app: TestAppSettings = Field(default_factory=TestAppSettings)
 
     return TestSettings()
 
@@ -65,6 +68,7 @@ def test_load_defaults(monkeypatch):
     assert settings.app.asset_dir == Path("assets")
     assert settings.app.cache_type == "memory"
     assert settings.app.redis_url is None
+    assert settings.app.max_concurrency == 5
 
 
 def test_load_from_env(monkeypatch):
@@ -88,6 +92,19 @@ def test_load_from_env(monkeypatch):
     assert settings.app.redis_url == "redis://localhost:6379/1"
 
 
+@pytest.mark.parametrize(
+    "name, value",
+    [("CACHE_TYPE", "memcached"), ("CACHE_SERIALIZER", "pickle"), ("WRITE_FSYNC", "always")],
+)
+def test_unknown_choice_is_rejected(monkeypatch, name, value):
+    """Cache backends, serializers and fsync modes are validated when the settings load."""
+    monkeypatch.setenv("PPLX_API_KEY", "test_key")
+    monkeypatch.setenv(name, value)
+
+    with pytest.raises(ValidationError, match=name.lower()):
+        reload_settings(monkeypatch)
+
+
 def test_missing_required_env(monkeypatch):
     """Test that validation fails if a required environment variable is missing."""
     # Ensure PPLX_API_KEY is NOT set
@@ -96,8 +113,9 @@ def test_missing_required_env(monkeypatch):
     with pytest.raises(ValidationError) as excinfo:
         reload_settings(monkeypatch)
 
-    # Check that the error message mentions the missing field
-    assert "api.api_key" in str(excinfo.value)
+    # The nested ApiSettings is built by its default_factory, which raises
+    # with the location inside it, not "api.api_key"
+    assert [(e["loc"], e["type"]) for e in excinfo.value.errors()] == [(("api_key",), "missing")]
     assert "Field required" in str(excinfo.value)
 
 
@@ -128,3 +146,70 @@ def test_path_types(monkeypatch):
     assert settings.app.template_dir == Path("templates") # Default
     assert isinstance(settings.app.asset_dir, Path)
     assert settings.app.asset_dir == Path("assets") # Default
+
+
+def test_get_settings_is_built_once(monkeypatch):
+    """get_settings() loads on first call and then returns the same instance."""
+    monkeypatch.setenv("PPLX_API_KEY", "test_key_once")
+    config.get_settings.cache_clear()
+    try:
+        settings = config.get_settings()
+        assert settings.api.api_key.get_secret_value() == "test_key_once"
+        assert config.get_settings() is settings
+        assert config.settings is settings
+    finally:
+        config.get_settings.cache_clear()
+
+
+def test_get_settings_explains_a_failed_load(monkeypatch, capsys):
+    """A load failure propagates after a hint about the required variables."""
+
+    def failing_settings():
+        raise ValueError("PPLX_API_KEY missing")
+
+    monkeypatch.setattr(config, "Settings", failing_settings)
+    config.get_settings.cache_clear()
+    try:
+        with pytest.raises(ValueError, match="PPLX_API_KEY missing"):
+            config.get_settings()
+    finally:
+        config.get_settings.cache_clear()
+
+    output = capsys.readouterr().out
+    assert "Error loading configuration: PPLX_API_KEY missing" in output
+    assert "PPLX_API_KEY" in output.splitlines()[-1]
+
+
+def test_unknown_module_attribute_raises():
+    """Only ``settings`` is resolved lazily; other names are missing attributes."""
+    with pytest.raises(AttributeError, match="no attribute 'setting'"):
+        config.setting
+
+
+def test_running_the_module_prints_masked_configuration(monkeypatch, capsys):
+    """``python -m studyguide.config`` shows the settings without the full key."""
+    monkeypatch.setenv("PPLX_API_KEY", "pplx-secret-value")
+    monkeypatch.setenv("CACHE_TYPE", "disk")
+    monkeypatch.setenv("REDIS_URL", "redis://localhost:6379/1")
+    # A fresh copy of the module, with its own get_settings() cache
+    runpy.run_path(config.__file__, run_name="__main__")
+
+    output = capsys.readouterr().out
+    assert "API Key: pplx... (masked)" in output
+    assert "secret-value" not in output
+    assert "Cache Path:" in output
+    assert "Redis URL: redis://localhost:6379/1" in output
+
+
+def test_import_needs_no_api_key():
+    """Importing the package modules neither loads settings nor needs the key."""
+    env = {k: v for k, v in os.environ.items() if k != "PPLX_API_KEY"}
+    code = (
+        "import sys\n"
+        "import studyguide.renderer, studyguide.chapter_cache, studyguide.diagram_cache\n"
+        "assert 'httpx' not in sys.modules  # worker-side modules skip the network stack\n"
+        "import studyguide.api_client, studyguide.engine\n"
+        "from studyguide import config\n"
+        "assert config.get_settings.cache_info().currsize == 0"
+    )
+    subprocess.run([sys.executable, "-c", code], env=env, check=True)
@@ -0,0 +1,102 @@
+"""
+Unit tests for the studyguide.diagram_cache module.
+"""
+
+import os
+
+import pytest
+
+from studyguide import diagram_cache
+from studyguide.diagram_cache import DiagramCache, structure_key
+from studyguide.parser import parse_chapter_response
+from tests.unit.test_parser import VALID_MARKDOWN_INPUT
+
+
+@pytest.fixture
+def chapters():
+    return [parse_chapter_response(VALID_MARKDOWN_INPUT)]
+
+
+@pytest.fixture
+def draw_calls(monkeypatch):
+    """Counts calls to the real diagram backend made by the cache."""
+    calls = []
+    real = diagram_cache.create_study_guide_diagram
+
+    def counting_draw(*args):
+        calls.append(args)
+        return real(*args)
+
+    monkeypatch.setattr(diagram_cache, "create_study_guide_diagram", counting_draw)
+    return calls
+
+
+def test_hit_links_cached_diagram_without_drawing(tmp_path, chapters, draw_calls):
+    """An unchanged structure is served from the cache into the new output path."""
+    cache = DiagramCache(tmp_path / "cache")
+
+    first = cache.render(chapters, str(tmp_path / "a" / "guide"), output_format="svg")
+    second = cache.render(chapters, str(tmp_path / "b" / "guide"), output_format="svg")
+
+    assert len(draw_calls) == 1
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert second.read_bytes() == first.read_bytes()
+    assert os.path.samefile(first, second)
+
+
+def test_key_covers_exactly_the_structure(chapters):
+    """Only labelled structure, title, format and backend change the key."""
+    chapter = chapters[0]
+    key = structure_key(chapters, "T", "svg", "builtin")
+
+    reworded = chapter.model_copy(
+        update={"quiz": [q.model_copy(update={"question": "Other?"}) for q in chapter.quiz]}
+    )
+    assert structure_key([reworded], "T", "svg", "builtin") == key
+
+    longer = chapter.model_copy(update={"summary": chapter.summary + " More words."})
+    assert structure_key([longer], "T", "svg", "builtin") != key
+    assert structure_key(chapters, "Other", "svg", "builtin") != key
+    assert structure_key(chapters, "T", "dot", "builtin") != key
+
+
+def test_regenerating_never_writes_through_a_cached_link(tmp_path, chapters, draw_calls):
+    """A miss replaces an output linked to a cache entry instead of overwriting it."""
+    cache = DiagramCache(tmp_path / "cache")
+    output = str(tmp_path / "out" / "guide")
+    cache.render(chapters, output, title="First", output_format="svg")
+    cache.render(chapters, output, title="Second", output_format="svg")
+
+    assert len(draw_calls) == 2
+    cached = cache.render(chapters, str(tmp_path / "again"), title="First", output_format="svg")
+    assert len(draw_calls) == 2
+    assert "First" in cached.read_text() and "Second" not in cached.read_text()
+
+
+def test_disabled_cache_always_draws(tmp_path, chapters, draw_calls):
+    cache = DiagramCache(None)
+    for _ in range(2):
+        cache.render(chapters, str(tmp_path / "guide"), output_format="dot")
+
+    assert len(draw_calls) == 2
+    assert (tmp_path / "guide.dot").is_file()
+
+
+def test_other_versions_are_pruned_on_first_write(tmp_path, chapters):
+    stale = tmp_path / "cache" / "v0" / "ab"
+    stale.mkdir(parents=True)
+
+    DiagramCache(tmp_path / "cache").render(chapters, str(tmp_path / "g"), output_format="svg")
+
+    assert not (tmp_path / "cache" / "v0").exists()
+
+
+def test_pruning_spares_directories_not_named_like_versions(tmp_path, chapters):
+    """A cache directory shared with other files only loses version directories."""
+    for name in ("venv", "v1.0"):
+        (tmp_path / "cache" / name).mkdir(parents=True)
+
+    DiagramCache(tmp_path / "cache").render(chapters, str(tmp_path / "g"), output_format="svg")
+
+    assert (tmp_path / "cache" / "venv").is_dir()
+    assert (tmp_path / "cache" / "v1.0").is_dir()
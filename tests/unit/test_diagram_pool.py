@@ -0,0 +1,110 @@
+"""
+Unit tests for the studyguide.diagram_pool module.
+"""
+
+import threading
+import time
+
+import pytest
+
+from studyguide import diagram_pool
+from studyguide.config import get_settings
+from studyguide.diagram_pool import render_diagrams
+from studyguide.engine import StudyGuide
+from studyguide.parser import parse_chapter_response
+from tests.unit.test_parser import VALID_MARKDOWN_INPUT
+
+
+@pytest.fixture(autouse=True)
+def diagram_cache_dir(tmp_path, monkeypatch):
+    """Keeps the pool's diagram cache inside the test's tmp dir."""
+    monkeypatch.setattr(get_settings().app, "diagram_cache_dir", tmp_path / "cache")
+    return tmp_path / "cache"
+
+
+def make_guides(count):
+    chapter = parse_chapter_response(VALID_MARKDOWN_INPUT)
+    return [StudyGuide(topic=f"Topic {i}", chapters=[chapter]) for i in range(count)]
+
+
+async def collect(results):
+    return [result async for result in results]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("workers", [1, 2])
+async def test_renders_every_guide(tmp_path, workers):
+    """Each guide's diagram is written, in a thread or in worker processes."""
+    guides = make_guides(5)
+
+    results = await collect(render_diagrams(guides, tmp_path / "out", workers=workers))
+
+    assert sorted(r.topic for r in results) == [g.topic for g in guides]
+    assert all(r.ok for r in results)
+    for guide in guides:
+        assert (tmp_path / "out" / f"{guide.slug}.svg").read_text().startswith("<svg")
+
+
+@pytest.mark.asyncio
+async def test_failure_is_reported_per_guide(tmp_path, monkeypatch):
+    """A guide that fails to draw yields an error result; the others still render."""
+    real = diagram_pool.create_study_guide_diagram
+
+    def flaky(chapters, output_filename, *args):
+        if output_filename.endswith("topic-1"):
+            raise RuntimeError("boom")
+        return real(chapters, output_filename, *args)
+
+    monkeypatch.setattr(diagram_pool, "create_study_guide_diagram", flaky)
+    monkeypatch.setattr(get_settings().app, "diagram_cache", False)
+
+    results = await collect(render_diagrams(make_guides(3), tmp_path, workers=1))
+
+    errors = {r.topic: r.error for r in results if not r.ok}
+    assert errors == {"Topic 1": "boom"}
+    assert sum(r.ok for r in results) == 2
+
+
+def test_graphviz_runs_are_capped(tmp_path, monkeypatch):
+    """No more than max_graphviz draws of the diagrams backend overlap."""
+    active, peak = 0, 0
+    lock = threading.Lock()
+
+    def fake_graphviz(chapters, output_filename, title, output_format, backend):
+        nonlocal active, peak
+        with lock:
+            active += 1
+            peak = max(peak, active)
+        time.sleep(0.01)
+        with open(f"{output_filename}.{output_format}", "wb") as f:
+            f.write(b"png")
+        with lock:
+            active -= 1
+
+    monkeypatch.setattr(diagram_pool, "create_study_guide_diagram", fake_graphviz)
+    slots = threading.BoundedSemaphore(1)
+    monkeypatch.setattr(diagram_pool, "_graphviz_slots", slots)
+
+    threads = [
+        threading.Thread(
+            target=diagram_pool._draw,
+            args=([], str(tmp_path / f"g{i}"), "T", "png", "diagrams"),
+        )
+        for i in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert peak == 1
+    assert len(list(tmp_path.glob("g*.png"))) == 4
+
+
+@pytest.mark.asyncio
+async def test_unsupported_format_raises_before_starting(tmp_path):
+    """A backend that cannot write the format fails up front."""
+    with pytest.raises(ValueError):
+        await collect(
+            render_diagrams(make_guides(1), tmp_path, output_format="png", backend="builtin")
+        )
@@ -0,0 +1,180 @@
+"""
+Unit tests for the studyguide.disk_cache module.
+"""
+
+import sqlite3
+
+import pytest
+from aiocache import cached
+from aiocache.serializers import MsgPackSerializer, StringSerializer
+
+from studyguide import disk_cache
+from studyguide.disk_cache import SQLiteCache
+
+
+@pytest.fixture
+def cache_path(tmp_path):
+    """Path to a fresh SQLite cache file."""
+    return tmp_path / "cache" / "test.sqlite"
+
+
+@pytest.mark.asyncio
+async def test_set_and_get_roundtrip(cache_path):
+    """Values are serialized with JsonSerializer by default and read back."""
+    cache = SQLiteCache(path=str(cache_path), namespace="ns")
+    await cache.set("key", {"id": "abc", "usage": {"total_tokens": 7}})
+
+    assert await cache.get("key") == {"id": "abc", "usage": {"total_tokens": 7}}
+    assert await cache.exists("key")
+    assert await cache.get("missing") is None
+    await cache.close()
+
+
+@pytest.mark.asyncio
+async def test_entries_persist_across_instances(cache_path):
+    """A new cache instance (e.g. a new process) sees earlier entries."""
+    first = SQLiteCache(path=str(cache_path))
+    await first.set("key", {"answer": 42})
+    await first.close()
+
+    second = SQLiteCache(path=str(cache_path))
+    assert await second.get("key") == {"answer": 42}
+    await second.close()
+
+
+@pytest.mark.asyncio
+async def test_expired_entries_are_not_returned(cache_path, monkeypatch):
+    """Entries past their TTL are treated as missing."""
+    now = [1000.0]
+    monkeypatch.setattr(disk_cache.time, "time", lambda: now[0])
+    cache = SQLiteCache(path=str(cache_path))
+    await cache.set("key", "value", ttl=10)
+
+    now[0] += 5
+    assert await cache.get("key") == "value"
+    now[0] += 10
+    assert await cache.get("key") is None
+    await cache.close()
+
+
+@pytest.mark.asyncio
+async def test_least_recently_used_entries_are_evicted(cache_path, monkeypatch):
+    """Once the size cap is exceeded, the least recently read entries go first."""
+    now = [1000.0]
+    monkeypatch.setattr(disk_cache.time, "time", lambda: now[0])
+    value = "x" * 100
+    cache = SQLiteCache(path=str(cache_path), max_size=350)
+
+    for key in ("a", "b", "c"):
+        now[0] += 1
+        await cache.set(key, value)
+    now[0] += 1
+    await cache.get("a")  # "b" is now least recently used
+    now[0] += 1
+    await cache.set("d", value)
+
+    assert await cache.exists("a")
+    assert not await cache.exists("b")
+    assert await cache.exists("c")
+    assert await cache.exists("d")
+    await cache.close()
+
+
+@pytest.mark.asyncio
+async def test_size_cap_counts_bytes_not_characters(cache_path):
+    """Non-ASCII text counts its UTF-8 length towards the size cap."""
+    cache = SQLiteCache(path=str(cache_path), max_size=350, serializer=StringSerializer())
+
+    await cache.set("a", "€" * 100)  # 300 bytes
+    await cache.set("b", "€" * 100)
+
+    assert not await cache.exists("a")
+    assert await cache.exists("b")
+    await cache.close()
+
+
+@pytest.mark.asyncio
+async def test_size_total_is_kept_without_summing(cache_path):
+    """The stored total follows inserts, replacements, deletes and clears."""
+    cache = SQLiteCache(path=str(cache_path), serializer=StringSerializer())
+
+    def totals():
+        with sqlite3.connect(cache_path) as db:
+            return (
+                db.execute("SELECT total FROM cache_size").fetchone()[0],
+                db.execute("SELECT COALESCE(SUM(size), 0) FROM cache").fetchone()[0],
+            )
+
+    await cache.set("a", "x" * 10)
+    await cache.set("b", "€" * 10)
+    await cache.set("a", "x" * 4)
+    assert totals() == (34, 34)
+    await cache.delete("b")
+    await cache.increment("n", 100)
+    assert totals() == (7, 7)
+    await cache.clear()
+    assert totals() == (0, 0)
+    await cache.close()
+
+
+@pytest.mark.asyncio
+async def test_reads_write_access_times_with_the_next_write(cache_path, monkeypatch):
+    """A hit does not write to the database; its access time lands with the next set."""
+    now = [1000.0]
+    monkeypatch.setattr(disk_cache.time, "time", lambda: now[0])
+    cache = SQLiteCache(path=str(cache_path))
+    await cache.set("a", "value")
+
+    def accessed_at():
+        with sqlite3.connect(cache_path) as db:
+            return db.execute("SELECT accessed_at FROM cache WHERE key = 'a'").fetchone()[0]
+
+    now[0] = 2000.0
+    assert await cache.get("a") == "value"
+    assert accessed_at() == 1000.0
+    await cache.set("b", "other")
+    assert accessed_at() == 2000.0
+    await cache.close()
+
+
+@pytest.mark.asyncio
+async def test_binary_serializer_and_namespaced_clear(cache_path):
+    """Binary serializers work and clear(namespace) only removes that namespace."""
+    cache = SQLiteCache(
+        path=str(cache_path), serializer=MsgPackSerializer(), namespace="a:"
+    )
+    await cache.set("key", {"choices": [1, 2, 3]})
+    await cache.set("other", "kept", namespace="b:")
+
+    assert await cache.get("key") == {"choices": [1, 2, 3]}
+    await cache.clear(namespace="a:")
+    assert await cache.get("key") is None
+    assert await cache.get("other", namespace="b:") == "kept"
+    await cache.close()
+
+
+@pytest.mark.asyncio
+async def test_increment_and_expire(cache_path):
+    """Counters can be incremented and TTLs changed after the fact."""
+    cache = SQLiteCache(path=str(cache_path))
+    assert await cache.increment("hits") == 1
+    assert await cache.increment("hits", 2) == 3
+    assert await cache.expire("hits", 60)
+    assert not await cache.expire("missing", 60)
+    await cache.close()
+
+
+@pytest.mark.asyncio
+async def test_works_with_cached_decorator(cache_path):
+    """The backend plugs into aiocache's @cached decorator."""
+    calls = 0
+
+    @cached(cache=SQLiteCache, path=str(cache_path), ttl=60)
+    async def compute(x):
+        nonlocal calls
+        calls += 1
+        return {"value": x * 2}
+
+    assert await compute(2) == {"value": 4}
+    assert await compute(2) == {"value": 4}
+    assert calls == 1
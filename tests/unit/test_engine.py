@@ -0,0 +1,189 @@
+"""
+Unit tests for the studyguide.engine module.
+"""
+
+import asyncio
+
+import pytest
+
+from studyguide import chapter_cache
+from studyguide.chapter_cache import ChapterCache
+from studyguide.config import get_settings
+from studyguide.engine import (
+    CHAPTER_FOCUS,
+    Engine,
+    EngineError,
+    StudyGuide,
+    build_chapter_prompt,
+)
+from studyguide.parser import Chapter, QuizItem, Section
+from tests.unit.test_parser import VALID_MARKDOWN_INPUT
+
+
+@pytest.fixture(autouse=True)
+def chapter_cache_dir(tmp_path_factory, monkeypatch):
+    """Keeps the default chapter cache's disk tier out of the working directory."""
+    directory = tmp_path_factory.mktemp("chapters")
+    monkeypatch.setattr(get_settings().app, "chapter_cache_dir", directory)
+    chapter_cache.get_default_cache.cache_clear()
+    yield directory
+    chapter_cache.get_default_cache.cache_clear()
+
+
+def make_response(content: str) -> dict:
+    """Wraps content in a minimal chat completions response."""
+    return {"id": "resp", "choices": [{"message": {"content": content}}]}
+
+
+def chapter_markdown(index: int) -> str:
+    """Returns valid chapter Markdown with a title identifying the chapter."""
+    return VALID_MARKDOWN_INPUT.replace(
+        "Introduction to Asyncio", f"Chapter {index + 1}"
+    )
+
+
+def chapter_index(prompt: str) -> int:
+    """Recovers the zero-based chapter index from a chapter prompt."""
+    return int(prompt.split("Write chapter ")[1].split(" ")[0]) - 1
+
+
+@pytest.mark.asyncio
+async def test_generate_guide_returns_chapters_in_order():
+    """Chapters are returned in reading order regardless of completion order."""
+
+    async def fake_ask(model, prompt, system_prompt=None):
+        index = chapter_index(prompt)
+        # Later chapters finish first
+        await asyncio.sleep(0.01 * (len(CHAPTER_FOCUS) - index))
+        return make_response(chapter_markdown(index))
+
+    guide = await Engine(ask=fake_ask).generate_guide("Asyncio")
+
+    assert isinstance(guide, StudyGuide)
+    assert guide.topic == "Asyncio"
+    assert [c.title for c in guide.chapters] == [
+        f"Chapter {i + 1}" for i in range(len(CHAPTER_FOCUS))
+    ]
+
+
+@pytest.mark.asyncio
+async def test_concurrency_is_bounded():
+    """No more than max_concurrency requests are in flight at once."""
+    in_flight = 0
+    peak = 0
+
+    async def fake_ask(model, prompt, system_prompt=None):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return make_response(chapter_markdown(chapter_index(prompt)))
+
+    engine = Engine(max_concurrency=2, ask=fake_ask)
+    await engine.generate_guide("Asyncio")
+
+    assert peak == 2
+
+
+@pytest.mark.asyncio
+async def test_iter_chapters_yields_in_completion_order():
+    """Each chapter is parsed and yielded as soon as its response arrives."""
+
+    async def fake_ask(model, prompt, system_prompt=None):
+        index = chapter_index(prompt)
+        await asyncio.sleep(0.01 * (len(CHAPTER_FOCUS) - index))
+        return make_response(chapter_markdown(index))
+
+    engine = Engine(ask=fake_ask)
+    order = [index async for index, _ in engine.iter_chapters("Asyncio")]
+
+    assert order == list(reversed(range(len(CHAPTER_FOCUS))))
+
+
+@pytest.mark.asyncio
+async def test_chapter_failure_raises_engine_error():
+    """A failing chapter surfaces as an EngineError naming the chapter."""
+
+    async def fake_ask(model, prompt, system_prompt=None):
+        if chapter_index(prompt) == 2:
+            return make_response("This is just random text.")
+        return make_response(chapter_markdown(chapter_index(prompt)))
+
+    with pytest.raises(EngineError, match="Chapter 3 of 'Asyncio' failed"):
+        await Engine(ask=fake_ask).generate_guide("Asyncio")
+
+
+@pytest.mark.asyncio
+async def test_malformed_response_raises_engine_error():
+    """A response without a message is reported as an EngineError."""
+
+    async def fake_ask(model, prompt, system_prompt=None):
+        return {"choices": []}
+
+    with pytest.raises(EngineError, match="Malformed completion response"):
+        await Engine(ask=fake_ask).generate_chapter("Asyncio", 0)
+
+
+def test_build_chapter_prompt():
+    """Prompts name the topic, the chapter number and its focus."""
+    prompt = build_chapter_prompt("Rust ownership", 0)
+    assert "chapter 1 of 5" in prompt
+    assert "'Rust ownership'" in prompt
+    assert CHAPTER_FOCUS[0] in prompt
+
+
+@pytest.mark.asyncio
+async def test_stream_chapter_yields_parts_then_chapter():
+    """Sections and quiz items stream out before the final Chapter."""
+
+    async def fake_stream(model, prompt, system_prompt=None):
+        text = chapter_markdown(chapter_index(prompt))
+        for start in range(0, len(text), 16):
+            yield text[start:start + 16]
+
+    engine = Engine(stream=fake_stream)
+    parts = [part async for part in engine.stream_chapter("Asyncio", 0)]
+
+    assert [type(p) for p in parts] == [Section, Section, QuizItem, QuizItem, Chapter]
+    assert parts[-1].title == "Chapter 1"
+
+
+@pytest.mark.asyncio
+async def test_slow_stream_consumer_frees_its_engine_slot():
+    """The engine-wide slot is released once the stream ends, not when it is consumed."""
+
+    async def fake_stream(model, prompt, system_prompt=None):
+        yield chapter_markdown(chapter_index(prompt))
+
+    engine = Engine(max_concurrency=1, stream=fake_stream)
+    parts = engine.stream_chapter("Asyncio", 0)
+
+    assert isinstance(await parts.__anext__(), Section)
+    async with asyncio.timeout(1):
+        await engine._semaphore.acquire()  # Would wait forever if still held
+    engine._semaphore.release()
+    await parts.aclose()
+
+
+@pytest.mark.asyncio
+async def test_repeated_responses_are_parsed_once(monkeypatch):
+    """Chapters are parsed through the engine's chapter cache."""
+    parsed = []
+    real_parse = chapter_cache.parse_chapter_response
+
+    def counting_parse(text):
+        parsed.append(text)
+        return real_parse(text)
+
+    monkeypatch.setattr(chapter_cache, "parse_chapter_response", counting_parse)
+
+    async def fake_ask(model, prompt, system_prompt=None):
+        return make_response(chapter_markdown(chapter_index(prompt)))
+
+    engine = Engine(ask=fake_ask, chapter_cache=ChapterCache(max_entries=16))
+    first = await engine.generate_guide("Asyncio")
+    second = await engine.generate_guide("Asyncio")
+
+    assert first == second
+    assert len(parsed) == len(CHAPTER_FOCUS)
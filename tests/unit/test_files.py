@@ -0,0 +1,59 @@
+"""
+Unit tests for the studyguide.files module.
+"""
+
+import re
+
+import pytest
+
+from studyguide.files import link_or_copy, prune_versions, replace_atomic, write_atomic
+
+
+def test_write_atomic_replaces_and_leaves_no_temporary_files(tmp_path):
+    """The target is replaced whole; nothing else is left in its directory."""
+    target = tmp_path / "manifest.json"
+    target.write_bytes(b"old")
+
+    write_atomic(target, b"new")
+
+    assert target.read_bytes() == b"new"
+    assert [p.name for p in tmp_path.iterdir()] == ["manifest.json"]
+
+
+def test_failed_fill_keeps_the_old_file(tmp_path):
+    """If creating the new file fails, the target is untouched and the temp file removed."""
+    target = tmp_path / "entry.bin"
+    target.write_bytes(b"old")
+
+    def fail(tmp):
+        tmp.write_bytes(b"partial")
+        raise OSError("disk full")
+
+    with pytest.raises(OSError):
+        replace_atomic(target, fail)
+
+    assert target.read_bytes() == b"old"
+    assert [p.name for p in tmp_path.iterdir()] == ["entry.bin"]
+
+
+def test_link_or_copy_links_when_possible(tmp_path):
+    """On one filesystem the target shares the source's inode."""
+    source = tmp_path / "source.svg"
+    source.write_bytes(b"<svg/>")
+
+    link_or_copy(source, tmp_path / "target.svg")
+
+    assert (tmp_path / "target.svg").stat().st_ino == source.stat().st_ino
+
+
+def test_prune_versions_removes_only_matching_directories(tmp_path):
+    """Other versions go; the current one, files and unrelated directories stay."""
+    for name in ("v1", "v2", "venv", "v2-backup"):
+        (tmp_path / name).mkdir()
+    (tmp_path / "v3").write_text("a file")
+
+    removed = prune_versions(tmp_path, "v2", re.compile(r"v\d+"))
+
+    assert removed == [tmp_path / "v1"]
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["v2", "v2-backup", "v3", "venv"]
+    assert prune_versions(tmp_path / "missing", "v2", re.compile(r"v\d+")) == []
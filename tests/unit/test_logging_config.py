@@ -3,28 +3,39 @@
 import io
 import json
 import logging
+import logging.handlers
+import queue
 from unittest.mock import patch
 
 import pytest
 import structlog
 
 # Import the function to test
-from studyguide.logging_config import configure_logging
+from studyguide import logging_config
+from studyguide.logging_config import (
+    EventSampler,
+    configure_logging,
+    is_enabled,
+    json_renderer,
+    parse_sample_rates,
+    shutdown_logging,
+)
 
 
-@pytestfixture(autouse=True)
+@pytest.fixture(autouse=True)
 def reset_logging():
     """Reset logging configuration before and after each test."""
     # Store original state
-    original_manager = logging.manager
+    original_manager = logging.Logger.manager
     original_root_handlers = logging.root.handlers[:]
     original_root_level = logging.root.level
     original_structlog_config = structlog.get_config()
 
     yield  # Run the test
 
+    shutdown_logging()
     # Restore original state
-    logging.manager = original_manager
+    logging.Logger.manager = original_manager
     logging.root.handlers = original_root_handlers
     logging.root.level = original_root_level
     structlog.configure(**original_structlog_config)
@@ -65,7 +76,7 @@ def test_configure_logging_handler_and_formatter():
     assert isinstance(handler.formatter, structlog.stdlib.ProcessorFormatter)
     # Check if the formatter uses JSONRenderer
     assert isinstance(
-        handler.formatter._processor, structlog.processors.JSONRenderer
+        handler.formatter.processors[-1], structlog.processors.JSONRenderer
     )
 
 
@@ -90,7 +101,7 @@ def test_logging_output_format(mock_stdout):
     assert log_entry["event"] == test_message
     assert log_entry["key"] == test_data["key"]
     assert log_entry["number"] == test_data["number"]
-    assert log_entry["log_level"] == "info"
+    assert log_entry["level"] == "info"
     assert log_entry["logger"] == "test_json_output"
     assert "timestamp" in log_entry
 
@@ -110,7 +121,129 @@ def test_logging_exception_info(mock_stdout):
     log_entry = json.loads(output)
 
     assert log_entry["event"] == "Caught an exception"
-    assert log_entry["log_level"] == "error"
+    assert log_entry["level"] == "error"
     assert "exception" in log_entry
     assert "Traceback" in log_entry["exception"]
     assert "ValueError: This is a test error" in log_entry["exception"]
+
+
+def test_json_renderer_output_is_valid_json():
+    """The (orjson-backed when installed) renderer emits standard JSON."""
+    rendered = json_renderer()(None, "info", {"event": "x", 1: "non-str key", "obj": object()})
+
+    entry = json.loads(rendered)
+    assert entry["event"] == "x"
+    assert entry["1"] == "non-str key"
+    assert entry["obj"].startswith("<object")
+
+
+@patch("sys.stdout", new_callable=io.StringIO)
+def test_queue_mode_writes_from_listener(mock_stdout):
+    """With use_queue the root handler only enqueues; the listener writes."""
+    configure_logging(log_level="INFO", use_queue=True)
+    root_logger = logging.getLogger()
+    assert isinstance(root_logger.handlers[0], logging.handlers.QueueHandler)
+
+    log = structlog.get_logger("test_queue")
+    for i in range(50):
+        log.info("Queued event", index=i)
+    shutdown_logging()
+
+    entries = [json.loads(line) for line in mock_stdout.getvalue().splitlines()]
+    assert [entry["index"] for entry in entries] == list(range(50))
+    assert entries[0]["logger"] == "test_queue"
+
+
+def test_drop_policy_drops_only_below_warning():
+    """A full queue drops info records, then reports the count with the next record."""
+    log_queue = queue.Queue(maxsize=2)
+    handler = logging_config._EnqueueHandler(log_queue, "drop")
+
+    def record(level):
+        return logging.makeLogRecord({"levelno": level, "msg": "m"})
+
+    for _ in range(3):
+        handler.handle(record(logging.INFO))
+    assert handler.dropped == 1
+
+    drained = [log_queue.get_nowait() for _ in range(2)]
+    assert all(r.levelno == logging.INFO for r in drained)
+
+    handler.handle(record(logging.WARNING))
+    warning, notice = log_queue.get_nowait(), log_queue.get_nowait()
+    assert warning.levelno == logging.WARNING
+    assert notice.getMessage() == "Dropped 1 log records: log queue full"
+    assert handler.dropped == 0
+
+
+def test_unknown_overflow_policy_raises():
+    """Only known overflow policies are accepted."""
+    with pytest.raises(ValueError):
+        configure_logging(use_queue=True, overflow="spill")
+
+
+@patch("sys.stdout", new_callable=io.StringIO)
+def test_levels_are_filtered_before_processing(mock_stdout):
+    """Calls below the level are no-ops, and is_enabled reports it."""
+    configure_logging(log_level="INFO")
+    log = structlog.get_logger("test_filtering")
+
+    log.debug("Hidden", data=[1, 2, 3])
+
+    assert mock_stdout.getvalue() == ""
+    assert not is_enabled(log, logging.DEBUG)
+    assert is_enabled(log, logging.INFO)
+
+
+@patch("sys.stdout", new_callable=io.StringIO)
+def test_reconfigured_level_reaches_loggers_already_in_use(mock_stdout):
+    """Loggers cached on first use follow a later configure_logging level."""
+    configure_logging(log_level="INFO")
+    log = structlog.get_logger("test_reconfigure")
+    log.info("Cached")
+
+    configure_logging(log_level="DEBUG")
+    log.debug("Shown at DEBUG")
+    configure_logging(log_level="WARNING")
+    log.info("Hidden at WARNING")
+
+    events = [json.loads(line)["event"] for line in mock_stdout.getvalue().splitlines()]
+    assert events == ["Cached", "Shown at DEBUG"]
+    assert not is_enabled(log, logging.INFO)
+
+
+@patch("sys.stdout", new_callable=io.StringIO)
+def test_sampling_keeps_errors_and_unlisted_events(mock_stdout):
+    """A zero rate drops an event's info lines, never its errors or other events."""
+    configure_logging(log_level="INFO", sample_rates={"Noisy": 0.0})
+    log = structlog.get_logger("test_sampling")
+
+    for _ in range(10):
+        log.info("Noisy")
+    log.error("Noisy")
+    log.info("Quiet")
+
+    entries = [json.loads(line) for line in mock_stdout.getvalue().splitlines()]
+    assert [(e["event"], e["level"]) for e in entries] == [("Noisy", "error"), ("Quiet", "info")]
+
+
+def test_sampler_marks_kept_events(monkeypatch):
+    """Kept sampled events carry their rate; the '*' rate covers unlisted events."""
+    monkeypatch.setattr("random.random", lambda: 0.5)
+    sampler = EventSampler({"a": 0.75, "b": 0.25, "*": 0.1})
+
+    assert sampler(None, "info", {"event": "a"}) == {"event": "a", "sample_rate": 0.75}
+    for event in ("b", "other"):
+        with pytest.raises(structlog.DropEvent):
+            sampler(None, "info", {"event": event})
+    assert sampler(None, "warning", {"event": "b"}) == {"event": "b"}
+
+
+def test_sample_rate_parsing_and_validation():
+    """EVENT=RATE specs parse (event names may contain '='); bad input raises."""
+    assert parse_sample_rates(["x=y=0.5", "*=1"]) == {"x=y": 0.5, "*": 1.0}
+    for bad in (["noequals"], ["=0.5"], ["e=half"]):
+        with pytest.raises(ValueError):
+            parse_sample_rates(bad)
+    with pytest.raises(ValueError):
+        EventSampler({"e": 1.5})
@@ -0,0 +1,170 @@
+"""
+Unit tests for the studyguide.metrics module.
+"""
+
+import json
+import subprocess
+import sys
+from unittest.mock import AsyncMock, patch
+
+import httpx
+import pytest
+from pytest_httpx import HTTPXMock
+
+from studyguide import api_client, metrics
+from studyguide.chapter_cache import ChapterCache
+from studyguide.parser import ParseError, parse_chapter_response
+from tests.unit.test_parser import VALID_MARKDOWN_INPUT
+
+URL = "https://api.perplexity.ai/chat/completions"
+RESPONSE = {
+    "id": "metrics-response",
+    "usage": {"prompt_tokens": 20, "completion_tokens": 50, "total_tokens": 70},
+    "choices": [{"message": {"role": "assistant", "content": "Hi"}}],
+}
+
+
+@pytest.fixture(autouse=True)
+def registry():
+    """Metrics are enabled once per process; tests compare before and after."""
+    return metrics.enable()
+
+
+@pytest.fixture
+async def api(monkeypatch):
+    """A clean API cache, rate limiter and ledger for each test."""
+    cache = getattr(api_client.ask_perplexity, "cache", None)
+    if cache is not None:
+        await cache.clear()
+    api_client.get_rate_limiter.cache_clear()
+    ledger = api_client.CostLedger(budget_usd=1.0)
+    monkeypatch.setattr(api_client, "get_ledger", lambda: ledger)
+    yield
+    await api_client.close_client()
+
+
+def value(registry, name, **labels):
+    return registry.get_sample_value(name, labels) or 0.0
+
+
+def test_metrics_are_inert_until_enabled():
+    """Before enable(), instrumented code runs without prometheus_client."""
+    output = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            "import json, sys\n"
+            "from studyguide import api_client, metrics\n"
+            "from studyguide.parser import parse_chapter_response\n"
+            "from tests.unit.test_parser import VALID_MARKDOWN_INPUT\n"
+            "parse_chapter_response(VALID_MARKDOWN_INPUT)\n"
+            "with metrics.track_request('m') as request:\n"
+            "    request.status = 200\n"
+            "metrics.record_usage('m', {'prompt_tokens': 1}, 0.1)\n"
+            "print(json.dumps('prometheus_client' in sys.modules))",
+        ],
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+
+    assert json.loads(output.splitlines()[-1]) is False
+
+
+@pytest.mark.asyncio
+async def test_api_call_is_measured(registry, api, httpx_mock: HTTPXMock):
+    """A call records latency, status, tokens, cost and a cache miss; a repeat is a hit."""
+    model = "sonar-small-chat"
+    httpx_mock.add_response(url=URL, method="POST", json=RESPONSE)
+    before = {
+        "count": value(registry, "studyguide_api_request_duration_seconds_count", model=model, mode="complete"),
+        "ok": value(registry, "studyguide_api_responses_total", model=model, mode="complete", status="200"),
+        "completion": value(registry, "studyguide_api_tokens_total", model=model, type="completion"),
+        "cost": value(registry, "studyguide_api_cost_usd_total", model=model),
+        "lookups": value(registry, "studyguide_cache_lookups_total", cache="perplexity_api"),
+        "misses": value(registry, "studyguide_cache_misses_total", cache="perplexity_api"),
+    }
+
+    await api_client.ask_perplexity(model, "Measure me")
+    await api_client.ask_perplexity(model, "Measure me")
+
+    assert value(registry, "studyguide_api_request_duration_seconds_count", model=model, mode="complete") == before["count"] + 1
+    assert value(registry, "studyguide_api_responses_total", model=model, mode="complete", status="200") == before["ok"] + 1
+    assert value(registry, "studyguide_api_tokens_total", model=model, type="completion") == before["completion"] + 50
+    assert value(registry, "studyguide_api_cost_usd_total", model=model) > before["cost"]
+    assert value(registry, "studyguide_cache_lookups_total", cache="perplexity_api") == before["lookups"] + 2
+    assert value(registry, "studyguide_cache_misses_total", cache="perplexity_api") == before["misses"] + 1
+    assert value(registry, "studyguide_api_requests_in_flight") == 0
+
+
+@pytest.mark.asyncio
+async def test_retries_and_failed_attempts_are_counted(registry, api, httpx_mock: HTTPXMock):
+    """Each failed attempt is recorded by status or exception type, and each retry counted."""
+    model = "sonar-retry-chat"
+    httpx_mock.add_response(url=URL, method="POST", status_code=503, json={"error": "busy"})
+    httpx_mock.add_exception(httpx.ReadTimeout("timed out"))
+    httpx_mock.add_response(url=URL, method="POST", json=RESPONSE)
+    retries = value(registry, "studyguide_api_retries_total", model=model)
+
+    with patch("asyncio.sleep", new_callable=AsyncMock):
+        await api_client.ask_perplexity(model, "Retry me")
+
+    assert value(registry, "studyguide_api_retries_total", model=model) == retries + 2
+    for status in ("503", "ReadTimeout", "200"):
+        assert value(registry, "studyguide_api_responses_total", model=model, mode="complete", status=status) == 1
+
+
+@pytest.mark.asyncio
+async def test_stream_is_measured(registry, api, httpx_mock: HTTPXMock):
+    """A stream records its status and duration under mode="stream", and its tokens."""
+    model = "sonar-stream-chat"
+    body = "".join(
+        f"data: {json.dumps(event)}\n\n"
+        for event in (
+            {"choices": [{"delta": {"content": "Hi"}}]},
+            {"choices": [], "usage": {"prompt_tokens": 3, "completion_tokens": 4}},
+        )
+    )
+    httpx_mock.add_response(url=URL, method="POST", content=(body + "data: [DONE]\n\n").encode())
+
+    assert [d async for d in api_client.stream_perplexity(model, "Stream me")] == ["Hi"]
+
+    assert value(registry, "studyguide_api_responses_total", model=model, mode="stream", status="200") == 1
+    assert value(registry, "studyguide_api_request_duration_seconds_count", model=model, mode="stream") == 1
+    assert value(registry, "studyguide_api_tokens_total", model=model, type="prompt") == 3
+
+
+def test_stage_durations_include_failures(registry):
+    """Every parse is timed, whether or not it succeeds."""
+    count = value(registry, "studyguide_stage_duration_seconds_count", stage="parse")
+
+    parse_chapter_response(VALID_MARKDOWN_INPUT)
+    with pytest.raises(ParseError):
+        parse_chapter_response("not a chapter")
+
+    assert value(registry, "studyguide_stage_duration_seconds_count", stage="parse") == count + 2
+    assert value(registry, "studyguide_stage_duration_seconds_sum", stage="parse") > 0
+
+
+def test_chapter_cache_lookups_are_counted(registry):
+    """The parsed chapter cache counts its lookups and misses."""
+    lookups = value(registry, "studyguide_cache_lookups_total", cache="chapters")
+    misses = value(registry, "studyguide_cache_misses_total", cache="chapters")
+    cache = ChapterCache(max_entries=4)
+
+    cache.parse(VALID_MARKDOWN_INPUT)
+    cache.parse(VALID_MARKDOWN_INPUT)
+
+    assert value(registry, "studyguide_cache_lookups_total", cache="chapters") == lookups + 2
+    assert value(registry, "studyguide_cache_misses_total", cache="chapters") == misses + 1
+
+
+def test_write_textfile(registry, tmp_path):
+    """The textfile export holds every metric in the exposition format."""
+    path = tmp_path / "studyguide.prom"
+
+    metrics.write_textfile(path)
+
+    text = path.read_text()
+    assert "# TYPE studyguide_api_request_duration_seconds histogram" in text
+    assert "studyguide_api_requests_in_flight 0.0" in text
@@ -0,0 +1,40 @@
+"""
+Unit tests for the studyguide.minifier module.
+"""
+
+from studyguide.minifier import encode_page, minify_page
+
+PAGE = """<!DOCTYPE html>
+<html>
+  <head><style> body { color : red ; } </style></head>
+  <body>
+    <p>  Hello   <b>world</b>  </p>
+  </body>
+</html>
+"""
+
+
+def test_minify_page_shrinks_and_keeps_content():
+    """Whitespace and CSS are minified; text survives."""
+    minified = minify_page(PAGE)
+    assert len(minified) < len(PAGE)
+    assert "body{color:red}" in minified
+    assert "Hello <b>world</b>" in minified
+
+
+def test_encode_page_reports_sizes():
+    """encode_page returns the rendered byte count and the minified bytes."""
+    rendered, data, seconds = encode_page(PAGE)
+
+    assert rendered == len(PAGE.encode())
+    assert len(data) < rendered
+    assert data.decode() == minify_page(PAGE)
+    assert seconds >= 0
+
+
+def test_encode_page_without_minify():
+    """With minify off the page is encoded verbatim."""
+    rendered, data, seconds = encode_page(PAGE, minify=False)
+
+    assert data == PAGE.encode()
+    assert rendered == len(data) and seconds == 0.0
@@ -2,15 +2,21 @@
 Unit tests for the studyguide.parser module.
 """
 
+import logging
+
 import pytest
 from pydantic import ValidationError
 
+from studyguide import parser
 from studyguide.parser import (
     Chapter,
+    ChapterStreamParser,
     ParseError,
     QuizItem,
     Section,
+    load_chapter,
     parse_chapter_response,
+    parse_many,
 )
 
 # --- Sample Test Data ---
@@ -305,6 +311,28 @@ def test_parse_chapter_response_valid():
     assert chapter.quiz[1].correct_answer == "`asyncio.run()`"
 
 
+def test_parse_chapter_response_skips_debug_logging_when_disabled(monkeypatch):
+    """With DEBUG off, parsing never calls (or builds fields for) logger.debug."""
+
+    class InfoLogger:
+        def is_enabled_for(self, level):
+            return level >= logging.INFO
+
+        def debug(self, *args, **kwargs):
+            raise AssertionError("debug logged while disabled")
+
+        def info(self, *args, **kwargs):
+            pass
+
+        warning = error = info
+
+    monkeypatch.setattr(parser, "logger", InfoLogger())
+
+    chapter = parse_chapter_response(VALID_MARKDOWN_INPUT)
+
+    assert chapter.title == "Introduction to Asyncio"
+
+
 def test_parse_chapter_response_valid_no_keywords():
     """Test parsing valid input without the optional keywords section."""
     chapter = parse_chapter_response(VALID_MARKDOWN_NO_KEYWORDS)
@@ -387,3 +415,130 @@ def test_parse_chapter_response_gibberish_input():
     """Test ParseError with input that doesn't match structure."""
     with pytest.raises(ParseError):
         parse_chapter_response("This is just random text.")
+
+
+def test_parse_chapter_response_delimiter_mid_line():
+    """A '---' anywhere in a line ends the introduction, as before."""
+    text = VALID_MARKDOWN_INPUT.replace(
+        "network code.\n---", "network code. --- trailing"
+    )
+    chapter = parse_chapter_response(text)
+    assert chapter.introduction.endswith("high-level structured network code.")
+
+
+def test_parse_chapter_response_adjacent_markers():
+    """Markers sharing their asterisks are all recognised."""
+    text = VALID_MARKDOWN_INPUT.replace(
+        "**Introduction:**", "**Note:****Introduction:**"
+    )
+    assert parse_chapter_response(text) == parse_chapter_response(VALID_MARKDOWN_INPUT)
+
+
+def test_parse_chapter_response_unanswered_questions_fail_fast():
+    """Thousands of unanswered questions are rejected without backtracking."""
+    head = VALID_MARKDOWN_INPUT.split("**Quiz:**")[0]
+    item = "{n}. **Question:** Unanswered {n}?\n    * A\n    * B\n"
+    text = head + "**Quiz:**\n" + "".join(item.format(n=n) for n in range(5000))
+
+    with pytest.raises(ParseError, match="Could not find any quiz items"):
+        parse_chapter_response(text)
+
+
+# --- Test load_chapter ---
+
+def test_load_chapter_round_trips_model_dump():
+    """Validated and trusted loading both rebuild an equal Chapter."""
+    chapter = parse_chapter_response(VALID_MARKDOWN_INPUT)
+    data = chapter.model_dump()
+
+    assert load_chapter(data) == chapter
+    assert load_chapter(data, trusted=True) == chapter
+    assert isinstance(load_chapter(data, trusted=True).quiz[0], QuizItem)
+
+
+def test_quiz_item_checks_answer_only_against_valid_options():
+    """Too few options is the only error; the answer is not checked against them."""
+    with pytest.raises(ValidationError) as excinfo:
+        QuizItem(question="Q?", options=["A"], correct_answer="B")
+
+    assert [error["loc"] for error in excinfo.value.errors()] == [("options",)]
+
+
+def test_load_chapter_validates_untrusted_data():
+    """Untrusted data gets the full checks; trusted data skips them."""
+    data = parse_chapter_response(VALID_MARKDOWN_INPUT).model_dump()
+    data["quiz"][0]["correct_answer"] = "Not an option"
+
+    with pytest.raises(ValidationError, match="Correct answer must be one of"):
+        load_chapter(data)
+    assert load_chapter(data, trusted=True).quiz[0].correct_answer == "Not an option"
+
+
+# --- Test parse_many ---
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_parse_many_keeps_order_and_collects_errors(workers):
+    """Results come back in input order with failures in place."""
+    raw_texts = [
+        VALID_MARKDOWN_INPUT,
+        "This is just random text.",
+        VALID_MARKDOWN_NO_KEYWORDS,
+        MISSING_QUIZ_MARKDOWN,
+    ]
+
+    results = parse_many(raw_texts, workers=workers, chunksize=1)
+
+    assert results[0] == parse_chapter_response(VALID_MARKDOWN_INPUT)
+    assert isinstance(results[1], ParseError)
+    assert results[2].title == "Basic Git Commands"
+    assert isinstance(results[3], ParseError)
+    assert "Could not find quiz section" in str(results[3])
+
+
+def test_parse_many_empty():
+    """An empty batch parses to an empty list."""
+    assert parse_many([], workers=4) == []
+
+
+# --- Test ChapterStreamParser ---
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 64, 10_000])
+def test_stream_parser_emits_parts_as_they_complete(chunk_size):
+    """Streamed sections and quiz items match the final parsed chapter."""
+    stream_parser = ChapterStreamParser()
+    emitted = []
+    for start in range(0, len(VALID_MARKDOWN_INPUT), chunk_size):
+        emitted.extend(stream_parser.feed(VALID_MARKDOWN_INPUT[start:start + chunk_size]))
+    chapter = stream_parser.close()
+
+    assert chapter == parse_chapter_response(VALID_MARKDOWN_INPUT)
+    assert [p for p in emitted if isinstance(p, Section)] == chapter.sections
+    assert [p for p in emitted if isinstance(p, QuizItem)] == chapter.quiz
+
+
+def test_stream_parser_emits_section_before_stream_ends():
+    """A section is available as soon as its delimiter has been streamed."""
+    stream_parser = ChapterStreamParser()
+    head, _, _ = VALID_MARKDOWN_INPUT.partition("## Section 2")
+
+    emitted = stream_parser.feed(head)
+
+    assert emitted == [
+        Section(
+            heading="Core Concepts",
+            content=(
+                "Asyncio uses an event loop to manage tasks. `async def` defines a coroutine.\n"
+                "`await` pauses the coroutine until the awaited task completes."
+            ),
+        )
+    ]
+
+
+def test_stream_parser_skips_invalid_quiz_items():
+    """Quiz items failing validation are not emitted; close() still raises."""
+    stream_parser = ChapterStreamParser()
+    emitted = stream_parser.feed(MALFORMED_QUIZ_ITEM_MARKDOWN)
+
+    assert not [p for p in emitted if isinstance(p, QuizItem)]
+    with pytest.raises(ParseError):
+        stream_parser.close()
@@ -0,0 +1,138 @@
+"""
+Unit tests for the studyguide.rate_limiter module.
+"""
+
+import asyncio
+import time
+
+import pytest
+
+from studyguide.rate_limiter import RateLimiter, TokenBucket, parse_duration
+
+
+@pytest.mark.parametrize(
+    "value, expected",
+    [
+        ("2", 2.0),
+        ("0.5", 0.5),
+        ("1m30s", 90.0),
+        ("250ms", 0.25),
+        ("1h", 3600.0),
+        ("", None),
+        (None, None),
+        ("soon", None),
+    ],
+)
+def test_parse_duration(value, expected):
+    """Seconds, Go-style durations and junk are handled."""
+    assert parse_duration(value) == expected
+
+
+def test_parse_duration_http_date():
+    """Retry-After may be an HTTP date in the future."""
+    future = time.strftime(
+        "%a, %d %b %Y %H:%M:%S GMT", time.gmtime(time.time() + 30)
+    )
+    assert 25 <= parse_duration(future) <= 31
+
+
+@pytest.mark.asyncio
+async def test_token_bucket_paces_after_burst():
+    """Requests beyond the burst wait for the bucket to refill."""
+    bucket = TokenBucket(rate=50.0, capacity=2)
+    started = time.monotonic()
+    for _ in range(4):
+        await bucket.acquire()
+    # Two immediate, then two more at 50/s => at least ~40ms
+    assert time.monotonic() - started >= 0.035
+
+
+def test_token_bucket_adjust_charges_actual_usage():
+    """Under-estimated requests take the difference from the bucket."""
+    bucket = TokenBucket(rate=1.0, capacity=1000)
+    bucket.tokens = 500
+    bucket.adjust(300)
+    assert bucket.tokens == pytest.approx(200, abs=1)
+    bucket.adjust(-2000)
+    assert bucket.tokens == 1000
+
+
+@pytest.mark.asyncio
+async def test_concurrency_limit_is_enforced():
+    """No more than the current limit of requests run at once."""
+    limiter = RateLimiter(requests_per_second=1000, burst=100, max_concurrency=2)
+    in_flight = 0
+    peak = 0
+
+    async def call():
+        nonlocal in_flight, peak
+        async with limiter.limit_request() as permit:
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            permit.observe(200, {})
+
+    await asyncio.gather(*(call() for _ in range(6)))
+    assert peak == 2
+    assert limiter.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_429_halves_concurrency_and_honours_retry_after():
+    """A 429 halves the limit and pauses new requests for Retry-After."""
+    limiter = RateLimiter(requests_per_second=1000, burst=100, max_concurrency=8)
+
+    async with limiter.limit_request() as permit:
+        permit.observe(429, {"retry-after": "0.05"})
+
+    assert limiter.limit == 4
+    started = time.monotonic()
+    async with limiter.limit_request() as permit:
+        permit.observe(200, {})
+    assert time.monotonic() - started >= 0.04
+
+
+@pytest.mark.asyncio
+async def test_exhausted_ratelimit_headers_pause_requests():
+    """x-ratelimit-remaining of zero pauses until the advertised reset."""
+    limiter = RateLimiter(requests_per_second=1000, burst=100)
+
+    async with limiter.limit_request() as permit:
+        permit.observe(
+            200,
+            {"x-ratelimit-remaining-requests": "0", "x-ratelimit-reset-requests": "50ms"},
+        )
+
+    started = time.monotonic()
+    async with limiter.limit_request() as permit:
+        permit.observe(200, {})
+    assert time.monotonic() - started >= 0.04
+
+
+@pytest.mark.asyncio
+async def test_successes_increase_concurrency_additively():
+    """After backing off, successful calls grow the limit back towards the max."""
+    limiter = RateLimiter(requests_per_second=1000, burst=100, max_concurrency=4)
+    limiter.concurrency = 1.0
+
+    for _ in range(10):
+        async with limiter.limit_request() as permit:
+            permit.observe(200, {})
+
+    assert limiter.limit == 4
+
+
+@pytest.mark.asyncio
+async def test_slow_responses_reduce_concurrency():
+    """Latency far above the best observed latency triggers a back-off."""
+    limiter = RateLimiter(
+        requests_per_second=1000, burst=100, max_concurrency=8, latency_tolerance=2.0
+    )
+    limiter._latency = limiter._best_latency = 0.001
+
+    async with limiter.limit_request() as permit:
+        await asyncio.sleep(0.05)
+        permit.observe(200, {})
+
+    assert limiter.limit == 4
@@ -0,0 +1,372 @@
+"""
+Unit tests for the studyguide.renderer module.
+"""
+
+import shutil
+from pathlib import Path
+
+import pytest
+
+from studyguide import renderer as renderer_module
+from studyguide import writer as writer_module
+from studyguide.assets import STATIC_DIR, fingerprint_assets
+from studyguide.config import get_settings
+from studyguide.engine import StudyGuide
+from studyguide.parser import parse_chapter_response
+from studyguide.renderer import (
+    MANIFEST_NAME,
+    RenderError,
+    Renderer,
+    SiteBuild,
+    chapter_filename,
+    get_environment,
+)
+from tests.unit.test_engine import chapter_markdown
+
+TEMPLATE_DIR = Path(__file__).resolve().parents[2] / "templates"
+ASSET_DIR = Path(__file__).resolve().parents[2] / "assets"
+
+
+@pytest.fixture(autouse=True)
+def asset_store(tmp_path, monkeypatch) -> Path:
+    store = tmp_path / "asset-store"
+    monkeypatch.setattr(get_settings().app, "asset_store_dir", store)
+    return store
+
+
+@pytest.fixture
+def guide() -> StudyGuide:
+    return StudyGuide(
+        topic="Asyncio",
+        chapters=[parse_chapter_response(chapter_markdown(i)) for i in range(3)],
+    )
+
+
+@pytest.fixture
+def renderer(tmp_path, monkeypatch) -> Renderer:
+    monkeypatch.setattr(
+        get_settings().app, "template_cache_dir", tmp_path / "bytecode"
+    )
+    return Renderer(TEMPLATE_DIR, asset_dir=ASSET_DIR)
+
+
+def test_render_guide_pages(renderer, guide):
+    """A guide renders to an index page plus one page per chapter."""
+    pages = renderer.render_guide(guide)
+
+    assert list(pages) == ["index.html", "chapter-1.html", "chapter-2.html", "chapter-3.html"]
+    assert 'href="chapter-2.html"' in pages["index.html"]
+    chapter = pages["chapter-2.html"]
+    assert "<h1>Chapter 2</h1>" in chapter
+    assert "Chapter 2 of 3" in chapter
+    assert guide.chapters[1].quiz[0].question in chapter
+    assert f'href="{renderer.asset_urls["tailwind.css"]}"' in chapter
+    assert renderer.asset_urls["tailwind.css"].startswith("../_static/tailwind.")
+    # Previous/next navigation
+    assert 'href="chapter-1.html"' in chapter and 'href="chapter-3.html"' in chapter
+
+
+def test_markdown_is_rendered_and_html_escaped(renderer, guide):
+    """Section content is Markdown; raw HTML from the model is escaped."""
+    chapter = guide.chapters[0]
+    section = chapter.sections[0].model_copy(
+        update={"content": "Some **bold** text <script>alert(1)</script>"}
+    )
+    guide.chapters[0] = chapter.model_copy(update={"sections": [section]})
+
+    html = renderer.render_chapter(guide, 0)
+
+    assert "<strong>bold</strong>" in html
+    assert "<script>" not in html
+    assert "&lt;script&gt;" in html
+
+
+def test_environment_is_shared_and_templates_load_once(renderer, tmp_path, monkeypatch):
+    """Renderers share one environment; templates are not reloaded per page."""
+    other = Renderer(TEMPLATE_DIR, asset_dir=ASSET_DIR)
+    loads = []
+    loader = renderer.env.loader
+    real_get_source = loader.get_source
+
+    def counting_get_source(environment, template):
+        loads.append(template)
+        return real_get_source(environment, template)
+
+    monkeypatch.setattr(loader, "get_source", counting_get_source)
+    for _ in range(3):
+        other.render_chapter(
+            StudyGuide(topic="T", chapters=[parse_chapter_response(chapter_markdown(0))]),
+            0,
+        )
+
+    assert other.env is renderer.env
+    assert loads == []
+
+
+def test_bytecode_cache_is_persisted(tmp_path):
+    """Compiled templates are written to the bytecode cache directory."""
+    cache_dir = tmp_path / "bytecode"
+    env = get_environment(TEMPLATE_DIR, cache_dir)
+    env.get_template("chapter.html")
+
+    assert list(cache_dir.iterdir())
+
+
+def test_write_guide_and_publish_assets(renderer, guide, tmp_path):
+    """Pages are written under the guide directory, assets one level up."""
+    site = tmp_path / "site"
+    paths = renderer.write_guide(guide, site / guide.slug)
+    published = renderer.publish_assets(site)
+
+    assert [p.name for p in paths] == ["index.html"] + [
+        chapter_filename(i) for i in range(3)
+    ]
+    # Pages are minified by default
+    assert all(p.read_text(encoding="utf-8").startswith("<!doctype html>") for p in paths)
+    tailwind = renderer.assets["tailwind.css"]
+    assert published == [site / STATIC_DIR / tailwind.filename]
+    # Resolving the page's link from its directory finds the asset
+    assert (paths[0].parent / renderer.asset_urls["tailwind.css"]).is_file()
+    # Build inputs are not published
+    assert "input.css" not in renderer.assets
+
+
+def test_missing_templates_raise_render_error(tmp_path):
+    """A template directory without the templates is reported clearly."""
+    with pytest.raises(RenderError, match="Cannot load templates"):
+        Renderer(tmp_path, bytecode_cache=False)
+
+
+# --- Incremental site builds ---
+
+
+def make_guide(topic: str, chapters: int = 3) -> StudyGuide:
+    return StudyGuide(
+        topic=topic,
+        chapters=[parse_chapter_response(chapter_markdown(i)) for i in range(chapters)],
+    )
+
+
+def build_site(renderer, site, guides, keep=(), prune=True) -> SiteBuild:
+    build = SiteBuild(renderer, site)
+    build.publish_assets()
+    for guide in guides:
+        build.write_guide(guide)
+    for slug in keep:
+        build.keep_guide(slug)
+    build.finish(prune=prune)
+    return build
+
+
+def test_unchanged_rebuild_writes_nothing(renderer, tmp_path):
+    """A rebuild with identical inputs skips every page and asset."""
+    site = tmp_path / "site"
+    first = build_site(renderer, site, [make_guide("Asyncio")])
+    mtimes = {p: p.stat().st_mtime_ns for p in site.rglob("*.html")}
+
+    second = build_site(renderer, site, [make_guide("Asyncio")])
+
+    assert first.written == 5  # 4 pages + 1 asset
+    assert (second.written, second.skipped, second.deleted) == (0, 4, 0)
+    assert {p: p.stat().st_mtime_ns for p in site.rglob("*.html")} == mtimes
+    assert (site / MANIFEST_NAME).is_file()
+
+
+def test_changed_chapter_rewrites_only_its_page(renderer, tmp_path):
+    """Editing one chapter's body rebuilds that chapter's page only."""
+    site = tmp_path / "site"
+    guide = make_guide("Asyncio")
+    build_site(renderer, site, [guide])
+
+    chapter = guide.chapters[1]
+    guide.chapters[1] = chapter.model_copy(update={"summary": "A new summary."})
+    build = SiteBuild(renderer, site)
+    written = build.write_guide(guide)
+    build.finish()
+
+    assert written == [site / "asyncio" / "chapter-2.html"]
+    assert "A new summary." in written[0].read_text(encoding="utf-8")
+
+
+def test_new_topic_writes_only_its_pages(renderer, tmp_path):
+    """Adding a guide to an existing site leaves the other guides alone."""
+    site = tmp_path / "site"
+    build_site(renderer, site, [make_guide("Asyncio"), make_guide("Rust")])
+
+    build = build_site(
+        renderer, site, [make_guide("Asyncio"), make_guide("Rust"), make_guide("Go")]
+    )
+
+    assert (build.written, build.skipped) == (4, 8)
+    assert (site / "go" / "index.html").is_file()
+
+
+def test_template_change_rebuilds_dependent_pages(tmp_path, monkeypatch):
+    """Editing chapter.html rebuilds chapter pages but not index pages."""
+    monkeypatch.setattr(
+        get_settings().app, "template_cache_dir", tmp_path / "bytecode"
+    )
+    templates = tmp_path / "templates"
+    shutil.copytree(TEMPLATE_DIR, templates)
+    site = tmp_path / "site"
+    build_site(Renderer(templates, asset_dir=ASSET_DIR), site, [make_guide("Asyncio")])
+
+    chapter_template = templates / "chapter.html"
+    chapter_template.write_text(
+        chapter_template.read_text(encoding="utf-8").replace("Show answer", "Reveal")
+    )
+    renderer_module.get_environment.cache_clear()
+    build = SiteBuild(Renderer(templates, asset_dir=ASSET_DIR), site)
+    written = build.write_guide(make_guide("Asyncio"))
+    build.finish()
+
+    assert sorted(p.name for p in written) == [chapter_filename(i) for i in range(3)]
+    assert "Reveal" in written[0].read_text(encoding="utf-8")
+
+
+def test_asset_change_rebuilds_everything(tmp_path, monkeypatch):
+    """Pages link fingerprinted assets, so a changed asset rebuilds them."""
+    assets = tmp_path / "assets"
+    shutil.copytree(ASSET_DIR, assets)
+    site = tmp_path / "site"
+    build_site(
+        Renderer(TEMPLATE_DIR, bytecode_cache=False, asset_dir=assets),
+        site,
+        [make_guide("Asyncio")],
+    )
+
+    old = site / STATIC_DIR / fingerprint_assets(assets)["tailwind.css"].filename
+    (assets / "tailwind.css").write_text("body{}")
+    renderer = Renderer(TEMPLATE_DIR, bytecode_cache=False, asset_dir=assets)
+    build = build_site(renderer, site, [make_guide("Asyncio")])
+
+    assert build.written == 5
+    new = site / STATIC_DIR / renderer.assets["tailwind.css"].filename
+    assert new.read_text() == "body{}"
+    # The old fingerprinted file is pruned
+    assert not old.exists()
+
+
+def test_orphaned_guides_are_deleted(renderer, tmp_path):
+    """Pages of guides no longer built are removed, with their directory."""
+    site = tmp_path / "site"
+    build_site(renderer, site, [make_guide("Asyncio"), make_guide("Rust")])
+
+    build = build_site(renderer, site, [make_guide("Asyncio")])
+
+    assert build.deleted == 4
+    assert not (site / "rust").exists()
+    assert (site / "asyncio" / "index.html").is_file()
+
+
+def test_kept_and_interrupted_builds_preserve_pages(renderer, tmp_path):
+    """Failed guides (keep_guide) and unpruned builds keep earlier pages."""
+    site = tmp_path / "site"
+    build_site(renderer, site, [make_guide("Asyncio"), make_guide("Rust")])
+
+    build_site(renderer, site, [make_guide("Asyncio")], keep=["rust"])
+    assert (site / "rust" / "index.html").is_file()
+
+    build_site(renderer, site, [make_guide("Asyncio")], prune=False)
+    assert (site / "rust" / "index.html").is_file()
+    # Still tracked: a later complete build removes it
+    build_site(renderer, site, [make_guide("Asyncio")])
+    assert not (site / "rust").exists()
+
+
+def test_missing_file_or_manifest_forces_rebuild(renderer, tmp_path):
+    """Deleted pages are rewritten; an unreadable manifest rebuilds all pages."""
+    site = tmp_path / "site"
+    build_site(renderer, site, [make_guide("Asyncio")])
+
+    (site / "asyncio" / "chapter-1.html").unlink()
+    build = SiteBuild(renderer, site)
+    assert build.write_guide(make_guide("Asyncio")) == [site / "asyncio" / "chapter-1.html"]
+
+    (site / MANIFEST_NAME).write_text("{not json")
+    assert len(SiteBuild(renderer, site).write_guide(make_guide("Asyncio"))) == 4
+
+
+# --- Minification ---
+
+
+def test_minified_pages_match_rendered_content(renderer, tmp_path):
+    """Minified pages keep the content and are smaller than the rendered HTML."""
+    guide = make_guide("Asyncio")
+    build = build_site(renderer, tmp_path / "site", [guide])
+
+    page = (tmp_path / "site" / "asyncio" / "chapter-1.html").read_text(encoding="utf-8")
+    stats = build.minify_stats()
+    assert guide.chapters[0].quiz[0].question in page
+    assert "\n  " not in page
+    assert build.pages_written == 4
+    assert stats["bytes_saved"] > 0
+    assert stats["bytes_written"] == sum(
+        p.stat().st_size for p in (tmp_path / "site" / "asyncio").iterdir()
+    )
+
+
+def test_minify_disabled_writes_rendered_html(tmp_path):
+    """With minify off, pages are written exactly as rendered."""
+    renderer = Renderer(TEMPLATE_DIR, bytecode_cache=False, asset_dir=ASSET_DIR, minify=False)
+    guide = make_guide("Asyncio")
+    build_site(renderer, tmp_path / "site", [guide])
+
+    written = (tmp_path / "site" / "asyncio" / "index.html").read_text(encoding="utf-8")
+    assert written == renderer.render_index(guide)
+
+
+def test_process_pool_build(renderer, tmp_path):
+    """With several workers, pages are minified and written by the pool."""
+    site = tmp_path / "site"
+    build = SiteBuild(renderer, site, workers=2)
+    for topic in ("Asyncio", "Rust", "Go"):
+        build.write_guide(make_guide(topic))
+    build.finish()
+
+    assert build.written == build.pages_written == 12
+    inline = tmp_path / "inline"
+    build_site(renderer, inline, [make_guide("Asyncio")])
+    assert (site / "asyncio" / "chapter-2.html").read_bytes() == (
+        inline / "asyncio" / "chapter-2.html"
+    ).read_bytes()
+
+
+def test_failed_commit_keeps_previous_guide(renderer, tmp_path, monkeypatch):
+    """A guide whose commit fails stays at its previous version and is rebuilt next time."""
+    site = tmp_path / "site"
+    guide = make_guide("Asyncio")
+    build_site(renderer, site, [guide])
+    before = {p.name: p.read_bytes() for p in (site / "asyncio").iterdir()}
+
+    def failing_write(path, data, sync):
+        if path.name == "chapter-2.html":
+            raise OSError("disk full")
+        return real_write(path, data, sync)
+
+    real_write = writer_module._write_file
+    monkeypatch.setattr(writer_module, "_write_file", failing_write)
+    guide.chapters[0] = guide.chapters[0].model_copy(update={"title": "Renamed"})
+    build = build_site(renderer, site, [guide])
+
+    assert build.failed == 4 and build.written == 0
+    assert {p.name: p.read_bytes() for p in (site / "asyncio").iterdir()} == before
+    assert not (site / ".staging").exists()
+
+    monkeypatch.setattr(writer_module, "_write_file", real_write)
+    rebuild = build_site(renderer, site, [guide])
+    assert rebuild.written == 4
+    assert "Renamed" in (site / "asyncio" / "index.html").read_text(encoding="utf-8")
+
+
+def test_shrunk_guide_drops_its_old_pages(renderer, tmp_path):
+    """Chapters a guide no longer has disappear with the atomic swap."""
+    site = tmp_path / "site"
+    build_site(renderer, site, [make_guide("Asyncio", chapters=3)])
+
+    build = build_site(renderer, site, [make_guide("Asyncio", chapters=2)])
+
+    assert sorted(p.name for p in (site / "asyncio").iterdir()) == [
+        "chapter-1.html", "chapter-2.html", "index.html"
+    ]
+    assert build.deleted == 1
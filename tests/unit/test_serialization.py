@@ -0,0 +1,115 @@
+"""
+Unit tests for the studyguide.serialization module.
+"""
+
+import struct
+
+import pytest
+
+from studyguide.parser import Chapter, QuizItem, load_chapter, parse_chapter_response
+from studyguide.serialization import (
+    FORMAT_VERSION,
+    SerializationError,
+    decode_chapter,
+    decode_chapter_data,
+    encode_chapter,
+)
+from tests.unit.test_parser import VALID_MARKDOWN_INPUT
+
+
+@pytest.fixture
+def chapter() -> Chapter:
+    return parse_chapter_response(VALID_MARKDOWN_INPUT)
+
+
+def test_round_trip(chapter):
+    """A decoded chapter equals the encoded one."""
+    payload = encode_chapter(chapter)
+    assert isinstance(payload, bytes)
+    assert decode_chapter(payload) == chapter
+    assert decode_chapter_data(payload) == chapter.model_dump()
+
+
+def test_compressed_round_trip(chapter):
+    """Compressed payloads decode to the same chapter and are smaller."""
+    payload = encode_chapter(chapter, compress=True)
+    assert decode_chapter(payload) == chapter
+    assert len(payload) < len(encode_chapter(chapter))
+
+
+def test_corrupt_compressed_payload_raises(chapter):
+    """A damaged compressed body is reported as a SerializationError."""
+    payload = encode_chapter(chapter, compress=True)
+    with pytest.raises(SerializationError, match="Corrupt"):
+        decode_chapter(payload[:-8])
+
+
+def test_smaller_than_json(chapter):
+    """The binary payload is smaller than the model's JSON."""
+    assert len(encode_chapter(chapter)) < len(chapter.model_dump_json())
+
+
+def test_round_trip_unicode_and_optional_fields():
+    """Non-ASCII text, empty strings and missing keywords survive a round trip."""
+    chapter = load_chapter(
+        {
+            "title": "Über Ströme ✓",
+            "introduction": "",
+            "sections": [],
+            "summary": "日本語のまとめ",
+            "quiz": [{"question": "Q?", "options": ["ä", "b"], "correct_answer": "b"}],
+            "keywords": None,
+        }
+    )
+    assert decode_chapter(encode_chapter(chapter)) == chapter
+
+
+def test_answer_outside_options_is_stored_inline(chapter):
+    """An answer that is not one of the options is kept verbatim."""
+    item = QuizItem.model_construct(
+        question="Q?", options=["a", "b"], correct_answer="c"
+    )
+    chapter = chapter.model_copy(update={"quiz": [item]})
+    assert decode_chapter(encode_chapter(chapter)).quiz[0].correct_answer == "c"
+
+
+def test_empty_keywords_differ_from_missing(chapter):
+    """An empty keyword list does not decode as ``None``."""
+    chapter = chapter.model_copy(update={"keywords": []})
+    assert decode_chapter(encode_chapter(chapter)).keywords == []
+
+
+@pytest.mark.parametrize(
+    "mutate, message",
+    [
+        (lambda p: b"JSON" + p[4:], "Not a chapter payload"),
+        (lambda p: p[:4] + bytes([FORMAT_VERSION + 1]) + p[5:], "version"),
+        (lambda p: p[:6], "Truncated"),
+        (lambda p: p[:-3], "Corrupt"),
+        (lambda p: p + b"x", "Corrupt"),
+        # First quiz item's answer index set to its option count
+        (lambda p: p[:13] + p[12:13] + p[14:], "Corrupt"),
+        # First quiz item's option count above the format's limit
+        (lambda p: p[:12] + b"\xff" + p[13:], "Corrupt"),
+    ],
+)
+def test_bad_payloads_raise(chapter, mutate, message):
+    """Foreign, future, truncated, padded and out-of-range payloads are rejected."""
+    with pytest.raises(SerializationError, match=message):
+        decode_chapter(mutate(encode_chapter(chapter)))
+
+
+def test_too_many_options_raise(chapter):
+    """Quiz items beyond the format's option limit cannot be encoded."""
+    item = chapter.quiz[0].model_copy(update={"options": ["x"] * 300})
+    with pytest.raises(SerializationError, match="Too many options"):
+        encode_chapter(chapter.model_copy(update={"quiz": [item]}))
+
+
+def test_header_layout(chapter):
+    """The header records magic, version and the collection sizes."""
+    magic, version, _, sections, quiz, _ = struct.unpack_from(
+        "<4sBBHHH", encode_chapter(chapter)
+    )
+    assert (magic, version) == (b"SGCH", FORMAT_VERSION)
+    assert (sections, quiz) == (len(chapter.sections), len(chapter.quiz))
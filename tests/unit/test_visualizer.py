@@ -234,3 +234,95 @@ def test_dependency_added():
             assert "diagrams" in content
     except FileNotFoundError:
         pytest.fail("requirements.txt not found.")
+
+
+# --- Builtin backend ---
+
+
+def test_builtin_svg_backend_writes_without_diagrams(sample_chapters, tmp_path):
+    """SVG output is drawn in Python: one cluster per chapter, one node per step."""
+    import xml.etree.ElementTree as ET
+
+    output_filename = str(tmp_path / "out" / "guide")
+    with patch("studyguide.visualizer.Diagram") as mock_diagram:
+        create_study_guide_diagram(sample_chapters, output_filename, output_format="svg")
+    mock_diagram.assert_not_called()
+
+    root = ET.parse(f"{output_filename}.svg").getroot()
+    ns = {"svg": "http://www.w3.org/2000/svg"}
+    groups = root.findall("svg:g", ns)
+    assert [g.get("class") for g in groups].count("cluster") == 2
+    # Intro, one section, summary and quiz per chapter
+    assert [g.get("class") for g in groups].count("node") == 8
+    assert len(root.findall("svg:path", ns)) == 6
+    assert "Chapter: Chapter 1: Foo" in ET.tostring(root, encoding="unicode")
+
+
+def test_render_svg_escapes_and_truncates_labels():
+    """Markup in labels is escaped; long labels are cut with the full text as tooltip."""
+    from studyguide.visualizer import render_svg
+
+    heading = "Tags like <script> & a heading far too long to fit inside one node"
+    chapter = Chapter(
+        title="T",
+        introduction="i",
+        sections=[Section(heading=heading, content="c")],
+        summary="s",
+        quiz=[QuizItem(question="Q?", options=["A", "B"], correct_answer="A")],
+    )
+    svg = render_svg([chapter], title="A & B")
+
+    assert "<script>" not in svg
+    assert "&lt;script&gt;" in svg and "A &amp; B" in svg
+    assert "…" in svg
+    assert "<title>Section: Tags like &lt;script&gt; &amp; a heading far too long" in svg
+
+
+def test_render_dot_chains_each_chapter(sample_chapters):
+    """DOT output has a cluster per chapter and the intro -> quiz chain."""
+    from studyguide.visualizer import render_dot
+
+    dot = render_dot(sample_chapters, title='Say "hi"')
+
+    assert dot.startswith('digraph "Say \\"hi\\"" {')
+    assert dot.count("subgraph cluster_") == 2
+    assert "c0n0 -> c0n1 -> c0n2 -> c0n3;" in dot
+    assert '[label="Introduction\\n(2 words)"]' in dot
+
+
+@patch("studyguide.visualizer.Diagram")
+@patch("studyguide.visualizer.Cluster")
+@patch("studyguide.visualizer.Node")
+def test_diagrams_backend_draws_chapter_labels(
+    mock_node, mock_cluster, mock_diagram, sample_chapters, tmp_path
+):
+    """Both backends take their node labels from chapter_labels, chained in order."""
+    with patch("studyguide.visualizer.chapter_labels", return_value=["first", "second", "third"]):
+        create_study_guide_diagram(sample_chapters, str(tmp_path / "guide"), output_format="png")
+
+    assert mock_node.call_args_list == [call("first"), call("second"), call("third")] * 2
+    assert mock_node.return_value.__rshift__.call_count == 4
+
+
+def test_builtin_backend_rejects_raster_formats(sample_chapters, tmp_path):
+    """PNG needs Graphviz, so only the diagrams backend can write it."""
+    with pytest.raises(ValueError, match="builtin backend"):
+        create_study_guide_diagram(
+            sample_chapters, str(tmp_path / "g"), output_format="png", backend="builtin"
+        )
+
+
+def test_diagrams_is_imported_lazily():
+    """Importing the visualizer does not import the diagrams package."""
+    import subprocess
+    import sys
+
+    code = "import sys, studyguide.visualizer; print('diagrams' in sys.modules)"
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        capture_output=True,
+        text=True,
+        env={**os.environ, "PPLX_API_KEY": "test"},
+        check=True,
+    )
+    assert result.stdout.strip().splitlines()[-1] == "False"
@@ -0,0 +1,135 @@
+"""
+Unit tests for the studyguide.writer module.
+"""
+
+import os
+from pathlib import Path
+
+import pytest
+
+from studyguide import writer as writer_module
+from studyguide.writer import (
+    STAGING_DIR,
+    GuideWriter,
+    commit_guide,
+    recover_staging,
+)
+
+
+def test_commit_creates_and_replaces_guide(tmp_path):
+    """A commit replaces the whole directory; kept pages are hard-linked."""
+    target = tmp_path / "asyncio"
+    commit_guide(target, {"index.html": b"v1", "chapter-1.html": b"c1", "chapter-2.html": b"c2"})
+    inode = (target / "chapter-1.html").stat().st_ino
+
+    dropped = commit_guide(target, {"index.html": b"v2"}, keep=["chapter-1.html"])
+
+    assert dropped == ["chapter-2.html"]
+    assert sorted(os.listdir(target)) == ["chapter-1.html", "index.html"]
+    assert (target / "index.html").read_bytes() == b"v2"
+    assert (target / "chapter-1.html").stat().st_ino == inode
+    assert not (tmp_path / STAGING_DIR).exists()
+
+
+def test_failed_commit_leaves_guide_untouched(tmp_path, monkeypatch):
+    """An error while staging never reaches the live directory."""
+    target = tmp_path / "asyncio"
+    commit_guide(target, {"index.html": b"v1"})
+
+    def failing_write(path, data, sync):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(writer_module, "_write_file", failing_write)
+    with pytest.raises(OSError, match="disk full"):
+        commit_guide(target, {"index.html": b"v2"})
+
+    assert (target / "index.html").read_bytes() == b"v1"
+    assert not (tmp_path / STAGING_DIR).exists()
+
+
+@pytest.mark.parametrize(
+    ("fsync", "syncs", "fsyncs"),
+    [("none", 0, 0), ("guide", 0, 2 + 2), ("file", 0, 2 + 2)],
+)
+def test_fsync_modes(tmp_path, monkeypatch, fsync, syncs, fsyncs):
+    """Both modes fsync each page and directory of the commit, never the whole system."""
+    calls = {"sync": 0, "fsync": 0}
+    monkeypatch.setattr(os, "sync", lambda: calls.__setitem__("sync", calls["sync"] + 1))
+    real_fsync = os.fsync
+
+    def counting_fsync(fd):
+        calls["fsync"] += 1
+        real_fsync(fd)
+
+    monkeypatch.setattr(os, "fsync", counting_fsync)
+    commit_guide(tmp_path / "asyncio", {"index.html": b"i", "chapter-1.html": b"c"}, fsync=fsync)
+
+    assert calls == {"sync": syncs, "fsync": fsyncs}
+
+
+def test_guide_fsync_makes_the_swap_durable(tmp_path, monkeypatch):
+    """'guide' syncs the staged pages first and the site directory after the swap."""
+    synced = []
+
+    def recording_fsync_path(path):
+        synced.append((Path(path), (tmp_path / "asyncio").exists()))
+
+    monkeypatch.setattr(writer_module, "_fsync_path", recording_fsync_path)
+    commit_guide(tmp_path / "asyncio", {"index.html": b"i"}, fsync="guide")
+
+    (page, visible), (staged, _), (site, swapped) = synced
+    assert page.name == "index.html" and not visible
+    assert staged == page.parent
+    assert site == tmp_path and swapped
+
+
+def test_unknown_fsync_mode_is_rejected(tmp_path):
+    with pytest.raises(ValueError, match="fsync mode"):
+        commit_guide(tmp_path / "asyncio", {}, fsync="always")
+
+
+def test_recover_interrupted_swap(tmp_path):
+    """A guide moved aside but never replaced is restored; stale staging is removed."""
+    staging = tmp_path / STAGING_DIR
+    (staging / "old-abc" / "asyncio").mkdir(parents=True)
+    (staging / "old-abc" / "asyncio" / "index.html").write_bytes(b"v1")
+    (staging / "new-def").mkdir()
+    (staging / "new-def" / "index.html").write_bytes(b"partial")
+
+    recover_staging(tmp_path)
+
+    assert (tmp_path / "asyncio" / "index.html").read_bytes() == b"v1"
+    assert not staging.exists()
+
+
+def test_guide_writer_commits_in_order(tmp_path):
+    """The writer thread commits queued guides and reports each result."""
+    writer = GuideWriter(tmp_path, fsync="none", max_pending=1)
+    futures = [
+        writer.submit(slug, {"index.html": slug.encode()}) for slug in ("a", "b", "c")
+    ]
+    failed = writer.submit("d", {"missing/index.html": b"x"})
+    writer.close()
+
+    assert [f.result() for f in futures] == [[], [], []]
+    assert (tmp_path / "c" / "index.html").read_bytes() == b"c"
+    assert isinstance(failed.exception(), OSError)
+
+
+def test_guide_writer_survives_base_exceptions(tmp_path, monkeypatch):
+    """A commit stopped by a non-Exception still resolves its future and the next guide."""
+    real_commit = writer_module.commit_guide
+
+    def exiting_commit(target, pages, keep, fsync):
+        if target.name == "a":
+            raise SystemExit(1)
+        return real_commit(target, pages, keep, fsync)
+
+    monkeypatch.setattr(writer_module, "commit_guide", exiting_commit)
+    writer = GuideWriter(tmp_path)
+    exited = writer.submit("a", {"index.html": b"a"})
+    committed = writer.submit("b", {"index.html": b"b"})
+    writer.close()
+
+    assert isinstance(exited.exception(timeout=1), SystemExit)
+    assert committed.result(timeout=1) == []